@@ -7,6 +7,7 @@ Provides tools to query large text/files using RLM's recursive processing.
 
 import os
 import sys
+import asyncio
 from pathlib import Path
 from typing import Any
 
@@ -20,12 +21,17 @@ from mcp.types import (
     EmbeddedResource,
 )
 
-from rlm_query import query_text, query_file
+from rlm.repl import redirect_uncaptured_stdout
+from rlm_query import aquery_text, aquery_file, get_session_manager
 
 
 # Initialize MCP server
 server = Server("rlm-server")
 
+# Cap on RLM sessions running at once; further tool calls wait their turn
+MAX_CONCURRENT_SESSIONS = int(os.getenv("RLM_MAX_CONCURRENT_SESSIONS", "4"))
+_session_slots = asyncio.Semaphore(MAX_CONCURRENT_SESSIONS)
+
 
 @server.list_tools()
 async def handle_list_tools() -> list[Tool]:
@@ -56,7 +62,7 @@ async def handle_list_tools() -> list[Tool]:
         ),
         Tool(
             name="query_file",
-            description="Query a file using RLM. Loads the file content and queries it. Supports any text file (code, documents, logs, etc). Can handle files of any size.",
+            description="Query a file using RLM. Loads the file content and queries it. Supports any text file (code, documents, logs, etc). Can handle files of any size. Repeated queries on an unchanged file reuse its loaded session, including variables from earlier queries.",
             inputSchema={
                 "type": "object",
                 "properties": {
@@ -97,7 +103,8 @@ async def handle_call_tool(name: str, arguments: dict) -> list[TextContent]:
                 )]
             
             # Use shared query logic (no logging for MCP)
-            result = query_text(text, question, max_iterations, enable_logging=False)
+            async with _session_slots:
+                result = await aquery_text(text, question, max_iterations, enable_logging=False)
             return [TextContent(type="text", text=result)]
         
         elif name == "query_file":
@@ -112,7 +119,8 @@ async def handle_call_tool(name: str, arguments: dict) -> list[TextContent]:
                 )]
             
             # Use shared query logic (no logging for MCP)
-            result = query_file(file_path, question, max_iterations, enable_logging=False)
+            async with _session_slots:
+                result = await aquery_file(file_path, question, max_iterations, enable_logging=False)
             return [TextContent(type="text", text=result)]
         
         else:
@@ -136,21 +144,27 @@ async def main():
         print("Error: OPENAI_API_KEY environment variable not set", file=sys.stderr)
         sys.exit(1)
     
-    async with stdio_server() as (read_stream, write_stream):
-        await server.run(
-            read_stream,
-            write_stream,
-            InitializationOptions(
-                server_name="rlm",
-                server_version="1.0.0",
-                capabilities=server.get_capabilities(
-                    notification_options=NotificationOptions(),
-                    experimental_capabilities={},
+    # stdout is the JSON-RPC channel: stray prints from REPL threads go to stderr
+    redirect_uncaptured_stdout()
+    
+    try:
+        async with stdio_server() as (read_stream, write_stream):
+            await server.run(
+                read_stream,
+                write_stream,
+                InitializationOptions(
+                    server_name="rlm",
+                    server_version="1.0.0",
+                    capabilities=server.get_capabilities(
+                        notification_options=NotificationOptions(),
+                        experimental_capabilities={},
+                    ),
                 ),
-            ),
-        )
+            )
+    finally:
+        # Release the file sessions kept between tool calls
+        get_session_manager().close_all()
 
 
 if __name__ == "__main__":
-    import asyncio
     asyncio.run(main())
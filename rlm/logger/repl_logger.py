@@ -4,9 +4,11 @@ from rich.panel import Panel
 from rich.text import Text
 from rich import box
 from rich.rule import Rule
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import List, Optional
 
+from rlm.utils.variables import VariableSummary
+
 @dataclass
 class CodeExecution:
     code: str
@@ -14,6 +16,7 @@ class CodeExecution:
     stderr: str
     execution_number: int
     execution_time: Optional[float] = None
+    variables: List[VariableSummary] = field(default_factory=list)
 
 class REPLEnvLogger:
     def __init__(self, max_output_length: int = 2000, enabled: bool = True):
@@ -36,15 +39,23 @@ class REPLEnvLogger:
         
         return f"{first_part}\n\n... [TRUNCATED {truncated_chars} characters] ...\n\n{last_part}"
     
-    def log_execution(self, code: str, stdout: str, stderr: str = "", execution_time: Optional[float] = None) -> None:
-        """Log a code execution with its output"""
+    def log_execution(self, code: str, stdout: str, stderr: str = "", execution_time: Optional[float] = None,
+                      variables: Optional[List[VariableSummary]] = None) -> None:
+        """Log a code execution with its output and summaries of the variables it changed"""
         self.execution_count += 1
+        if self.enabled and variables:
+            # Render the previews now: a summary holds its variable's value until then, and
+            # logged executions live as long as the logger
+            for summary in variables:
+                summary.preview
         execution = CodeExecution(
             code=code,
             stdout=stdout,
             stderr=stderr,
             execution_number=self.execution_count,
-            execution_time=execution_time
+            execution_time=execution_time,
+            # Nothing displays them when logging is off, so don't keep them
+            variables=(variables or []) if self.enabled else [],
         )
         self.executions.append(execution)
     
@@ -136,6 +147,14 @@ class REPLEnvLogger:
                 )
         
         self.console.print(output_panel)
+        if execution.variables:
+            variables_text = "\n".join(summary.describe() for summary in execution.variables)
+            self.console.print(Panel(
+                Text(self._truncate_output(variables_text), style="cyan"),
+                title=f"[bold cyan]Variables [{execution.execution_number}]:[/bold cyan]",
+                border_style="cyan",
+                box=box.ROUNDED
+            ))
         if timing_panel:
             self.console.print(timing_panel)
     
@@ -1,31 +1,118 @@
 import sys
 import io
+import ast
+import asyncio
+import functools
+import traceback
 import threading
-import json
 import tempfile
 import os
 import time
-from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+from types import CodeType
+from collections.abc import Mapping
 from dataclasses import dataclass
-from typing import Optional
+from typing import Any, Callable, Optional
 
 from rlm import RLM
+from rlm.utils.context import LazyText
+from rlm.utils.lines import LineIndex
+from rlm.utils.search import BM25Index, PassageIndex, grep
+from rlm.utils.codebase import CodebaseIndex
+from rlm.utils.chunking import DEFAULT_CHUNK_TOKENS, TokenEstimator, chunk_documents, chunk_offsets, estimator_for
+from rlm.utils.embeddings import Embedder, VectorIndex, embeddings_available
+from rlm.utils.variables import VariableSummarizer, VariableSummary, approximate_size
+from rlm.utils.limits import CellWatchdog, ExecutionBudgetExceeded, ExecutionLimits, current_rss_mb
+from rlm.utils.usage import UsageTracker
+
+_CELL_FILENAME = "<repl>"
+
+
+@functools.lru_cache(maxsize=256)
+def _compile_cell(code: str) -> tuple[Optional[CodeType], Optional[CodeType]]:
+    """
+    Parse a cell once and compile it into (statements, trailing expression). Either part may be
+    None. Results are cached by source, so re-sent cells skip parsing and compilation.
+    Raises SyntaxError for invalid code.
+    """
+    tree = ast.parse(code, filename=_CELL_FILENAME, mode="exec")
+    last_expression = None
+    if tree.body and isinstance(tree.body[-1], ast.Expr):
+        last_expression = compile(
+            ast.Expression(body=tree.body.pop().value), _CELL_FILENAME, "eval"
+        )
+    statements = compile(tree, _CELL_FILENAME, "exec") if tree.body else None
+    return statements, last_expression
+
+
+class _ThreadLocalStream:
+    """
+    Stand-in for sys.stdout/sys.stderr that sends writes from a thread currently executing
+    REPL code to that thread's capture buffer, and everything else to `uncaptured` (the
+    original stream unless redirected). This lets several REPL environments capture output
+    concurrently in one process. Other attributes, such as `buffer`, are the original stream's.
+    """
+    
+    def __init__(self, fallback):
+        self._fallback = fallback
+        self.uncaptured = fallback
+        self._local = threading.local()
+    
+    def _target(self):
+        return getattr(self._local, "buffer", None) or self.uncaptured
+    
+    def write(self, text):
+        return self._target().write(text)
+    
+    def flush(self):
+        return self._target().flush()
+    
+    def __getattr__(self, name):
+        return getattr(self._fallback, name)
+
+
+_stream_install_lock = threading.Lock()
+
+def _install_thread_local_streams() -> tuple[_ThreadLocalStream, _ThreadLocalStream]:
+    """Wrap sys.stdout/sys.stderr in thread-local proxies (once) and return them."""
+    with _stream_install_lock:
+        if not isinstance(sys.stdout, _ThreadLocalStream):
+            sys.stdout = _ThreadLocalStream(sys.stdout)
+        if not isinstance(sys.stderr, _ThreadLocalStream):
+            sys.stderr = _ThreadLocalStream(sys.stderr)
+        return sys.stdout, sys.stderr
+
+
+def redirect_uncaptured_stdout() -> None:
+    """
+    Send text written to sys.stdout outside any REPL capture (e.g. by a thread the model's code
+    started) to stderr instead. For processes whose stdout carries a protocol, like the MCP
+    server's JSON-RPC channel; `sys.stdout.buffer` still reaches the real stdout.
+    """
+    stdout_proxy, stderr_proxy = _install_thread_local_streams()
+    stdout_proxy.uncaptured = stderr_proxy._fallback
+
 
 # Simple sub LM for REPL environment. Note: This could also be just the RLM itself!
 class Sub_RLM(RLM):
     """Recursive LLM client for REPL environment with fixed configuration."""
     
-    def __init__(self, model: str = "gpt-5"):
+    def __init__(self, model: str = "gpt-5", cache=None, usage: Optional[UsageTracker] = None):
         # Configuration - model can be specified
         self.api_key = os.getenv("OPENAI_API_KEY")
         if not self.api_key:
             raise ValueError("OPENAI_API_KEY environment variable is required")
         
         self.model = model
+        self.cache = cache
+        # Token/cost accounting, usually shared with the root LM of the same session
+        self.usage = usage if usage is not None else UsageTracker()
 
         # Initialize OpenAI client
         from rlm.utils.llm import OpenAIClient
-        self.client = OpenAIClient(api_key=self.api_key, model=model)
+        self.client = OpenAIClient(api_key=self.api_key, model=model, cache=cache, usage=self.usage, usage_role="sub")
+        self.async_client = None  # Created lazily on first async call
         
     
     def completion(self, prompt) -> str:
@@ -45,46 +132,236 @@ class Sub_RLM(RLM):
             error_msg = f"Error making LLM query: {str(e)}"
             return error_msg
     
-    def cost_summary(self) -> dict[str, float]:
-        raise NotImplementedError("Cost tracking is not implemented for the Sub-RLM.")
+    async def acompletion(self, prompt) -> str:
+        """
+        Async LM query for sub-LM call.
+        """
+        try:
+            if self.async_client is None:
+                from rlm.utils.llm import AsyncOpenAIClient
+                self.async_client = AsyncOpenAIClient(
+                    api_key=self.api_key, model=self.model, cache=self.cache, usage=self.usage, usage_role="sub"
+                )
+            
+            response = await self.async_client.completion(
+                messages=prompt,
+                timeout=300
+            )
+            
+            return response
+        
+        except Exception as e:
+            error_msg = f"Error making LLM query: {str(e)}"
+            return error_msg
+    
+    def cost_summary(self) -> dict[str, Any]:
+        """Token usage, latency and cost of the sub-LM calls."""
+        return self.usage.summary(role="sub")
     
     def reset(self):
         raise NotImplementedError("Reset is not implemented for the Sub-RLM.")
 
 
+def _prompt_text(prompt):
+    """A `LazyText` prompt (e.g. `llm_query(context)`) is sent as its decoded text."""
+    return str(prompt) if isinstance(prompt, LazyText) else prompt
+
+
+class _SubLMDispatch:
+    """
+    Routes `llm_query`/`llm_query_batch` calls to `self.sub_rlm`. Shared by the in-process and
+    worker-process REPL environments. While `self._loop` is set (async execution), calls are
+    awaited on that event loop; otherwise they run on the calling thread or a thread pool.
+    """
+    
+    sub_rlm: RLM
+    max_concurrency: int = 8
+    limits: Optional[ExecutionLimits] = None
+    _loop: Optional[asyncio.AbstractEventLoop] = None
+    _cell_llm_calls: int = 0
+    _session_llm_calls: int = 0
+    
+    def _charge_llm_calls(self, count: int) -> None:
+        """Count sub-LLM calls against the cell and session budgets before making them."""
+        limits = self.limits
+        if limits is not None:
+            if limits.max_llm_calls_per_cell is not None and self._cell_llm_calls + count > limits.max_llm_calls_per_cell:
+                raise ExecutionBudgetExceeded(f"sub-LLM call limit of {limits.max_llm_calls_per_cell} per cell exceeded")
+            if limits.max_llm_calls is not None and self._session_llm_calls + count > limits.max_llm_calls:
+                raise ExecutionBudgetExceeded(f"sub-LLM call limit of {limits.max_llm_calls} per session exceeded")
+        self._cell_llm_calls += count
+        self._session_llm_calls += count
+    
+    def _llm_query(self, prompt) -> str:
+        self._charge_llm_calls(1)
+        prompt = _prompt_text(prompt)
+        if self._loop is not None:
+            future = asyncio.run_coroutine_threadsafe(self.sub_rlm.acompletion(prompt), self._loop)
+            return future.result()
+        return self.sub_rlm.completion(prompt)
+    
+    def _llm_query_batch(self, prompts: list, max_concurrency: Optional[int] = None) -> list[str]:
+        prompts = [_prompt_text(prompt) for prompt in prompts]
+        if not prompts:
+            return []
+        if max_concurrency is None:
+            max_concurrency = self.max_concurrency
+        self._charge_llm_calls(len(prompts))
+        
+        # Sub-RLMs that can batch on their own (e.g. the worker-process proxy) get the whole list
+        if hasattr(self.sub_rlm, "batch_completion"):
+            return self.sub_rlm.batch_completion(prompts, max_concurrency)
+        
+        if self._loop is not None:
+            future = asyncio.run_coroutine_threadsafe(
+                self._abatch_query(prompts, max_concurrency), self._loop
+            )
+            return future.result()
+        
+        def query_one(prompt):
+            try:
+                return self.sub_rlm.completion(prompt)
+            except Exception as e:
+                return f"Error making LLM query: {str(e)}"
+        
+        workers = max(1, min(int(max_concurrency), len(prompts)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="llm_query") as pool:
+            return list(pool.map(query_one, prompts))
+    
+    async def _abatch_query(self, prompts: list, max_concurrency: int) -> list[str]:
+        """Run sub-LLM queries concurrently on the event loop, bounded by a semaphore."""
+        semaphore = asyncio.Semaphore(max(1, int(max_concurrency)))
+        
+        async def query_one(prompt):
+            async with semaphore:
+                try:
+                    return await self.sub_rlm.acompletion(prompt)
+                except Exception as e:
+                    return f"Error making LLM query: {str(e)}"
+        
+        return list(await asyncio.gather(*(query_one(p) for p in prompts)))
+
+
+class _StreamingBuffer(io.StringIO):
+    """StringIO that also forwards every write to a callback, used to stream cell output."""
+    
+    def __init__(self, stream_name: str, on_output: Callable[[str, str], None]):
+        super().__init__()
+        self._stream_name = stream_name
+        self._on_output = on_output
+    
+    def write(self, text: str) -> int:
+        written = super().write(text)
+        if text:
+            self._on_output(self._stream_name, text)
+        return written
+
+
+class REPLVariables(Mapping):
+    """
+    Live, read-only view of the user-defined variables in a REPL namespace, i.e. everything
+    except the built-ins and helper functions the environment injects. Nothing is copied.
+    An injected name is only hidden while it is still bound to the injected object, so code
+    can reuse names like `chunk` or `files` for its own variables.
+    """
+    
+    def __init__(self, namespace: dict, injected: dict[str, Any]):
+        self._namespace = namespace
+        self._injected = injected
+    
+    def is_injected(self, key: str, value: Any) -> bool:
+        """Whether `value` bound to `key` is something the environment put there."""
+        return key in self._injected and self._injected[key] is value
+    
+    def __getitem__(self, key):
+        value = self._namespace[key]
+        if self.is_injected(key, value):
+            raise KeyError(key)
+        return value
+    
+    def __contains__(self, key) -> bool:
+        return key in self._namespace and not self.is_injected(key, self._namespace[key])
+    
+    def __iter__(self):
+        # Snapshot: cells running concurrently may bind new names
+        return (key for key, value in list(self._namespace.items()) if not self.is_injected(key, value))
+    
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+    
+    def __repr__(self) -> str:
+        return f"REPLVariables({list(self)})"
+
+
 @dataclass
 class REPLResult:
     stdout: str
     stderr: str
-    locals: dict
+    locals: Mapping
     execution_time: float
+    changed: list[str]
+    deleted: list[str]
+    variables: list[VariableSummary]
+    budget_exceeded: Optional[str]
 
-    def __init__(self, stdout: str, stderr: str, locals: dict, execution_time: float=None):
+    def __init__(self, stdout: str, stderr: str, locals: Mapping, execution_time: float=None,
+                 changed: Optional[list[str]] = None, deleted: Optional[list[str]] = None,
+                 variables: Optional[list[VariableSummary]] = None, budget_exceeded: Optional[str] = None):
         self.stdout = stdout
         self.stderr = stderr
-        self.locals = locals
+        self.locals = locals  # Live view of the namespace, not a snapshot
         self.execution_time = execution_time
+        self.changed = changed or []  # Variables created or rebound by this execution
+        self.deleted = deleted or []  # Variables removed by this execution
+        self.variables = variables  # Summaries of all public variables after this execution
+        self.budget_exceeded = budget_exceeded  # Why the cell was stopped, if it ran over budget
     
     def __str__(self):
-        return f"REPLResult(stdout={self.stdout}, stderr={self.stderr}, locals={self.locals}, execution_time={self.execution_time})"
+        return f"REPLResult(stdout={self.stdout}, stderr={self.stderr}, changed={self.changed}, deleted={self.deleted}, execution_time={self.execution_time}, budget_exceeded={self.budget_exceeded})"
 
-class REPLEnv:
+class REPLEnv(_SubLMDispatch):
     def __init__(
         self,
         recursive_model: str = "gpt-5-mini",
         context_json: Optional[dict | list] = None,
-        context_str: Optional[str] = None,
+        context_str: Optional[str | LazyText] = None,
         setup_code: str = None,
+        max_concurrency: int = 8,
+        cache=None,
+        sub_rlm: Optional[RLM] = None,
+        on_output: Optional[Callable[[str, str], None]] = None,
+        limits: Optional[ExecutionLimits] = None,
+        usage: Optional[UsageTracker] = None,
+        search_index: Optional[bool] = None,
+        semantic_index: Optional[bool] = None,
+        embedder: Optional[Embedder | Callable[[list[str]], Any]] = None,
+        dedicated_process: bool = False,
     ):
         # Store the original working directory
         self.original_cwd = os.getcwd()
         
         # Create temporary directory (but don't change global working directory)
         self.temp_dir = tempfile.mkdtemp(prefix="repl_env_")
+        
+        def open_in_temp_dir(file, *args, **kwargs):
+            """`open`, with relative paths resolved in this environment's temporary directory."""
+            # Not os.chdir: the working directory is shared by every session in the process
+            if isinstance(file, (str, bytes, os.PathLike)) and not os.path.isabs(file):
+                file = os.path.join(self.temp_dir, os.fsdecode(file))
+            return open(file, *args, **kwargs)
 
 
         # Initialize minimal RLM / LM client. Change this to support more depths.
-        self.sub_rlm: RLM = Sub_RLM(model=recursive_model)
+        self.sub_rlm: RLM = sub_rlm if sub_rlm is not None else Sub_RLM(model=recursive_model, cache=cache, usage=usage)
+        self.max_concurrency = max_concurrency
+        # Optional callback receiving ("stdout" | "stderr", text) as cells write output
+        self.on_output = on_output
+        # Time, memory and sub-LLM call budgets enforced on every cell. CPU and memory are only
+        # measurable per session when the process runs nothing else (a worker process)
+        self.limits = limits if limits is not None else ExecutionLimits()
+        if not dedicated_process:
+            self.limits = self.limits.for_shared_process()
+        self._session_elapsed = 0.0
         
         # Create safe globals with only string-safe built-ins
         self.globals = {
@@ -98,7 +375,7 @@ class REPLEnv:
                 'chr': chr, 'ord': ord, 'hex': hex, 'bin': bin, 'oct': oct,
                 'repr': repr, 'ascii': ascii, 'format': format,
                 '__import__': __import__,  # Allow imports
-                'open': open,  # Allow file access
+                'open': open_in_temp_dir,  # Allow file access
                 
                 # Add commonly used built-ins that were missing
                 'any': any, 'all': all, 'hasattr': hasattr, 'getattr': getattr,
@@ -159,19 +436,26 @@ class REPLEnv:
                 'locals': None,  # Block locals access
             }
         }
-        self.locals = {}
         self._lock = threading.Lock()
+        # Event loop driving `acode_execution`; sub-LLM calls are dispatched onto it while set
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
         self.stdout_buffer = io.StringIO()
         self.stderr_buffer = io.StringIO()
-
-        self.load_context(context_json, context_str)
         
         def llm_query(prompt: str) -> str:
             """Query the LLM with the given prompt."""
-            return self.sub_rlm.completion(prompt)
+            return self._llm_query(prompt)
         
-        # Add (R)LM query function to globals
+        def llm_query_batch(prompts: list, max_concurrency: int = max_concurrency) -> list[str]:
+            """
+            Query the LLM with many prompts concurrently. Results are returned in the same
+            order as the prompts; a failed prompt yields its error message instead of raising.
+            """
+            return self._llm_query_batch(prompts, max_concurrency)
+        
+        # Add (R)LM query functions to globals
         self.globals['llm_query'] = llm_query
+        self.globals['llm_query_batch'] = llm_query_batch
         
         # Add FINAL_VAR function to globals
         def final_var(variable_name: str) -> str:
@@ -193,33 +477,135 @@ class REPLEnv:
         
         self.globals['FINAL_VAR'] = final_var
         
+        # `self.globals` is the single persistent namespace that every cell runs in;
+        # `self.locals` views the variables created in it, excluding what we injected above
+        self._injected = dict(self.globals)
+        # Names of the context helpers defined by `load_context`, in order
+        self.helper_names: list[str] = []
+        self.locals = REPLVariables(self.globals, self._injected)
+        self.variable_summarizer = VariableSummarizer()
+        self.line_index: Optional[LineIndex] = None
+        # File table when the context is a concatenated codebase dump
+        self.codebase: Optional[CodebaseIndex] = None
+        # Indexes behind `search()` (BM25) and `semantic_search()` (embeddings, needs NumPy):
+        # built when the context is loaded if `search_index` / `semantic_index` (or
+        # RLM_SEARCH_INDEX / RLM_SEMANTIC_INDEX) is set, otherwise on their first call
+        if search_index is None:
+            search_index = os.getenv("RLM_SEARCH_INDEX", "").lower() in ("1", "true", "yes")
+        if semantic_index is None:
+            semantic_index = os.getenv("RLM_SEMANTIC_INDEX", "").lower() in ("1", "true", "yes")
+        self.build_search_index = search_index
+        self.build_semantic_index = semantic_index and embeddings_available()
+        self.embedder = embedder
+        self.search_index: Optional[BM25Index] = None
+        self.semantic_index: Optional[VectorIndex] = None
+        self._search_source: Any = None
+        self._search_lock = threading.Lock()
+        # Chars-per-token ratio of the loaded context, calibrated on the first `chunk()` call
+        self._token_estimator: Optional[TokenEstimator] = None
+        
+        self.load_context(context_json, context_str)
+        
         # Finally, run any setup code if provided
         if setup_code:
             self.code_execution(setup_code)
     
-    def load_context(self, context_json: Optional[dict | list] = None, context_str: Optional[str] = None):
-        # Write context JSON to temporary directory using absolute (temp dir) path
+    def load_context(self, context_json: Optional[dict | list] = None, context_str: Optional[str | LazyText] = None):
+        """
+        Expose the context as `context` in the REPL namespace. The object is handed over by
+        reference, nothing is serialized or copied; a `LazyText` stays memory-mapped.
+        """
         if context_json is not None:
-            context_path = os.path.join(self.temp_dir, "context.json")
-            with open(context_path, "w") as f:
-                json.dump(context_json, f, indent=2)
-            context_code = (
-                f"import json\n"
-                f"with open(r'{context_path}', 'r') as f:\n"
-                f"    context = json.load(f)\n"
-            )
-            self.code_execution(context_code)
+            self.globals['context'] = context_json
+            if isinstance(context_json, list):
+                self._add_helpers(
+                    grep=functools.partial(grep, context_json), search=self._search, chunk=self._chunk,
+                )
+                # Archive members keep their paths, so they get the same file table as a dump
+                self.codebase = CodebaseIndex.from_documents(context_json)
+                self._add_codebase_helpers()
+                self._set_search_source(context_json)
         
         if context_str is not None:
-            context_path = os.path.join(self.temp_dir, "context.txt")
-            with open(context_path, "w") as f:
-                f.write(context_str)
-            context_code = (
-                f"import os\n"
-                f"with open(r'{context_path}', 'r') as f:\n"
-                f"    context = f.read()\n"
+            self.globals['context'] = context_str
+            # Line navigation over the loaded text, indexed once here instead of re-split per cell
+            self.line_index = LineIndex(context_str)
+            self._add_helpers(
+                get_lines=self.line_index.get_lines,
+                line_at_char=self.line_index.line_at_char,
+                num_lines=len(self.line_index),
+                grep=functools.partial(grep, context_str),
+                search=self._search,
+                chunk=self._chunk,
+            )
+            self.codebase = CodebaseIndex.detect(context_str, self.line_index)
+            self._add_codebase_helpers()
+            self._set_search_source(context_str)
+    
+    def _add_codebase_helpers(self) -> None:
+        if self.codebase is not None:
+            self._add_helpers(
+                files=self.codebase.files,
+                read_file=self.codebase.read_file,
+                find_files=self.codebase.find_files,
             )
-            self.code_execution(context_code)
+    
+    def _set_search_source(self, source) -> None:
+        self._search_source = source
+        self.search_index = self.semantic_index = None
+        self._token_estimator = None
+        if embeddings_available():
+            self._add_helpers(semantic_search=self._semantic_search)
+        if self.build_search_index:
+            self._context_index("search_index", BM25Index)
+        if self.build_semantic_index:
+            self._context_index("semantic_index", VectorIndex, embedder=self.embedder)
+    
+    def _context_index(self, attribute: str, index_class: type[PassageIndex], **options) -> PassageIndex:
+        """The index stored in `attribute`, built over the context on first use."""
+        with self._search_lock:
+            index = getattr(self, attribute)
+            if index is None:
+                if isinstance(self._search_source, list):
+                    index = index_class.from_documents(self._search_source, **options)
+                else:
+                    index = index_class.from_text(self._search_source, self.line_index, **options)
+                setattr(self, attribute, index)
+            return index
+    
+    def _search(self, query: str, k: int = 10) -> list[dict[str, Any]]:
+        """Top `k` passages (or documents) of the context for `query`, ranked by BM25."""
+        return self._context_index("search_index", BM25Index).search(query, k)
+    
+    def _chunk(
+        self, text, max_tokens: int = DEFAULT_CHUNK_TOKENS, overlap: int = 0, by: str = "lines",
+    ) -> list[tuple[int, int]]:
+        """
+        (start, end) offsets of chunks of `text` (usually `context`) of at most `max_tokens`
+        tokens, cut at `by` boundaries. For a list, (start, end) ranges of documents.
+        """
+        if text is self._search_source:
+            if self._token_estimator is None:
+                self._token_estimator = estimator_for(text)
+            estimator, line_index = self._token_estimator, self.line_index
+        else:
+            estimator = line_index = None
+        if isinstance(text, (list, tuple)):
+            return chunk_documents(text, max_tokens, estimator)
+        return chunk_offsets(text, max_tokens, overlap, by, line_index, estimator)
+    
+    def _semantic_search(self, query: str, k: int = 10) -> list[dict[str, Any]]:
+        """Top `k` passages (or documents) of the context closest to `query` in embedding space."""
+        return self._context_index("semantic_index", VectorIndex, embedder=self.embedder).search(query, k)
+    
+    def _add_helpers(self, **helpers) -> None:
+        """
+        Inject context helpers into the namespace; they aren't listed as REPL variables unless
+        a cell rebinds their name.
+        """
+        self.globals.update(helpers)
+        self._injected.update(helpers)
+        self.helper_names.extend(name for name in helpers if name not in self.helper_names)
     
     def __del__(self):
         """Clean up temporary directory when object is destroyed"""
@@ -231,129 +617,143 @@ class REPLEnv:
     
     @contextmanager
     def _capture_output(self):
-        """Thread-safe context manager to capture stdout/stderr"""
+        """Thread-safe context manager to capture stdout/stderr of the current thread"""
         with self._lock:
-            # Store original streams
-            old_stdout = sys.stdout
-            old_stderr = sys.stderr
+            stdout_proxy, stderr_proxy = _install_thread_local_streams()
             
             # Create new buffers for this execution
-            stdout_buffer = io.StringIO()
-            stderr_buffer = io.StringIO()
+            if self.on_output is not None:
+                stdout_buffer = _StreamingBuffer("stdout", self.on_output)
+                stderr_buffer = _StreamingBuffer("stderr", self.on_output)
+            else:
+                stdout_buffer = io.StringIO()
+                stderr_buffer = io.StringIO()
             
             try:
-                # Redirect streams
-                sys.stdout = stdout_buffer
-                sys.stderr = stderr_buffer
+                # Redirect this thread's writes only
+                stdout_proxy._local.buffer = stdout_buffer
+                stderr_proxy._local.buffer = stderr_buffer
                 yield stdout_buffer, stderr_buffer
             finally:
-                # Restore original streams
-                sys.stdout = old_stdout
-                sys.stderr = old_stderr
-    
-    @contextmanager
-    def _temp_working_directory(self):
-        """Context manager to temporarily change working directory for REPL execution"""
-        old_cwd = os.getcwd()
-        try:
-            os.chdir(self.temp_dir)
-            yield
-        finally:
-            os.chdir(old_cwd)
+                stdout_proxy._local.buffer = None
+                stderr_proxy._local.buffer = None
     
     def code_execution(self, code) -> REPLResult:
         """
         Simple code execution "notebook-style" in a REPL environment.
         """
         start_time = time.time()
-        with self._capture_output() as (stdout_buffer, stderr_buffer):
-            with self._temp_working_directory():
-                try:
-                    # Split code into import statements and other code
-                    lines = code.split('\n')
-                    import_lines = []
-                    other_lines = []
-                    
-                    for line in lines:
-                        if line.startswith(('import ', 'from ')) and not line.startswith('#'):
-                            import_lines.append(line)
-                        else:
-                            other_lines.append(line)
-                    
-                    # Execute imports first in globals to make them available
-                    if import_lines:
-                        import_code = '\n'.join(import_lines)
-                        exec(import_code, self.globals, self.globals)
-                    
-                    # Execute the rest of the code. We also want to print last expressions
-                    if other_lines:
-                        other_code = '\n'.join(other_lines)
-                        # Create a combined namespace that includes both globals and locals
-                        combined_namespace = {**self.globals, **self.locals}
-                        
-                        # Check if the last non-comment line is an expression
-                        non_comment_lines = [line for line in other_lines if line and not line.startswith('#')]
-                        
-                        if non_comment_lines:
-                            last_line = non_comment_lines[-1]
-                            
-                            # Check if the last line looks like an expression (not a statement)
-                            is_expression = (
-                                not last_line.startswith(('import ', 'from ', 'def ', 'class ', 'if ', 'for ', 'while ', 'try:', 'with ', 'return ', 'yield ', 'break', 'continue', 'pass')) and
-                                '=' not in last_line.split('#')[0] and  # Not an assignment
-                                not last_line.endswith(':') and  # Not a control structure
-                                not last_line.startswith('print(')  # Not an explicit print
-                            )
-                            
-                            if is_expression:
-                                try:
-                                    # Execute all lines except the last one as statements
-                                    if len(non_comment_lines) > 1:
-                                        # Find where the last line starts in the original code
-                                        last_line_start = -1
-                                        for i, line in enumerate(other_lines):
-                                            if line == last_line:
-                                                last_line_start = i
-                                                break
-                                        
-                                        if last_line_start > 0:
-                                            statements_code = '\n'.join(other_lines[:last_line_start])
-                                            exec(statements_code, combined_namespace, combined_namespace)
-                                    
-                                    # Evaluate the last line as an expression and print the result
-                                    result = eval(last_line, combined_namespace, combined_namespace)
-                                    if result is not None:
-                                        print(repr(result))
-                                        
-                                except:
-                                    # If evaluation fails, fall back to normal execution
-                                    exec(other_code, combined_namespace, combined_namespace)
-                            else:
-                                # Execute normally as statements
-                                exec(other_code, combined_namespace, combined_namespace)
-                        else:
-                            # Only comments, execute normally (though it won't do anything)
-                            exec(other_code, combined_namespace, combined_namespace)
-                        
-                        # Update locals with any new variables created
-                        for key, value in combined_namespace.items():
-                            if key not in self.globals:
-                                self.locals[key] = value
-                    
-                    stdout_content = stdout_buffer.getvalue()
-                    stderr_content = stderr_buffer.getvalue()
-                except Exception as e:
-                    stderr_content = stderr_buffer.getvalue() + str(e)
-                    stdout_content = stdout_buffer.getvalue()
+        # Shallow snapshot of bindings (references only) to report what this cell changed
+        before = dict(self.globals)
+        
+        # The cell gets whatever is left of the session's time, capped by the per-cell limit
+        limits = self.limits
+        wall_limit, wall_limit_name = limits.cell_timeout, "cell wall-clock"
+        if limits.session_timeout is not None:
+            remaining = limits.session_timeout - self._session_elapsed
+            if wall_limit is None or remaining < wall_limit:
+                wall_limit, wall_limit_name = max(remaining, 0.0), "remaining session wall-clock"
+        self._cell_llm_calls = 0
+        budget_exceeded = None
         
+        with self._capture_output() as (stdout_buffer, stderr_buffer):
+            watchdog = None
+            if limits.watches_resources:
+                watchdog = CellWatchdog(limits, threading.get_ident(), wall_limit, wall_limit_name)
+            try:
+                if wall_limit is not None and wall_limit <= 0:
+                    raise ExecutionBudgetExceeded(f"session wall-clock limit of {limits.session_timeout:g}s exhausted")
+                
+                statements, last_expression = _compile_cell(code)
+                
+                with watchdog if watchdog is not None else nullcontext():
+                    # Run the cell once; a trailing expression is evaluated and echoed like a notebook
+                    if statements is not None:
+                        exec(statements, self.globals)
+                    if last_expression is not None:
+                        result = eval(last_expression, self.globals)
+                        if result is not None:
+                            print(repr(result))
+                    if watchdog is not None:
+                        watchdog.finish()
+                
+                stdout_content = stdout_buffer.getvalue()
+                stderr_content = stderr_buffer.getvalue()
+            except ExecutionBudgetExceeded as e:
+                budget_exceeded = (watchdog.reason if watchdog is not None else None) or str(e) or "budget exceeded"
+                stderr_content = stderr_buffer.getvalue() + (
+                    f"ExecutionBudgetExceeded: {budget_exceeded}. The cell was stopped; "
+                    f"variables assigned before that point are kept.\n"
+                )
+                stdout_content = stdout_buffer.getvalue()
+            except Exception as e:
+                stderr_content = stderr_buffer.getvalue() + "".join(traceback.format_exception_only(type(e), e))
+                stdout_content = stdout_buffer.getvalue()
+    
         end_time = time.time()
         execution_time = end_time - start_time
+        self._session_elapsed += execution_time
         
-        # Store output in locals for access
-        self.locals['_stdout'] = stdout_content
-        self.locals['_stderr'] = stderr_content
+        # Store output in the namespace for access
+        self.globals['_stdout'] = stdout_content
+        self.globals['_stderr'] = stderr_content
         
-        return REPLResult(stdout_content, stderr_content, self.locals.copy(), execution_time)
+        missing = object()
+        changed = [
+            key for key, value in self.globals.items()
+            if not self.locals.is_injected(key, value) and key not in ('_stdout', '_stderr')
+            and before.get(key, missing) is not value
+        ]
+        deleted = [key for key in before if key not in self.globals]
+        del before
+        
+        variables = self.variable_summarizer.summarize_all(self.locals)
+        
+        return REPLResult(
+            stdout_content, stderr_content, self.locals, execution_time,
+            changed, deleted, variables, budget_exceeded,
+        )
+    
+    async def acode_execution(self, code) -> REPLResult:
+        """
+        Async variant of `code_execution`. The cell runs in a worker thread so the event loop
+        stays free, and any `llm_query`/`llm_query_batch` calls it makes are awaited on the loop.
+        """
+        self._loop = asyncio.get_running_loop()
+        try:
+            return await asyncio.to_thread(self.code_execution, code)
+        finally:
+            self._loop = None
+    
+    def get_cost_summary(self) -> dict[str, Any]:
+        """Token usage, latency and cost of the sub-LM calls made from this REPL."""
+        return self.sub_rlm.cost_summary()
+    
+    def reset_session_budget(self) -> None:
+        """Start a new query on this environment: session-wide time and call budgets restart."""
+        self._session_elapsed = 0.0
+        self._session_llm_calls = 0
+    
+    def memory_usage(self) -> dict[str, Any]:
+        """
+        Approximate bytes held by each REPL variable (the context excluded), plus the resident
+        memory of the process running the REPL.
+        """
+        # Snapshot first: a query may be adding variables concurrently
+        items = list(self.globals.items())
+        variables = {
+            name: approximate_size(value) for name, value in items
+            if not self.locals.is_injected(name, value) and name != 'context' and not name.startswith('_')
+        }
+        return {
+            "variables": variables,
+            "variable_bytes": sum(variables.values()),
+            "rss_mb": current_rss_mb(),
+        }
     
-    def get_cost_summary(self):
-        raise NotImplementedError("Cost tracking is not implemented for the REPL Environment.")
+    def close(self) -> None:
+        """Drop the namespace and remove the temporary directory."""
+        self.globals.clear()
+        self.variable_summarizer = VariableSummarizer()
+        import shutil
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
@@ -1,3 +1,4 @@
+import asyncio
 from abc import ABC, abstractmethod
 
 class RLM(ABC):
@@ -5,6 +6,10 @@ class RLM(ABC):
     def completion(self, context: list[str] | str | dict[str, str], query: str) -> str:
         pass
 
+    async def acompletion(self, context: list[str] | str | dict[str, str], query: str) -> str:
+        """Async variant of `completion`. Defaults to running `completion` in a worker thread."""
+        return await asyncio.to_thread(self.completion, context, query)
+
     @abstractmethod
     def cost_summary(self) -> dict[str, float]:
         pass
@@ -2,17 +2,29 @@
 Simple Recursive Language Model (RLM) with REPL environment.
 """
 
+import os
+import uuid
+import asyncio
+import logging
 from typing import Dict, List, Optional, Any 
 
 from rlm import RLM
 from rlm.repl import REPLEnv
-from rlm.utils.llm import OpenAIClient
+from rlm.worker import ProcessREPLEnv
+from rlm.utils.llm import OpenAIClient, AsyncOpenAIClient
+from rlm.utils.cache import CompletionCache
+from rlm.utils.context import LazyText
+from rlm.utils.limits import ExecutionLimits
+from rlm.utils.usage import UsageTracker
+from rlm.utils.history import HistoryPolicy, history_policy_from_env
 from rlm.utils.prompts import DEFAULT_QUERY, next_action_prompt, build_system_prompt
 import rlm.utils.utils as utils
 
 from rlm.logger.root_logger import ColorfulLogger
 from rlm.logger.repl_logger import REPLEnvLogger
 
+_log = logging.getLogger(__name__)
+
 
 class RLM_REPL(RLM):
     """
@@ -26,11 +38,43 @@ class RLM_REPL(RLM):
                  max_iterations: int = 20,
                  depth: int = 0,
                  enable_logging: bool = False,
+                 cache: Optional[CompletionCache] = None,
+                 repl_backend: Optional[str] = None,
+                 limits: Optional[ExecutionLimits] = None,
+                 stream: Optional[bool] = None,
+                 history_policy: Optional[HistoryPolicy] = None,
+                 repl_env: Optional[REPLEnv | ProcessREPLEnv] = None,
+                 usage: Optional[UsageTracker] = None,
                  ):
         self.api_key = api_key
         self.model = model
         self.recursive_model = recursive_model
-        self.llm = OpenAIClient(api_key, model) # Replace with other client
+        self.cache = cache # Shared by root and sub-LM clients; None defers to RLM_CACHE
+        # Token usage and cost of every root and sub-LM call since the last reset()
+        self.usage = usage if usage is not None else UsageTracker()
+        # One provider prompt-cache key per instance, so its iterations hit the cached history prefix
+        self.prompt_cache_key = None if os.getenv("RLM_PROMPT_CACHE_KEY") == "off" else f"rlm-{uuid.uuid4().hex}"
+        self.llm = OpenAIClient(
+            api_key, model, cache=cache, usage=self.usage, usage_role="root", prompt_cache_key=self.prompt_cache_key,
+        ) # Replace with other client
+        self.async_llm = None # Created lazily by acompletion()
+        
+        # "inprocess" runs REPL code in this process, "process" in a pooled worker process
+        self.repl_backend = repl_backend or os.getenv("RLM_REPL_BACKEND", "inprocess")
+        if self.repl_backend not in ("inprocess", "process"):
+            raise ValueError(f"Unknown REPL backend: {self.repl_backend}")
+        
+        # Per-cell and per-session budgets for REPL code; defaults come from RLM_* env vars
+        self.limits = limits if limits is not None else ExecutionLimits.from_env()
+        
+        # Stream root responses and run each code block as soon as it is complete (RLM_STREAM=1)
+        self.stream = stream if stream is not None else os.getenv("RLM_STREAM", "").lower() in ("1", "true", "yes")
+        
+        # Compacts the message history after each iteration; defaults come from RLM_HISTORY_* env vars
+        self.history_policy = history_policy if history_policy is not None else history_policy_from_env()
+        
+        # An already loaded REPL environment (e.g. a ContextSession's) reused by every completion
+        self.shared_repl_env = repl_env
         
         # Track recursive call depth to prevent infinite loops
         self.repl_env = None
@@ -44,7 +88,7 @@ class RLM_REPL(RLM):
         self.messages = [] # Initialize messages list
         self.query = None
     
-    def setup_context(self, context: List[str] | str | List[Dict[str, str]], query: Optional[str] = None):
+    def setup_context(self, context: List[str] | str | LazyText | List[Dict[str, str]], query: Optional[str] = None):
         """
         Setup the context for the RLMClient.
 
@@ -58,22 +102,31 @@ class RLM_REPL(RLM):
         self.query = query
         self.logger.log_query_start(query)
 
-        # Initialize the conversation with the REPL prompt
-        self.messages = build_system_prompt()
-        self.logger.log_initial_messages(self.messages)
-        
-        # Initialize REPL environment with context data
-        context_data, context_str = utils.convert_context_for_repl(context)
+        if self.shared_repl_env is not None:
+            # The context is already loaded; only the conversation and query budgets start over
+            self.repl_env = self.shared_repl_env
+            self.repl_env.reset_session_budget()
+        else:
+            # Initialize REPL environment with context data
+            context_data, context_str = utils.convert_context_for_repl(context)
+            
+            repl_env_class = ProcessREPLEnv if self.repl_backend == "process" else REPLEnv
+            self.repl_env = repl_env_class(
+                context_json=context_data, 
+                context_str=context_str, 
+                recursive_model=self.recursive_model,
+                cache=self.cache,
+                limits=self.limits,
+                usage=self.usage,
+            )
         
-        self.repl_env = REPLEnv(
-            context_json=context_data, 
-            context_str=context_str, 
-            recursive_model=self.recursive_model,
-        )
+        # Initialize the conversation with the REPL prompt, listing the helpers this context has
+        self.messages = build_system_prompt(self.repl_env.helper_names)
+        self.logger.log_initial_messages(self.messages)
         
         return self.messages
 
-    def completion(self, context: List[str] | str | List[Dict[str, str]], query: Optional[str] = None) -> str:
+    def completion(self, context: List[str] | str | LazyText | List[Dict[str, str]], query: Optional[str] = None) -> str:
         """
         Given a query and a (potentially long) context, recursively call the LM
         to explore the context and provide an answer using a REPL environment.
@@ -84,23 +137,32 @@ class RLM_REPL(RLM):
         for iteration in range(self._max_iterations):
             
             # Query root LM to interact with REPL environment
-            response = self.llm.completion(self.messages + [next_action_prompt(query, iteration)])
+            if self.stream:
+                # Code blocks are executed while the response is still streaming in
+                response, self.messages = utils.process_streamed_response(
+                    self.llm.stream_completion(self.messages + [next_action_prompt(query, iteration)]),
+                    self.messages, self.repl_env, self.repl_env_logger, self.logger,
+                )
+            else:
+                response = self.llm.completion(self.messages + [next_action_prompt(query, iteration)])
             
             # Check for code blocks
             code_blocks = utils.find_code_blocks(response)
             self.logger.log_model_response(response, has_tool_calls=code_blocks is not None)
             
             # Process code execution or add assistant message
-            if code_blocks is not None:
+            if code_blocks is not None and not self.stream:
                 self.messages = utils.process_code_execution(
                     response, self.messages, self.repl_env, 
                     self.repl_env_logger, self.logger
                 )
-            else:
+            elif code_blocks is None:
                 # Add assistant message when there are no code blocks
                 assistant_message = {"role": "assistant", "content": "You responded with:\n" + response}
                 self.messages.append(assistant_message)
             
+            self.messages = self.history_policy.compact(self.messages)
+            
             # Check that model produced a final answer
             final_answer = utils.check_for_final_answer(
                 response, self.repl_env, self.logger,
@@ -113,20 +175,82 @@ class RLM_REPL(RLM):
 
             
         # If we reach here, no final answer was found in any iteration
-        print("No final answer found in any iteration")
+        _log.info("No final answer found in any iteration")
         self.messages.append(next_action_prompt(query, iteration, final_answer=True))
         final_answer = self.llm.completion(self.messages)
         self.logger.log_final_response(final_answer)
 
         return final_answer
     
+    async def acompletion(self, context: List[str] | str | LazyText | List[Dict[str, str]], query: Optional[str] = None) -> str:
+        """
+        Async variant of `completion`. Root LM calls are awaited on the running event loop,
+        and sub-LM calls made from REPL code are dispatched back onto it, so many RLM sessions
+        can share a single loop.
+        """
+        if self.async_llm is None:
+            self.async_llm = AsyncOpenAIClient(
+                self.api_key, self.model, cache=self.cache, usage=self.usage, usage_role="root",
+                prompt_cache_key=self.prompt_cache_key,
+            )
+        
+        # Context loading can be heavy for large inputs, keep it off the loop
+        self.messages = await asyncio.to_thread(self.setup_context, context, query)
+        
+        for iteration in range(self._max_iterations):
+            
+            if self.stream:
+                response, self.messages = await utils.aprocess_streamed_response(
+                    self.async_llm.stream_completion(self.messages + [next_action_prompt(query, iteration)]),
+                    self.messages, self.repl_env, self.repl_env_logger, self.logger,
+                )
+            else:
+                response = await self.async_llm.completion(self.messages + [next_action_prompt(query, iteration)])
+            
+            code_blocks = utils.find_code_blocks(response)
+            self.logger.log_model_response(response, has_tool_calls=code_blocks is not None)
+            
+            if code_blocks is not None and not self.stream:
+                self.messages = await utils.aprocess_code_execution(
+                    response, self.messages, self.repl_env, 
+                    self.repl_env_logger, self.logger
+                )
+            elif code_blocks is None:
+                assistant_message = {"role": "assistant", "content": "You responded with:\n" + response}
+                self.messages.append(assistant_message)
+            
+            self.messages = self.history_policy.compact(self.messages)
+            
+            final_answer = utils.check_for_final_answer(
+                response, self.repl_env, self.logger,
+            )
+
+            if final_answer:
+                self.logger.log_final_response(final_answer)
+                return final_answer
+
+        _log.info("No final answer found in any iteration")
+        self.messages.append(next_action_prompt(query, iteration, final_answer=True))
+        final_answer = await self.async_llm.completion(self.messages)
+        self.logger.log_final_response(final_answer)
+
+        return final_answer
+    
     def cost_summary(self) -> Dict[str, Any]:
-        """Get the cost summary of the Root LM + Sub-RLM Calls."""
-        raise NotImplementedError("Cost tracking not implemented for RLM REPL.")
+        """
+        Get the cost summary of the Root LM + Sub-RLM Calls.
+
+        Returns:
+            Token counts (prompt, completion, cached, reasoning), cost in USD, call counts and a
+            latency histogram, in total and broken down under "by_role" ("root" / "sub") and
+            "by_model".
+        """
+        return self.usage.summary()
 
     def reset(self):
         """Reset the (REPL) environment and message history."""
         self.repl_env = REPLEnv()
+        self.usage.reset()
         self.messages = []
         self.query = None
 
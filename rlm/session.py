@@ -0,0 +1,375 @@
+"""
+Reusable context sessions: load a context once, ask many queries.
+
+A `ContextSession` keeps one REPL environment with the context loaded and runs every query
+against it, so variables built by earlier queries (chunk lists, summaries, indexes) are still
+there for later ones. `SessionManager` keeps sessions for files, keyed by path and
+modification time, and closes the least recently used or idle ones.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Any, Optional
+
+from rlm.repl import REPLEnv
+from rlm.rlm_repl import RLM_REPL
+from rlm.worker import ProcessREPLEnv
+from rlm.utils.archives import close_context, load_file_context
+from rlm.utils.cache import CompletionCache
+from rlm.utils.context import LazyText
+from rlm.utils.limits import ExecutionLimits
+from rlm.utils.usage import UsageTracker
+from rlm.utils.variables import approximate_size
+import rlm.utils.utils as utils
+
+
+class ContextSession:
+    """
+    A context loaded into a REPL environment that stays alive across queries.
+
+    Queries on one session run one at a time, since they share a namespace. Call `close()`
+    (or use the session as a context manager) to release the REPL; a `LazyText` context (or
+    the `LazyText` documents of a list) is closed too when `owns_context` is set.
+    """
+
+    def __init__(
+        self,
+        context: Any,
+        model: str = "gpt-5",
+        recursive_model: str = "gpt-5",
+        cache: Optional[CompletionCache] = None,
+        repl_backend: Optional[str] = None,
+        limits: Optional[ExecutionLimits] = None,
+        owns_context: bool = False,
+    ):
+        self.context = context
+        self.model = model
+        self.recursive_model = recursive_model
+        self.cache = cache
+        self.repl_backend = repl_backend or os.getenv("RLM_REPL_BACKEND", "inprocess")
+        self.limits = limits if limits is not None else ExecutionLimits.from_env()
+        self.owns_context = owns_context
+        # Root and sub-LM usage across every query of the session
+        self.usage = UsageTracker()
+
+        context_data, context_str = utils.convert_context_for_repl(context)
+        repl_env_class = ProcessREPLEnv if self.repl_backend == "process" else REPLEnv
+        self.repl_env = repl_env_class(
+            context_json=context_data,
+            context_str=context_str,
+            recursive_model=recursive_model,
+            cache=cache,
+            limits=self.limits,
+            usage=self.usage,
+        )
+
+        self.created_at = self.last_used = time.time()
+        self.query_count = 0
+        self.closed = False
+        self._lock = threading.Lock()
+
+    def _rlm(self, max_iterations: int, enable_logging: bool) -> RLM_REPL:
+        return RLM_REPL(
+            model=self.model,
+            recursive_model=self.recursive_model,
+            max_iterations=max_iterations,
+            enable_logging=enable_logging,
+            cache=self.cache,
+            repl_backend=self.repl_backend,
+            limits=self.limits,
+            repl_env=self.repl_env,
+            usage=self.usage,
+        )
+
+    def _start_query(self) -> None:
+        if self.closed:
+            raise RuntimeError("Context session has been closed")
+        self.last_used = time.time()
+        self.query_count += 1
+
+    def query(self, query: str, max_iterations: int = 10, enable_logging: bool = False) -> str:
+        """
+        Answer `query` using the loaded context.
+
+        Args:
+            query: The question to ask
+            max_iterations: Maximum RLM iterations
+            enable_logging: Whether to show RLM iterations
+
+        Returns:
+            The answer from RLM
+        """
+        with self._lock:
+            self._start_query()
+            try:
+                return self._rlm(max_iterations, enable_logging).completion(context=self.context, query=query)
+            finally:
+                self.last_used = time.time()
+
+    async def _acquire_lock(self) -> None:
+        """Take the session lock without blocking the event loop."""
+        acquiring = asyncio.ensure_future(asyncio.to_thread(self._lock.acquire))
+        try:
+            await asyncio.shield(acquiring)
+        except asyncio.CancelledError:
+            # The thread takes the lock anyway; hand it back as soon as it has it
+            acquiring.add_done_callback(lambda task: task.cancelled() or self._lock.release())
+            raise
+
+    async def aquery(self, query: str, max_iterations: int = 10, enable_logging: bool = False) -> str:
+        """Async variant of `query`."""
+        await self._acquire_lock()
+        try:
+            self._start_query()
+            try:
+                return await self._rlm(max_iterations, enable_logging).acompletion(context=self.context, query=query)
+            finally:
+                self.last_used = time.time()
+        finally:
+            self._lock.release()
+
+    def cost_summary(self) -> dict[str, Any]:
+        """Token usage and cost of all queries on this session so far."""
+        return self.usage.summary()
+
+    def memory_usage(self) -> dict[str, Any]:
+        """
+        Approximate memory held by the session: the context (a `LazyText` is memory-mapped, so
+        its pages belong to the OS page cache rather than this process) and the REPL variables.
+        """
+        if self.closed:
+            return {"context_bytes": 0, "context_mapped_bytes": 0, "variables": {}, "variable_bytes": 0}
+        usage = self.repl_env.memory_usage()
+        if isinstance(self.context, LazyText):
+            usage["context_bytes"], usage["context_mapped_bytes"] = 0, self.context.size
+        elif isinstance(self.context, list):
+            mapped = [document for document in self.context if isinstance(document, LazyText)]
+            usage["context_mapped_bytes"] = sum(document.size for document in mapped)
+            usage["context_bytes"] = sum(
+                approximate_size(document) for document in self.context if not isinstance(document, LazyText)
+            )
+        else:
+            usage["context_bytes"], usage["context_mapped_bytes"] = approximate_size(self.context), 0
+        return usage
+
+    def close(self) -> None:
+        """Release the REPL environment. Waits for a running query to finish."""
+        with self._lock:
+            if self.closed:
+                return
+            self.closed = True
+            self.repl_env.close()
+            if self.owns_context:
+                close_context(self.context)
+
+    def __enter__(self) -> "ContextSession":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __repr__(self) -> str:
+        state = "closed" if self.closed else f"{self.query_count} queries"
+        return f"ContextSession(model={self.model!r}, {state})"
+
+
+class SessionManager:
+    """
+    Sessions for files, keyed by absolute path. A session is reused while the file's
+    modification time and size are unchanged, otherwise it is replaced. At most `max_sessions`
+    are kept, and sessions idle for more than `idle_timeout` seconds are closed; sessions with
+    a query in progress are never evicted, and a replaced one is closed once that query ends.
+
+    Extra keyword arguments are passed on to every `ContextSession`.
+    """
+
+    def __init__(self, max_sessions: int = 4, idle_timeout: Optional[float] = 900.0, **session_options):
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.session_options = session_options
+        self._sessions: "OrderedDict[str, tuple[tuple, ContextSession]]" = OrderedDict()
+        self._in_use: dict[int, int] = {}
+        # Sessions replaced or found stale while a query was using them, closed once released
+        self._retired: dict[int, ContextSession] = {}
+        # Path -> (file version, future of its session) while the file is being loaded
+        self._loading: dict[str, tuple[tuple, Future]] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, **session_options) -> "SessionManager":
+        """Limits from RLM_MAX_SESSIONS (default 4) and RLM_SESSION_IDLE_TIMEOUT seconds (default 900)."""
+        return cls(
+            max_sessions=int(os.getenv("RLM_MAX_SESSIONS", "4")),
+            idle_timeout=float(os.getenv("RLM_SESSION_IDLE_TIMEOUT", "900")),
+            **session_options,
+        )
+
+    def _evictable(self, session: ContextSession, now: float) -> bool:
+        return not self._in_use.get(id(session)) and (
+            len(self._sessions) > self.max_sessions
+            or (self.idle_timeout is not None and now - session.last_used > self.idle_timeout)
+        )
+
+    def _retire(self, session: ContextSession) -> list[ContextSession]:
+        """
+        Take a session that left the table out of service (caller holds the lock): returned
+        for closing if it's idle, otherwise closed when its last user releases it.
+        """
+        if self._in_use.get(id(session)):
+            self._retired[id(session)] = session
+            return []
+        return [session]
+
+    def _collect_evictions(self) -> list[ContextSession]:
+        """Remove over-limit and idle sessions from the table (caller holds the lock)."""
+        now = time.time()
+        evicted = []
+        for path in list(self._sessions):
+            _, session = self._sessions[path]
+            if self._evictable(session, now):
+                del self._sessions[path]
+                evicted.append(session)
+        return evicted
+
+    def _load(self, path: str, key: tuple, future: Future) -> ContextSession:
+        """Load `path` into a new session (outside the manager lock), register it and mark it in use."""
+        try:
+            context = load_file_context(path)
+            try:
+                session = ContextSession(context, owns_context=True, **self.session_options)
+            except BaseException:
+                close_context(context)
+                raise
+        except BaseException as e:
+            with self._lock:
+                if self._loading.get(path, (None, None))[1] is future:
+                    del self._loading[path]
+            future.set_exception(e)
+            raise
+        stale = []
+        with self._lock:
+            if self._loading.get(path, (None, None))[1] is future:
+                del self._loading[path]
+            previous = self._sessions.pop(path, None)
+            if previous is not None:
+                stale.extend(self._retire(previous[1]))
+            self._sessions[path] = (key, session)
+            self._in_use[id(session)] = 1
+            stale.extend(self._collect_evictions())
+        for old in stale:
+            old.close()
+        future.set_result(session)
+        return session
+
+    def _acquire(self, path: str) -> ContextSession:
+        """The current session for `path`, marked in use; loads it if needed."""
+        while True:
+            stat = os.stat(path)
+            key = (stat.st_mtime_ns, stat.st_size)
+            stale = []
+            load = None
+            with self._lock:
+                entry = self._sessions.get(path)
+                if entry is not None and (entry[0] != key or entry[1].closed):
+                    del self._sessions[path]
+                    if not entry[1].closed:
+                        stale.extend(self._retire(entry[1]))
+                    entry = None
+                if entry is not None:
+                    session = entry[1]
+                    self._sessions.move_to_end(path)
+                    self._in_use[id(session)] = self._in_use.get(id(session), 0) + 1
+                    stale.extend(self._collect_evictions())
+                else:
+                    # One load per path and version; concurrent callers wait for the same one
+                    loading = self._loading.get(path)
+                    if loading is None or loading[0] != key:
+                        loading = self._loading[path] = (key, Future())
+                        load = loading[1]
+                    future = loading[1]
+            for old in stale:
+                old.close()
+            if entry is not None:
+                return session
+            if load is not None:
+                return self._load(path, key, load)
+            session = future.result()
+            with self._lock:
+                # Unless it was already replaced or evicted, claim it; otherwise look again
+                if self._sessions.get(path, (None, None))[1] is session and not session.closed:
+                    self._sessions.move_to_end(path)
+                    self._in_use[id(session)] = self._in_use.get(id(session), 0) + 1
+                    return session
+
+    @contextmanager
+    def session(self, file_path: str | os.PathLike):
+        """
+        Use the session for `file_path`, loading the file if needed (see `load_file_context`:
+        compressed files and archives are decompressed as they are loaded). Loading happens
+        outside the manager lock, so other sessions stay usable meanwhile.
+        """
+        path = os.path.abspath(os.fspath(file_path))
+        session = self._acquire(path)
+        try:
+            yield session
+        finally:
+            self._release(session)
+
+    def _release(self, session: ContextSession) -> None:
+        retired = None
+        with self._lock:
+            self._in_use[id(session)] -= 1
+            if not self._in_use[id(session)]:
+                del self._in_use[id(session)]
+                retired = self._retired.pop(id(session), None)
+        if retired is not None:
+            retired.close()
+
+    def query_file(self, file_path: str | os.PathLike, query: str, **query_options) -> str:
+        with self.session(file_path) as session:
+            return session.query(query, **query_options)
+
+    async def aquery_file(self, file_path: str | os.PathLike, query: str, **query_options) -> str:
+        # Loading a new file maps and indexes it, keep that off the event loop
+        manager = self.session(file_path)
+        entering = asyncio.ensure_future(asyncio.to_thread(manager.__enter__))
+        try:
+            session = await asyncio.shield(entering)
+        except asyncio.CancelledError:
+            # The thread still acquires the session; release it as soon as it has
+            entering.add_done_callback(
+                lambda task: task.cancelled() or task.exception() is not None or manager.__exit__(None, None, None)
+            )
+            raise
+        try:
+            return await session.aquery(query, **query_options)
+        finally:
+            manager.__exit__(None, None, None)
+
+    def stats(self) -> list[dict[str, Any]]:
+        """Per-session accounting: path, query count, idle time and memory usage."""
+        with self._lock:
+            entries = [(path, session) for path, (_, session) in self._sessions.items()]
+        now = time.time()
+        return [
+            {
+                "path": path,
+                "queries": session.query_count,
+                "idle_seconds": now - session.last_used,
+                "memory": session.memory_usage(),
+            }
+            for path, session in entries
+        ]
+
+    def close_all(self) -> None:
+        with self._lock:
+            sessions = [session for _, session in self._sessions.values()] + list(self._retired.values())
+            self._sessions.clear()
+            self._retired.clear()
+        for session in sessions:
+            session.close()
@@ -0,0 +1,185 @@
+"""
+Loading compressed files and archives as contexts.
+
+`load_file_context` recognizes gzip, bzip2, xz and zstd files and zip and tar archives by
+their magic bytes and decompresses them as streams. A compressed text file becomes a single
+text context; the text members of an archive become a list of documents, each tagged with
+its member path as `.name`. Nothing is extracted to disk except texts too large to hold in
+memory, which are streamed into a temporary file and memory-mapped as a `LazyText`.
+
+zstd needs Python 3.14's `compression.zstd` or the optional `zstandard` package.
+"""
+
+import bz2
+import gzip
+import io
+import lzma
+import os
+import tarfile
+import zipfile
+from typing import BinaryIO, Optional
+
+from rlm.utils.context import Document, LazyText
+
+# Texts up to this size are decoded into memory, larger ones are spilled and memory-mapped
+MAX_IN_MEMORY_BYTES = 64 << 20
+
+_MAGIC = (
+    (b"\x1f\x8b", "gzip"),
+    (b"BZh", "bzip2"),
+    (b"\xfd7zXZ\x00", "xz"),
+    (b"\x28\xb5\x2f\xfd", "zstd"),
+    (b"PK\x03\x04", "zip"),
+    (b"PK\x05\x06", "zip"),  # Empty archive
+)
+_TAR_MAGIC_OFFSET = 257
+_BINARY_SAMPLE = 8192
+
+
+def _is_tar(head: bytes) -> bool:
+    return head[_TAR_MAGIC_OFFSET:_TAR_MAGIC_OFFSET + 5] == b"ustar"
+
+
+def detect_format(path: str) -> Optional[str]:
+    """"gzip", "bzip2", "xz", "zstd", "zip" or "tar" from the file's first bytes, else None."""
+    with open(path, "rb") as file:
+        head = file.read(512)
+    for magic, name in _MAGIC:
+        if head.startswith(magic):
+            return name
+    return "tar" if _is_tar(head) else None
+
+
+def _zstd_reader(file: BinaryIO) -> BinaryIO:
+    try:
+        from compression import zstd
+        return zstd.ZstdFile(file)
+    except ImportError:
+        pass
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError("Reading .zst files requires the zstandard package (pip install zstandard)") from None
+    return zstandard.ZstdDecompressor().stream_reader(file, read_across_frames=True)
+
+
+def _decompressor(file: BinaryIO, compression: str) -> BinaryIO:
+    if compression == "gzip":
+        return gzip.GzipFile(fileobj=file)
+    if compression == "bzip2":
+        return bz2.BZ2File(file)
+    if compression == "xz":
+        return lzma.LZMAFile(file)
+    return _zstd_reader(file)
+
+
+class _Prefixed(io.RawIOBase):
+    """A read-only stream yielding `head`, then the rest of `stream`."""
+
+    def __init__(self, head: bytes, stream: BinaryIO):
+        self.head = head
+        self.stream = stream
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        if self.head:
+            count = min(len(buffer), len(self.head))
+            buffer[:count] = self.head[:count]
+            self.head = self.head[count:]
+            return count
+        data = self.stream.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+
+def _read_exactly(stream: BinaryIO, size: int) -> bytes:
+    """Up to `size` bytes of `stream`, fewer only at EOF (decompressors may return short reads)."""
+    data = stream.read(size)
+    if len(data) == size or not data:
+        return data
+    data = bytearray(data)
+    while len(data) < size:
+        piece = stream.read(size - len(data))
+        if not piece:
+            break
+        data += piece
+    return bytes(data)
+
+
+def _read_text(stream: BinaryIO, name: str, max_in_memory: int, skip_binary: bool = False) -> Optional[str | LazyText]:
+    """
+    Decode `stream` as UTF-8 (bad bytes become U+FFFD): a `Document` if it fits in
+    `max_in_memory` bytes, otherwise a `LazyText` over a temporary copy. With `skip_binary`,
+    returns None for content that looks binary (NUL bytes near the start).
+    """
+    head = _read_exactly(stream, max_in_memory + 1)
+    if skip_binary and b"\x00" in head[:_BINARY_SAMPLE]:
+        return None
+    if len(head) <= max_in_memory:
+        return Document(head.decode("utf-8", errors="replace"), name)
+    return LazyText.from_stream(io.BufferedReader(_Prefixed(head, stream)), name=name)
+
+
+def _tar_documents(stream: BinaryIO, max_in_memory: int) -> list:
+    documents = []
+    # Streaming mode reads members in order, without seeking back
+    with tarfile.open(fileobj=stream, mode="r|") as archive:
+        for member in archive:
+            if not member.isfile():
+                continue
+            member_stream = archive.extractfile(member)
+            document = _read_text(member_stream, member.name, max_in_memory, skip_binary=True)
+            if document is not None:
+                documents.append(document)
+    return documents
+
+
+def _zip_documents(path: str, max_in_memory: int) -> list:
+    documents = []
+    with zipfile.ZipFile(path) as archive:
+        for info in archive.infolist():
+            if info.is_dir():
+                continue
+            with archive.open(info) as member_stream:
+                document = _read_text(member_stream, info.filename, max_in_memory, skip_binary=True)
+            if document is not None:
+                documents.append(document)
+    return documents
+
+
+def load_file_context(path: str, max_in_memory: int = MAX_IN_MEMORY_BYTES) -> str | LazyText | list:
+    """
+    Context for the file at `path`. Plain files up to `max_in_memory` bytes are read into a
+    string, larger ones are memory-mapped as a `LazyText`; compressed files are decompressed
+    as a stream into a text (a string or, if larger, a `LazyText`); zip and tar archives
+    (compressed or not) give a list of their text members, in archive order, each with its
+    member path as `.name`. Binary members are skipped.
+    """
+    file_format = detect_format(path)
+    if file_format is None:
+        if os.path.getsize(path) <= max_in_memory:
+            with open(path, "rb") as file:
+                return _read_text(file, path, max_in_memory)
+        return LazyText(path)
+    if file_format == "zip":
+        return _zip_documents(path, max_in_memory)
+
+    with open(path, "rb") as file:
+        if file_format == "tar":
+            return _tar_documents(file, max_in_memory)
+        with _decompressor(file, file_format) as stream:
+            # A compressed tar is recognized from its first decompressed block
+            head = _read_exactly(stream, 512)
+            prefixed = io.BufferedReader(_Prefixed(head, stream))
+            if _is_tar(head):
+                return _tar_documents(prefixed, max_in_memory)
+            return _read_text(prefixed, path, max_in_memory)
+
+
+def close_context(context) -> None:
+    """Close the memory-mapped texts of a context returned by `load_file_context`."""
+    for text in context if isinstance(context, list) else [context]:
+        if isinstance(text, LazyText):
+            text.close()
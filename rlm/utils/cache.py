@@ -0,0 +1,240 @@
+"""
+Content-addressed response cache for LLM completions.
+
+Responses are keyed by a hash of (model, messages, request kwargs), so an identical request
+sent twice only reaches the network once. Two tiers are provided: an in-memory LRU and an
+on-disk SQLite store, which can be stacked with `TieredCache`.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+# Request options that don't change the response content and so are left out of the key
+_NON_SEMANTIC_KWARGS = {"timeout", "extra_headers"}
+
+
+def make_cache_key(model: str, messages: list[dict[str, str]], kwargs: dict[str, Any]) -> str:
+    """Hash the model, messages and content-affecting kwargs into a stable hex key."""
+    payload = {
+        "model": model,
+        "messages": messages,
+        "kwargs": {k: v for k, v in kwargs.items() if k not in _NON_SEMANTIC_KWARGS},
+    }
+    encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class CompletionCache:
+    """
+    Base class for completion caches. Subclasses implement `_get`, `_set` and `__len__`;
+    hit/miss counting is handled here.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._stats_lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        value = self._get(key)
+        with self._stats_lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key: str, value: str) -> None:
+        self._set(key, value)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self),
+        }
+
+    def _get(self, key: str) -> Optional[str]:
+        raise NotImplementedError
+
+    def _set(self, key: str, value: str) -> None:
+        raise NotImplementedError
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+
+class MemoryCache(CompletionCache):
+    """In-process LRU cache with optional TTL (in seconds)."""
+
+    def __init__(self, max_entries: int = 1024, ttl: Optional[float] = None):
+        super().__init__()
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            created_at, value = entry
+            if self.ttl is not None and time.time() - created_at > self.ttl:
+                del self._entries[key]
+                self.evictions += 1
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def _set(self, key: str, value: str) -> None:
+        with self._lock:
+            self._entries[key] = (time.time(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteCache(CompletionCache):
+    """
+    On-disk cache backed by a single SQLite file, shared across processes. Entries expire
+    after `ttl` seconds, and the least recently used ones are dropped beyond `max_entries`.
+    """
+
+    def __init__(self, path: str, max_entries: int = 100_000, ttl: Optional[float] = None):
+        super().__init__()
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS completions ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " accessed_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS completions_accessed ON completions (accessed_at)"
+            )
+
+    def _get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM completions WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, created_at = row
+            if self.ttl is not None and now - created_at > self.ttl:
+                self._conn.execute("DELETE FROM completions WHERE key = ?", (key,))
+                self.evictions += 1
+                return None
+            self._conn.execute(
+                "UPDATE completions SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+            return value
+
+    def _set(self, key: str, value: str) -> None:
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO completions (key, value, created_at, accessed_at)"
+                " VALUES (?, ?, ?, ?)",
+                (key, value, now, now),
+            )
+            if self.ttl is not None:
+                removed = self._conn.execute(
+                    "DELETE FROM completions WHERE created_at < ?", (now - self.ttl,)
+                ).rowcount
+                self.evictions += max(removed, 0)
+            overflow = self._conn.execute("SELECT COUNT(*) FROM completions").fetchone()[0] - self.max_entries
+            if overflow > 0:
+                self._conn.execute(
+                    "DELETE FROM completions WHERE key IN ("
+                    " SELECT key FROM completions ORDER BY accessed_at ASC LIMIT ?)",
+                    (overflow,),
+                )
+                self.evictions += overflow
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM completions").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class TieredCache(CompletionCache):
+    """Memory tier in front of a disk tier. Disk hits are promoted into memory."""
+
+    def __init__(self, memory: MemoryCache, disk: SQLiteCache):
+        super().__init__()
+        self.memory = memory
+        self.disk = disk
+
+    def _get(self, key: str) -> Optional[str]:
+        value = self.memory.get(key)
+        if value is None:
+            value = self.disk.get(key)
+            if value is not None:
+                self.memory.set(key, value)
+        return value
+
+    def _set(self, key: str, value: str) -> None:
+        self.memory.set(key, value)
+        self.disk.set(key, value)
+
+    def stats(self) -> dict[str, Any]:
+        stats = super().stats()
+        stats["memory"] = self.memory.stats()
+        stats["disk"] = self.disk.stats()
+        return stats
+
+    def __len__(self) -> int:
+        return len(self.disk)
+
+
+_env_cache: Optional[CompletionCache] = None
+_env_cache_lock = threading.Lock()
+
+def cache_from_env() -> Optional[CompletionCache]:
+    """
+    Build (once per process) the cache selected by the RLM_CACHE environment variable:
+    unset or "off" disables caching, "memory" keeps an in-process LRU, and any other value
+    is taken as the path of a SQLite file used behind an in-memory tier.
+    RLM_CACHE_TTL optionally sets the expiry in seconds.
+    """
+    global _env_cache
+    setting = os.getenv("RLM_CACHE", "").strip()
+    if not setting or setting.lower() == "off":
+        return None
+
+    with _env_cache_lock:
+        if _env_cache is None:
+            ttl = float(os.environ["RLM_CACHE_TTL"]) if os.getenv("RLM_CACHE_TTL") else None
+            if setting.lower() == "memory":
+                _env_cache = MemoryCache(ttl=ttl)
+            else:
+                _env_cache = TieredCache(MemoryCache(ttl=ttl), SQLiteCache(os.path.expanduser(setting), ttl=ttl))
+        return _env_cache
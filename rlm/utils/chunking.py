@@ -0,0 +1,196 @@
+"""
+Token-aware chunking of the context, exposed in the REPL as `chunk()`.
+
+Chunk sizes are given in tokens. Token counts are estimated from a chars-per-token ratio
+calibrated once on samples of the context, so code, prose and CJK text get realistic sizes
+without a tokenizer download or a network call. Chunks are returned as (start, end) offsets
+cut at line, paragraph, header or file boundaries, so nothing is copied until a chunk is
+actually sliced out.
+"""
+
+import math
+import re
+from bisect import bisect_left, bisect_right
+from typing import Callable, Iterator, Optional, Sequence
+
+from rlm.utils.codebase import FILE_BANNER_PATTERN
+from rlm.utils.context import LazyText
+from rlm.utils.lines import LineIndex
+from rlm.utils.search import _count_newlines, _document_text
+
+_WORD_PATTERN = re.compile(r"[A-Za-z]+")
+_NUMBER_PATTERN = re.compile(r"[0-9]{1,3}")
+_BREAK_PATTERN = re.compile(r"[ \t]*\n[ \t\n]*|[ \t]{2,}")
+_SYMBOL_PATTERN = re.compile(r"[^\sA-Za-z0-9]")
+
+# Line pattern marking a chunk boundary, and how many lines after the match the boundary is
+_BOUNDARIES = {
+    "paragraphs": (r"^[ \t]*\r?$", 1),
+    "headers": (r"^#{1,6}[ \t]", 0),
+    "files": (FILE_BANNER_PATTERN, 0),
+}
+
+DEFAULT_CHUNK_TOKENS = 100_000
+
+
+def heuristic_token_count(text: str) -> int:
+    """
+    Approximate BPE token count: a token per short word (long words split every ~4
+    letters), per group of up to 3 digits, per symbol or non-ASCII character, and per line
+    break or run of indentation. Single spaces are merged into the next word.
+    """
+    words = _WORD_PATTERN.findall(text)
+    return (
+        len(words)
+        + sum((len(word) - 3) // 4 for word in words if len(word) > 6)
+        + len(_NUMBER_PATTERN.findall(text))
+        + len(_BREAK_PATTERN.findall(text))
+        + len(_SYMBOL_PATTERN.findall(text))
+    )
+
+
+class TokenEstimator:
+    """Converts between characters and tokens with a fixed chars-per-token ratio."""
+
+    def __init__(self, chars_per_token: float = 4.0):
+        self.chars_per_token = chars_per_token
+
+    @classmethod
+    def calibrate(
+        cls,
+        text: str | LazyText,
+        count_tokens: Optional[Callable[[str], int]] = None,
+        sample_chars: int = 1 << 16,
+        samples: int = 3,
+    ) -> "TokenEstimator":
+        """
+        Ratio measured on `samples` evenly spaced windows of `text`, counted with
+        `count_tokens` (a real tokenizer, if one is available) or `heuristic_token_count`.
+        """
+        count_tokens = count_tokens or heuristic_token_count
+        length = len(text)
+        chars = tokens = 0
+        for sample in range(samples if length > sample_chars else 1):
+            start = (length - sample_chars) * sample // max(samples - 1, 1) if length > sample_chars else 0
+            piece = text[start:start + sample_chars]
+            chars += len(piece)
+            tokens += count_tokens(piece)
+        if not tokens:
+            return cls()
+        # Keep degenerate samples (all whitespace, one huge word) from skewing the ratio
+        return cls(min(max(chars / tokens, 1.0), 8.0))
+
+    def count(self, text: str | int) -> int:
+        """Estimated tokens in `text`, or in that many characters."""
+        chars = text if isinstance(text, int) else len(text)
+        return math.ceil(chars / self.chars_per_token)
+
+    def chars_for(self, tokens: int) -> int:
+        """Characters that fit in `tokens`."""
+        return int(tokens * self.chars_per_token)
+
+
+def estimator_for(context: str | LazyText | list) -> TokenEstimator:
+    """`TokenEstimator` calibrated on a text, or on the first documents of a list."""
+    if isinstance(context, (list, tuple)):
+        context = "\n".join(_document_text(document) for document in context[:100])
+    return TokenEstimator.calibrate(context)
+
+
+def _matching_lines(text: str | LazyText, pattern: str) -> Iterator[int]:
+    """Numbers of the lines where `pattern` (anchored with `^`) matches, in one pass."""
+    if isinstance(text, LazyText):
+        buffer, newline, regex = text.buffer, b"\n", re.compile(pattern.encode("utf-8"), re.MULTILINE)
+    else:
+        buffer, newline, regex = text, "\n", re.compile(pattern, re.MULTILINE)
+    line = counted = 0
+    for match in regex.finditer(buffer):
+        line += _count_newlines(buffer, newline, counted, match.start())
+        counted = match.start()
+        yield line
+
+
+def _boundaries(text: str | LazyText, line_index: LineIndex, by: str) -> Sequence[int]:
+    if by == "lines":
+        return line_index.offsets
+    if by not in _BOUNDARIES:
+        raise ValueError(f"by must be one of 'lines', {', '.join(map(repr, _BOUNDARIES))}, got {by!r}")
+    pattern, shift = _BOUNDARIES[by]
+    offsets = line_index.offsets
+    starts = {0}
+    starts.update(offsets[line + shift] for line in _matching_lines(text, pattern) if line + shift < len(offsets))
+    return sorted(starts)
+
+
+def chunk_offsets(
+    text: str | LazyText,
+    max_tokens: int = DEFAULT_CHUNK_TOKENS,
+    overlap: int = 0,
+    by: str = "lines",
+    line_index: Optional[LineIndex] = None,
+    estimator: Optional[TokenEstimator] = None,
+) -> list[tuple[int, int]]:
+    """
+    Split `text` into chunks of at most `max_tokens` (estimated) tokens.
+
+    Chunks end at the last `by` boundary that fits: "lines", "paragraphs" (after blank
+    lines), "headers" (Markdown `#` headers) or "files" (file banners of concatenated
+    codebase dumps). A unit larger than `max_tokens` is cut at a line boundary, and a single
+    longer line at `max_tokens`. With `overlap`, each chunk starts on the first line within
+    `overlap` tokens before the end of the previous one.
+
+    Returns:
+        (start, end) character offsets; `text[start:end]` is the chunk.
+    """
+    line_index = line_index if line_index is not None else LineIndex(text)
+    estimator = estimator if estimator is not None else TokenEstimator.calibrate(text)
+    max_chars = max(estimator.chars_for(max_tokens), 1)
+    overlap_chars = estimator.chars_for(overlap)
+    if overlap_chars >= max_chars:
+        raise ValueError("overlap must be smaller than max_tokens")
+    boundaries = _boundaries(text, line_index, by)
+    lines, length = line_index.offsets, line_index.length
+
+    chunks = []
+    start = 0
+    while start < length:
+        limit = start + max_chars
+        if limit >= length:
+            chunks.append((start, length))
+            break
+        end = boundaries[bisect_right(boundaries, limit) - 1]
+        if end <= start:
+            end = lines[bisect_right(lines, limit) - 1]
+            if end <= start:
+                end = limit
+        chunks.append((start, end))
+        next_start = end
+        if overlap_chars:
+            position = bisect_left(lines, end - overlap_chars)
+            if position < len(lines) and start < lines[position] < end:
+                next_start = lines[position]
+        start = next_start
+    return chunks
+
+
+def chunk_documents(
+    documents: list,
+    max_tokens: int = DEFAULT_CHUNK_TOKENS,
+    estimator: Optional[TokenEstimator] = None,
+) -> list[tuple[int, int]]:
+    """
+    Pack consecutive documents into groups of at most `max_tokens` (estimated) tokens; a
+    larger document forms a group of its own. Returns (start, end) document index ranges.
+    """
+    estimator = estimator if estimator is not None else estimator_for(documents)
+    chunks = []
+    start = tokens = 0
+    for index, document in enumerate(documents):
+        size = estimator.count(len(_document_text(document)))
+        if index > start and tokens + size > max_tokens:
+            chunks.append((start, index))
+            start, tokens = index, 0
+        tokens += size
+    if start < len(documents):
+        chunks.append((start, len(documents)))
+    return chunks
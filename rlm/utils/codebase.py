@@ -0,0 +1,224 @@
+"""
+File tables for concatenated codebase dumps.
+
+Tools that flatten a repository into one text file mark every file with a banner: the
+`// FILE: path` blocks of `Codebase.txt`, repomix's plain, XML and Markdown styles, or the
+`==> path <==` headers of `head`/`tail` over many files. `CodebaseIndex.detect` recognizes
+these formats and records where each file's content starts and ends, so the REPL can list,
+glob and read individual files instead of treating the dump as one opaque string.
+
+A tar (or zip) archive isn't a text dump: its headers are binary and its members aren't
+line-aligned. `load_file_context` already splits it into one named document per member, and
+`CodebaseIndex.from_documents` builds the same file table over those documents.
+"""
+
+import fnmatch
+import os
+import re
+from dataclasses import dataclass
+from typing import Optional
+
+from rlm.utils.context import LazyText
+from rlm.utils.lines import LineIndex
+from rlm.utils.search import _count_newlines
+
+_PATH = r"[ \t]*(?P<path>[^\r\n]+?)[ \t]*\r?\n"
+
+
+@dataclass(frozen=True)
+class _DumpFormat:
+    name: str
+    banner: str  # Multiline regex matching a whole banner, capturing the file path as "path"
+    footer: Optional[str] = None  # Line closing each file's content, if the format has one
+
+
+_FORMATS = (
+    _DumpFormat("banner", r"^(?://[ \t]*={3,}[ \t]*\r?\n)?//[ \t]*FILE:" + _PATH + r"(?://[ \t]*={3,}[ \t]*\r?\n)?"),
+    _DumpFormat("repomix", r"^={16,}\r?\nFile:" + _PATH + r"={16,}\r?\n"),
+    _DumpFormat("repomix-xml", r'^<file path="(?P<path>[^"\r\n]+)">\r?\n', footer="</file>"),
+    _DumpFormat("repomix-markdown", r"^## File:" + _PATH + r"```[^\r\n]*\r?\n", footer="```"),
+    _DumpFormat("head", r"^==> (?P<path>[^\r\n]+?) <==\r?\n"),
+)
+
+# Start of any known file banner, for splitting a dump on file boundaries
+FILE_BANNER_PATTERN = "|".join(
+    f"(?:{dump_format.banner.replace('(?P<path>', '(?:')})" for dump_format in _FORMATS
+)
+
+_DETECT_SAMPLE = 1 << 18
+
+LANGUAGES = {
+    ".py": "python", ".pyi": "python", ".rs": "rust", ".go": "go", ".java": "java", ".kt": "kotlin",
+    ".scala": "scala", ".c": "c", ".h": "c", ".cc": "cpp", ".cpp": "cpp", ".hpp": "cpp", ".cs": "csharp",
+    ".js": "javascript", ".mjs": "javascript", ".cjs": "javascript", ".jsx": "javascript",
+    ".ts": "typescript", ".tsx": "typescript", ".rb": "ruby", ".php": "php", ".swift": "swift",
+    ".m": "objective-c", ".sh": "shell", ".bash": "shell", ".zsh": "shell", ".ps1": "powershell",
+    ".sql": "sql", ".html": "html", ".css": "css", ".scss": "scss", ".vue": "vue", ".svelte": "svelte",
+    ".md": "markdown", ".rst": "rst", ".txt": "text", ".json": "json", ".yaml": "yaml", ".yml": "yaml",
+    ".toml": "toml", ".ini": "ini", ".cfg": "ini", ".xml": "xml", ".proto": "protobuf", ".lua": "lua",
+    ".r": "r", ".jl": "julia", ".ex": "elixir", ".exs": "elixir", ".erl": "erlang", ".hs": "haskell",
+    ".dart": "dart", ".zig": "zig",
+}
+_LANGUAGE_FILENAMES = {"dockerfile": "dockerfile", "makefile": "makefile", "cmakelists.txt": "cmake"}
+
+
+def language_of(path: str) -> Optional[str]:
+    name = os.path.basename(path).lower()
+    if name in _LANGUAGE_FILENAMES:
+        return _LANGUAGE_FILENAMES[name]
+    return LANGUAGES.get(os.path.splitext(name)[1])
+
+
+def _normalize_path(path: str) -> str:
+    path = path.strip().replace("\\", "/")
+    while path.startswith("./"):
+        path = path[2:]
+    return path.lstrip("/")
+
+
+@dataclass
+class CodebaseFile:
+    """
+    A file of a dump: its content is `context[start:end]`, starting on line `line`. For an
+    archive, `document` is the index of the member, whose content is `context[document]`.
+    """
+    path: str
+    start: int
+    end: int
+    line: int
+    lines: int
+    language: Optional[str]
+    document: Optional[int] = None
+
+    @property
+    def size(self) -> int:
+        """Length of the content in characters."""
+        return self.end - self.start
+
+
+class CodebaseIndex:
+    """Table of the files of a concatenated dump, in the order they appear."""
+
+    def __init__(self, text: str | LazyText | list, files: list[CodebaseFile], dump_format: str):
+        self.text = text
+        self.files = files
+        self.format = dump_format
+        self._by_path = {_normalize_path(entry.path): entry for entry in files}
+
+    @classmethod
+    def detect(cls, text: str | LazyText, line_index: Optional[LineIndex] = None) -> Optional["CodebaseIndex"]:
+        """
+        Index `text` if it looks like a dump of at least two files in a known format (judged
+        from its beginning), otherwise return None.
+        """
+        if isinstance(text, LazyText):
+            sample = text.buffer[:_DETECT_SAMPLE].decode("utf-8", errors="ignore")
+        else:
+            sample = text[:_DETECT_SAMPLE]
+        counts = [
+            (len(re.findall(dump_format.banner, sample, re.MULTILINE)), dump_format) for dump_format in _FORMATS
+        ]
+        count, dump_format = max(counts, key=lambda item: item[0])
+        if not count:
+            return None
+        index = cls.parse(text, dump_format.name, line_index)
+        return index if len(index.files) >= 2 else None
+
+    @classmethod
+    def from_documents(cls, documents: list) -> Optional["CodebaseIndex"]:
+        """
+        Index a list context whose documents carry their file path as `.name` (the members of
+        an archive loaded by `load_file_context`), if it has at least two of them; otherwise None.
+        """
+        files = []
+        for number, document in enumerate(documents):
+            path = getattr(document, "name", None)
+            if not isinstance(path, str) or not isinstance(document, (str, LazyText)):
+                continue
+            lines = len(document.line_offsets) if isinstance(document, LazyText) else document.count("\n") + 1
+            files.append(CodebaseFile(
+                path=path, start=0, end=len(document), line=0, lines=lines,
+                language=language_of(path), document=number,
+            ))
+        return cls(documents, files, "archive") if len(files) >= 2 else None
+
+    @classmethod
+    def parse(cls, text: str | LazyText, dump_format: str, line_index: Optional[LineIndex] = None) -> "CodebaseIndex":
+        """Index `text` as a dump in the named format, in one pass over the raw text."""
+        dump_format = next(candidate for candidate in _FORMATS if candidate.name == dump_format)
+        line_index = line_index if line_index is not None else LineIndex(text)
+        if isinstance(text, LazyText):
+            buffer, newline = text.buffer, b"\n"
+            regex = re.compile(dump_format.banner.encode("utf-8"), re.MULTILINE)
+            decode = lambda data: data.decode("utf-8", errors="replace")
+        else:
+            buffer, newline = text, "\n"
+            regex = re.compile(dump_format.banner, re.MULTILINE)
+            decode = lambda data: data
+
+        # (path, banner line, first content line) of every file
+        banners = []
+        line = counted = 0
+        for match in regex.finditer(buffer):
+            line += _count_newlines(buffer, newline, counted, match.start())
+            counted = match.start()
+            banners.append((decode(match.group("path")), line, line + match.group(0).count(newline)))
+
+        offsets, length = line_index.offsets, line_index.length
+        files = []
+        for number, (path, _, content_line) in enumerate(banners):
+            next_line = banners[number + 1][1] if number + 1 < len(banners) else len(offsets)
+            start = offsets[content_line] if content_line < len(offsets) else length
+            end = offsets[next_line] if next_line < len(offsets) else length
+            if dump_format.footer and end > start:
+                # Cut at the footer; after the last file it can be followed by a closing wrapper
+                tail = text[max(start, end - 256):end]
+                position = tail.rfind(dump_format.footer)
+                if position != -1:
+                    end -= len(tail) - position
+            files.append(CodebaseFile(
+                path=path,
+                start=start,
+                end=max(end, start),
+                line=content_line,
+                lines=max(next_line - content_line, 0),
+                language=language_of(path),
+            ))
+        return cls(text, files, dump_format.name)
+
+    def __len__(self) -> int:
+        return len(self.files)
+
+    def get(self, path: str) -> CodebaseFile:
+        """The file at `path`, also accepting a unique suffix such as "src/main.rs"."""
+        normalized = _normalize_path(path)
+        entry = self._by_path.get(normalized)
+        if entry is not None:
+            return entry
+        matches = [entry for key, entry in self._by_path.items() if key.endswith("/" + normalized)]
+        if len(matches) == 1:
+            return matches[0]
+        if matches:
+            raise FileNotFoundError(f"{path!r} is ambiguous: {[entry.path for entry in matches[:10]]}")
+        raise FileNotFoundError(f"No file {path!r} in the context; use find_files() to look for it")
+
+    def read_file(self, path: str) -> str:
+        """Content of the file at `path`."""
+        entry = self.get(path)
+        if entry.document is not None:
+            return str(self.text[entry.document])
+        return self.text[entry.start:entry.end]
+
+    def find_files(self, pattern: str) -> list[CodebaseFile]:
+        """
+        Files whose path matches the glob `pattern` ("*" also matches "/"); a pattern without
+        "/" is matched against file names too, so "*.rs" finds Rust files at any depth.
+        """
+        pattern = _normalize_path(pattern)
+        match_names = "/" not in pattern
+        matches = []
+        for entry in self.files:
+            path = _normalize_path(entry.path)
+            if fnmatch.fnmatchcase(path, pattern) or (match_names and fnmatch.fnmatchcase(path.rsplit("/", 1)[-1], pattern)):
+                matches.append(entry)
+        return matches
@@ -0,0 +1,328 @@
+"""
+Context containers for the REPL environment.
+
+`LazyText` exposes a UTF-8 text file through a read-only memory map, so a multi-GB context
+can be sliced and searched from the REPL without ever holding a decoded copy in memory.
+`Document` is a plain string that also carries the name it had in its source.
+"""
+
+import codecs
+import mmap
+import os
+import shutil
+import tempfile
+from array import array
+from bisect import bisect_right
+from itertools import accumulate, islice
+from typing import BinaryIO, Iterator, Optional, Sequence
+
+# Line tables longer than this many entries (8 bytes each) are spilled to a temporary file
+_SPILL_LINES = 1 << 22
+
+
+class LazyText:
+    """
+    Read-only, str-like view of a UTF-8 text file backed by `mmap`.
+
+    Supports `len()`, indexing and slicing by character, `in`, `find()` and `count()` directly
+    on the mapped bytes. Any other `str` method (e.g. `split`, `lower`) falls back to decoding
+    the whole file, as does `str(text)`.
+
+    Character offsets are resolved through a sparse table of block boundaries. The same single
+    pass over the file, when it is opened, records where every line starts (`line_offsets`);
+    for very long files that table is spilled to an anonymous temporary file and memory-mapped
+    too, so memory stays bounded whatever the file size. Blocks end on UTF-8 character
+    boundaries and are decoded independently, so invalid bytes decode to U+FFFD, one per bad
+    sequence, exactly as when decoding the whole file.
+    """
+
+    def __init__(self, path: str | os.PathLike, block_size: int = 1 << 20, name: Optional[str] = None):
+        self.path = os.fspath(path)
+        # What the text is called, e.g. the archive member it was decompressed from
+        self.name = name if name is not None else self.path
+        self.block_size = block_size
+        self._delete_on_close = False
+        self._file = open(self.path, "rb")
+        self.size = os.fstat(self._file.fileno()).st_size
+        # mmap refuses empty files, an empty bytes object behaves the same for our purposes
+        self._buffer = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else b""
+
+        # Byte offset and character offset at the start of each block
+        self._block_starts = array("Q")
+        self._char_starts = array("Q")
+        self.is_ascii = True
+        self._length = 0
+        self._line_offsets: Optional[Sequence[int]] = None
+        self._line_spill = None
+        self._scan()
+
+    @classmethod
+    def from_stream(cls, stream: BinaryIO, name: Optional[str] = None, block_size: int = 1 << 20) -> "LazyText":
+        """
+        Copy a binary stream (e.g. a decompressor) to a temporary file, chunk by chunk, and map
+        that. The file is deleted by `close()`.
+        """
+        spill = tempfile.NamedTemporaryFile(prefix="rlm_context_", delete=False)
+        try:
+            with spill:
+                shutil.copyfileobj(stream, spill, 1 << 20)
+            text = cls(spill.name, block_size, name=name)
+        except BaseException:
+            os.unlink(spill.name)
+            raise
+        text._delete_on_close = True
+        return text
+
+    def _block_boundary(self, position: int, end: int) -> int:
+        """Move `end` back so the block [position, end) doesn't split a multi-byte sequence."""
+        buffer = self._buffer
+        back = end
+        # A sequence is a lead byte and at most three continuation bytes
+        while back > position and end - back < 3 and (buffer[back] & 0xC0) == 0x80:
+            back -= 1
+        if (buffer[back] & 0xC0) == 0x80:
+            # A longer run of continuation bytes is invalid data no sequence spans, any cut is safe
+            return end
+        if back > position:
+            return back
+        # The block is a single sequence cut short: extend it to the sequence's end instead
+        while end < self.size and end - back < 4 and (buffer[end] & 0xC0) == 0x80:
+            end += 1
+        return end
+
+    def _scan(self) -> None:
+        """Build the block table and the line start offsets in one pass over the file."""
+        buffer, size = self._buffer, self.size
+        offsets = array("Q", [0])
+        spill = None
+        position = chars = 0
+        while position < size:
+            end = min(position + self.block_size, size)
+            if end < size:
+                end = self._block_boundary(position, end)
+            block = buffer[position:end]
+            if block.isascii():
+                parts, count = block.split(b"\n"), len(block)
+            else:
+                self.is_ascii = False
+                text = block.decode("utf-8", errors="replace")
+                parts, count = text.split("\n"), len(text)
+            # Every "\n" starts a new line right after it
+            offsets.extend(islice(accumulate((len(part) + 1 for part in parts[:-1]), initial=chars), 1, None))
+            if len(offsets) >= _SPILL_LINES:
+                if spill is None:
+                    spill = tempfile.TemporaryFile(prefix="rlm_lines_")
+                offsets.tofile(spill)
+                del offsets[:]
+            self._block_starts.append(position)
+            self._char_starts.append(chars)
+            position = end
+            chars += count
+        self._length = chars
+
+        if spill is None:
+            self._line_offsets = offsets
+        else:
+            offsets.tofile(spill)
+            spill.flush()
+            self._line_spill = (spill, mmap.mmap(spill.fileno(), 0, access=mmap.ACCESS_READ))
+            self._line_offsets = memoryview(self._line_spill[1]).cast("Q")
+
+    @property
+    def line_offsets(self) -> Sequence[int]:
+        """Character offset of the start of every line (split on "\\n" like `str.split`)."""
+        if self._line_offsets is None:
+            # Unpickled copies rebuild the table on first use
+            self._block_starts, self._char_starts = array("Q"), array("Q")
+            self._scan()
+        return self._line_offsets
+
+    def __getstate__(self) -> dict:
+        # Pickle by path plus the block table; the receiving process maps the same file
+        return {
+            "path": self.path,
+            "name": self.name,
+            "block_size": self.block_size,
+            "block_starts": self._block_starts,
+            "char_starts": self._char_starts,
+            "is_ascii": self.is_ascii,
+            "length": self._length,
+            "line_offsets": self._line_offsets if isinstance(self._line_offsets, array) else None,
+        }
+
+    def __setstate__(self, state: dict) -> None:
+        self.path = state["path"]
+        self.name = state["name"]
+        self.block_size = state["block_size"]
+        # Only the original deletes a temporary file
+        self._delete_on_close = False
+        self._file = open(self.path, "rb")
+        self.size = os.fstat(self._file.fileno()).st_size
+        self._buffer = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else b""
+        self._block_starts = state["block_starts"]
+        self._char_starts = state["char_starts"]
+        self.is_ascii = state["is_ascii"]
+        self._length = state["length"]
+        # Small line tables travel with the pickle, spilled ones are rebuilt on first use
+        self._line_offsets = state["line_offsets"]
+        self._line_spill = None
+
+    @property
+    def buffer(self):
+        """The raw mapped bytes, usable with `re` byte patterns."""
+        return self._buffer
+
+    def _block_end(self, index: int) -> int:
+        return self._block_starts[index + 1] if index + 1 < len(self._block_starts) else self.size
+
+    def _decode_range(self, start: int, stop: int) -> str:
+        """Decode characters [start, stop) with 0 <= start <= stop <= len(self)."""
+        if start >= stop:
+            return ""
+        if self.is_ascii:
+            return self._buffer[start:stop].decode("ascii")
+        first = bisect_right(self._char_starts, start) - 1
+        last = bisect_right(self._char_starts, stop - 1) - 1
+        text = self._buffer[self._block_starts[first]:self._block_end(last)].decode("utf-8", errors="replace")
+        offset = self._char_starts[first]
+        return text[start - offset:stop - offset]
+
+    def _byte_to_char(self, position: int) -> int:
+        if self.is_ascii:
+            return position
+        index = bisect_right(self._block_starts, position) - 1
+        prefix = self._buffer[self._block_starts[index]:position]
+        return self._char_starts[index] + len(prefix.decode("utf-8", errors="replace"))
+
+    def _char_to_byte(self, position: int) -> int:
+        """Byte offset of character offset `position` (0 <= position <= len(self))."""
+        if self.is_ascii:
+            return position
+        if position >= self._length:
+            return self.size
+        index = bisect_right(self._char_starts, position) - 1
+        block_start = self._block_starts[index]
+        block = self._buffer[block_start:self._block_end(index)]
+        chars = position - self._char_starts[index]
+        prefix = block.decode("utf-8", errors="replace")[:chars]
+        if "\ufffd" not in prefix:
+            return block_start + len(prefix.encode("utf-8"))
+        # Invalid bytes don't round-trip through U+FFFD: walk the block one invalid run at a
+        # time, each of which the "replace" handler decodes to a single U+FFFD
+        view, position = memoryview(block), 0
+        while True:
+            try:
+                valid = codecs.utf_8_decode(view[position:], "strict", True)[0]
+                end = None
+            except UnicodeDecodeError as error:
+                valid = codecs.utf_8_decode(view[position:position + error.start], "strict", True)[0]
+                end = position + error.end
+            if len(valid) >= chars or end is None:
+                return block_start + position + len(valid[:chars].encode("utf-8"))
+            chars -= len(valid) + 1
+            position = end
+            if chars <= 0:
+                return block_start + position
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, key: int | slice) -> str:
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self._length)
+            if step == 1:
+                return self._decode_range(start, stop)
+            if step > 0:
+                return self._decode_range(start, stop)[::step]
+            return str(self)[key]
+        if key < 0:
+            key += self._length
+        if not 0 <= key < self._length:
+            raise IndexError("LazyText index out of range")
+        return self._decode_range(key, key + 1)
+
+    def blocks(self) -> Iterator[str]:
+        """The decoded text in consecutive pieces of about `block_size` bytes."""
+        for index in range(len(self._block_starts)):
+            yield self._buffer[self._block_starts[index]:self._block_end(index)].decode("utf-8", errors="replace")
+
+    def __iter__(self) -> Iterator[str]:
+        for block in self.blocks():
+            yield from block
+
+    def __contains__(self, sub: str) -> bool:
+        return self._buffer.find(sub.encode("utf-8")) != -1
+
+    def find(self, sub: str, start: Optional[int] = None, end: Optional[int] = None) -> int:
+        """Like `str.find`: `start`, `end` and the result are character offsets."""
+        length = self._length
+        start = 0 if start is None else max(start + length, 0) if start < 0 else start
+        end = length if end is None else max(end + length, 0) if end < 0 else min(end, length)
+        if start > end:
+            return -1
+        position = self._buffer.find(sub.encode("utf-8"), self._char_to_byte(start), self._char_to_byte(end))
+        return self._byte_to_char(position) if position != -1 else -1
+
+    def count(self, sub: str) -> int:
+        if not sub:
+            return self._length + 1
+        needle = sub.encode("utf-8")
+        total, position = 0, self._buffer.find(needle)
+        while position != -1:
+            total += 1
+            position = self._buffer.find(needle, position + len(needle))
+        return total
+
+    def __str__(self) -> str:
+        return self._buffer[:].decode("utf-8", errors="replace")
+
+    def __repr__(self) -> str:
+        return f"LazyText(path={self.path!r}, chars={self._length}, bytes={self.size})"
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, LazyText):
+            return self.path == other.path and self.size == other.size
+        if isinstance(other, str):
+            return len(other) == self._length and str(self) == other
+        return NotImplemented
+
+    __hash__ = object.__hash__
+
+    def __add__(self, other: str) -> str:
+        return str(self) + other
+
+    def __radd__(self, other: str) -> str:
+        return other + str(self)
+
+    def __getattr__(self, name: str):
+        # Everything else behaves like the fully decoded string
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(str(self), name)
+
+    def close(self) -> None:
+        if self._line_spill is not None:
+            self._line_offsets.release()
+            spill, spill_map = self._line_spill
+            spill_map.close()
+            spill.close()
+            self._line_spill = None
+        self._line_offsets = None
+        if isinstance(self._buffer, mmap.mmap):
+            self._buffer.close()
+        self._file.close()
+        if self._delete_on_close:
+            self._delete_on_close = False
+            os.unlink(self.path)
+
+
+class Document(str):
+    """A `str` with the `name` it had in its source, such as the path of an archive member."""
+
+    def __new__(cls, text: str, name: str):
+        document = super().__new__(cls, text)
+        document.name = name
+        return document
+
+    def __reduce__(self):
+        return Document, (str(self), self.name)
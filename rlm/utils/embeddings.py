@@ -0,0 +1,227 @@
+"""
+Local embedding index over the context, behind the REPL's `semantic_search()`.
+
+Passages (or list documents) are embedded once into a contiguous float32 NumPy matrix with
+unit-norm rows, so a query is one matrix-vector product. Large indexes are partitioned into
+k-means clusters (IVF) and only the clusters closest to the query are scored.
+
+The default `HashingEmbedder` needs no model and no network: TF-IDF weighted features hashed
+into a fixed number of dimensions. Any embedding model can be plugged in instead, as an
+`Embedder` subclass or a plain callable mapping a list of texts to a 2-D array.
+
+NumPy is an optional dependency, only needed for this module's indexes.
+"""
+
+import itertools
+import math
+import re
+import zlib
+from collections import Counter
+from typing import Any, Callable, Iterable, Iterator, Optional
+
+from rlm.utils.search import PassageIndex
+
+try:
+    import numpy as np
+except ImportError:  # Optional: semantic search is unavailable without it
+    np = None
+
+# Words, with camelCase and snake_case identifiers split into their parts
+_FEATURE_PATTERN = re.compile(r"[A-Z]?[a-z]+|[A-Z]+(?![a-z])|\d+")
+_SUFFIXES = ("ations", "ation", "ings", "ing", "ions", "ion", "ers", "er", "ed", "es", "ly", "s")
+_EMBED_BATCH = 512
+_FEATURE_CACHE_SIZE = 1 << 20
+
+
+def _stem(word: str) -> str:
+    """Crude suffix stripping, enough for "configured" and "configuration" to meet."""
+    for suffix in _SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[:-len(suffix)]
+    return word
+
+
+def embeddings_available() -> bool:
+    return np is not None
+
+
+def _require_numpy() -> None:
+    if np is None:
+        raise ImportError("Semantic search requires NumPy (pip install numpy)")
+
+
+class Embedder:
+    """Maps texts to vectors. Subclasses implement `embed`."""
+
+    def embed(self, texts: list[str]) -> "np.ndarray":
+        """One row per text."""
+        raise NotImplementedError
+
+    def embed_corpus(self, batches: Iterable[list[str]]) -> "np.ndarray":
+        """
+        Embed the texts of an index, batch by batch. Embedders that learn from the corpus
+        (like the IDF weights of `HashingEmbedder`) override this.
+        """
+        rows = [np.asarray(self.embed(batch), dtype=np.float32) for batch in batches]
+        return np.vstack(rows) if rows else np.zeros((0, 1), dtype=np.float32)
+
+
+class _CallableEmbedder(Embedder):
+    def __init__(self, function: Callable[[list[str]], Any]):
+        self.function = function
+
+    def embed(self, texts: list[str]) -> "np.ndarray":
+        return np.asarray(self.function(texts), dtype=np.float32)
+
+
+class HashingEmbedder(Embedder):
+    """
+    CPU-only embedder: words and their stems hashed into `dimensions` buckets with random
+    signs, weighted by sublinear term frequency and by inverse document frequency learned
+    from the indexed corpus.
+    """
+
+    def __init__(self, dimensions: int = 512):
+        self.dimensions = dimensions
+        self.idf: Optional["np.ndarray"] = None
+        self._cache: dict[str, tuple[int, int, int, int]] = {}
+
+    def _feature(self, feature: str) -> tuple[int, int]:
+        bucket = zlib.crc32(feature.encode("utf-8"))
+        # Random sign per feature, so hash collisions cancel out on average
+        return bucket % self.dimensions, 1 if bucket & (1 << 31) else -1
+
+    def _word_features(self, token: str) -> tuple[int, int, int, int]:
+        """Column and sign of a token's word feature and of its stem feature."""
+        features = self._cache.get(token)
+        if features is None:
+            word = token.lower()
+            features = self._feature(word) + self._feature("~" + _stem(word))
+            if len(self._cache) >= _FEATURE_CACHE_SIZE:
+                self._cache.clear()
+            self._cache[token] = features
+        return features
+
+    def _counts(self, texts: list[str]) -> "np.ndarray":
+        cells, values = [], []
+        for row, text in enumerate(texts):
+            offset = row * self.dimensions
+            for token, count in Counter(_FEATURE_PATTERN.findall(text)).items():
+                column, sign, stem_column, stem_sign = self._word_features(token)
+                weight = 1.0 + math.log(count)
+                cells += (offset + column, offset + stem_column)
+                values += (weight * sign, weight * stem_sign)
+        matrix = np.bincount(cells, weights=values, minlength=len(texts) * self.dimensions)
+        return matrix.astype(np.float32).reshape(len(texts), self.dimensions)
+
+    def embed(self, texts: list[str]) -> "np.ndarray":
+        matrix = self._counts(texts)
+        return matrix * self.idf if self.idf is not None else matrix
+
+    def embed_corpus(self, batches: Iterable[list[str]]) -> "np.ndarray":
+        matrix = np.vstack([self._counts(batch) for batch in batches] or [self._counts([])])
+        document_frequency = np.count_nonzero(matrix, axis=0)
+        self.idf = (np.log((1 + len(matrix)) / (1 + document_frequency)) + 1).astype(np.float32)
+        matrix *= self.idf
+        return matrix
+
+
+def _normalize(matrix: "np.ndarray") -> "np.ndarray":
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def _top_k(scores: "np.ndarray", k: int) -> "np.ndarray":
+    """Indexes of the `k` largest scores, best first."""
+    if k >= len(scores):
+        return np.argsort(-scores, kind="stable")
+    top = np.argpartition(-scores, k)[:k]
+    return top[np.argsort(-scores[top], kind="stable")]
+
+
+class VectorIndex(PassageIndex):
+    """
+    Embedding index over passages of a text (or the documents of a list).
+
+    Vectors are kept in `matrix`, one contiguous float32 row per passage. Up to
+    `ivf_threshold` passages, search is exact (brute force); above it, passages are grouped
+    into about sqrt(n) k-means clusters and the `nprobe` clusters nearest to the query are
+    searched.
+    """
+
+    def __init__(
+        self,
+        embedder: Optional[Embedder | Callable[[list[str]], Any]] = None,
+        ivf_threshold: int = 50_000,
+        nprobe: int = 32,
+    ):
+        _require_numpy()
+        super().__init__()
+        if embedder is None:
+            embedder = HashingEmbedder()
+        elif not isinstance(embedder, Embedder):
+            embedder = _CallableEmbedder(embedder)
+        self.embedder = embedder
+        self.ivf_threshold = ivf_threshold
+        self.nprobe = nprobe
+        self.matrix: Optional["np.ndarray"] = None
+        self.centroids: Optional["np.ndarray"] = None
+        self.list_order: Optional["np.ndarray"] = None  # Passage ids grouped by cluster
+        self.list_bounds: Optional["np.ndarray"] = None  # Cluster c is list_order[bounds[c]:bounds[c + 1]]
+
+    def _build(self, texts: Iterator[str]) -> None:
+        batches = iter(lambda: list(itertools.islice(texts, _EMBED_BATCH)), [])
+        matrix = self.embedder.embed_corpus(batches)
+        self.matrix = np.ascontiguousarray(_normalize(matrix), dtype=np.float32)
+        if len(self.matrix) > self.ivf_threshold:
+            self._build_ivf(int(math.sqrt(len(self.matrix))))
+
+    def _assign(self, centroids: "np.ndarray", block: int = 8192) -> tuple["np.ndarray", "np.ndarray"]:
+        """
+        Nearest centroid of every row and the sum of the rows assigned to each centroid,
+        computed in blocks to bound the size of the score matrix.
+        """
+        assignments = []
+        sums = np.zeros_like(centroids)
+        for start in range(0, len(self.matrix), block):
+            rows = self.matrix[start:start + block]
+            assignment = np.argmax(rows @ centroids.T, axis=1)
+            one_hot = np.zeros((len(rows), len(centroids)), dtype=np.float32)
+            one_hot[np.arange(len(rows)), assignment] = 1.0
+            sums += one_hot.T @ rows
+            assignments.append(assignment)
+        return np.concatenate(assignments), sums
+
+    def _build_ivf(self, clusters: int, iterations: int = 10) -> None:
+        rng = np.random.default_rng(0)
+        centroids = self.matrix[rng.choice(len(self.matrix), clusters, replace=False)].copy()
+        for _ in range(iterations):
+            assignment, sums = self._assign(centroids)
+            filled = np.bincount(assignment, minlength=clusters) > 0
+            # Empty clusters keep their previous centroid
+            centroids[filled] = _normalize(sums[filled])
+        assignment, _ = self._assign(centroids)
+        self.centroids = centroids
+        self.list_order = np.argsort(assignment, kind="stable")
+        self.list_bounds = np.searchsorted(assignment[self.list_order], np.arange(clusters + 1))
+
+    def search(self, query: str, k: int = 10) -> list[dict[str, Any]]:
+        """Top `k` passages for `query` by cosine similarity, best first."""
+        if not len(self.matrix):
+            return []
+        vector = _normalize(np.asarray(self.embedder.embed([query]), dtype=np.float32)[0])
+        if self.centroids is None:
+            candidates = None
+            scores = self.matrix @ vector
+        else:
+            probed = _top_k(self.centroids @ vector, self.nprobe)
+            candidates = np.concatenate([
+                self.list_order[self.list_bounds[cluster]:self.list_bounds[cluster + 1]] for cluster in probed
+            ])
+            scores = self.matrix[candidates] @ vector
+        results = []
+        for position in _top_k(scores, k):
+            passage = int(position if candidates is None else candidates[position])
+            results.append(self._result(passage, float(scores[position])))
+        return results
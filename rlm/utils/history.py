@@ -0,0 +1,165 @@
+"""
+Conversation history policies for the root model.
+
+Every REPL execution appends its code and output to `RLM_REPL.messages`, and the whole list is
+resent on each iteration. A `HistoryPolicy` compacts that list after each iteration so deep
+sessions don't grow in cost with every turn.
+"""
+
+import ast
+import os
+import re
+from typing import Dict, List, Optional
+
+from rlm.utils.llm import estimate_tokens
+
+# Layout written by `utils.add_execution_result_to_messages`
+_EXECUTION_PATTERN = re.compile(r"\ACode executed:\n```python\n(.*?)\n```\n\nREPL output:\n(.*)\Z", re.DOTALL)
+_OMITTED_PATTERN = re.compile(r"\A\[(\d+) earlier messages omitted")
+
+
+class _TopLevelBindings(ast.NodeVisitor):
+    """Collects names bound in a module's own scope, skipping nested function/class scopes."""
+
+    def __init__(self):
+        self.names: List[str] = []
+
+    def visit_Name(self, node: ast.Name) -> None:
+        if isinstance(node.ctx, ast.Store):
+            self.names.append(node.id)
+
+    def visit_FunctionDef(self, node) -> None:
+        self.names.append(node.name)
+
+    visit_AsyncFunctionDef = visit_ClassDef = visit_FunctionDef
+
+    def visit_Import(self, node) -> None:
+        self.names.extend((alias.asname or alias.name).split(".")[0] for alias in node.names)
+
+    visit_ImportFrom = visit_Import
+
+    def visit_Lambda(self, node) -> None:
+        pass
+
+    visit_ListComp = visit_SetComp = visit_DictComp = visit_GeneratorExp = visit_Lambda
+
+
+def assigned_names(code: str) -> List[str]:
+    """Public names bound at the top level of `code` (assignments, imports, defs), in order."""
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return []
+    visitor = _TopLevelBindings()
+    visitor.visit(tree)
+    return [name for name in dict.fromkeys(visitor.names) if not name.startswith("_")]
+
+
+class HistoryPolicy:
+    """Keeps the whole history (the default). Subclasses override `compact`."""
+
+    def compact(self, messages: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        """Return the history to keep; called after every root iteration."""
+        return messages
+
+
+class CompactingHistory(HistoryPolicy):
+    """
+    Keeps the last `keep_turns` REPL executions verbatim and replaces older ones with stubs:
+    the code, the start of its output and the variables it assigned, which are still available
+    in the REPL. With `max_tokens`, more recent executions are stubbed and then the oldest
+    messages dropped until the (estimated) history fits.
+
+    Compaction is applied to `RLM_REPL.messages` itself, so an elided message stays elided
+    instead of being rebuilt from the full output on every iteration. Executions are elided in
+    batches of `elide_batch`, not one per iteration, so the history prefix stays byte-identical
+    (and cached by the provider) for several iterations between compactions.
+    """
+
+    def __init__(
+        self,
+        keep_turns: int = 4,
+        max_tokens: Optional[int] = None,
+        preview_chars: int = 300,
+        elide_batch: int = 4,
+    ):
+        self.keep_turns = keep_turns
+        self.elide_batch = max(elide_batch, 1)
+        self.max_tokens = max_tokens
+        self.preview_chars = preview_chars
+
+    def summarize_execution(self, code: str, output: str) -> str:
+        """Stub standing in for an elided execution result. Override to summarize differently."""
+        preview = output[:self.preview_chars]
+        if len(output) > self.preview_chars:
+            preview += "..."
+        content = (
+            f"Code executed:\n```python\n{code}\n```\n\n"
+            f"REPL output (elided, {len(output)} characters originally):\n{preview}"
+        )
+        names = assigned_names(code)
+        if names:
+            content += f"\n\nVariables assigned by this code are still available in the REPL: {names}"
+        return content
+
+    def _elide(self, message: Dict[str, str]) -> Dict[str, str]:
+        match = _EXECUTION_PATTERN.match(message["content"])
+        return {**message, "content": self.summarize_execution(match.group(1), match.group(2))}
+
+    def _over_budget(self, messages: List[Dict[str, str]]) -> bool:
+        return self.max_tokens is not None and estimate_tokens(messages) > self.max_tokens
+
+    def compact(self, messages: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        messages = list(messages)
+        verbatim = [
+            index for index, message in enumerate(messages)
+            if message["role"] == "user" and _EXECUTION_PATTERN.match(message["content"])
+        ]
+        elide_count = len(verbatim) - self.keep_turns
+        if elide_count < self.elide_batch:
+            elide_count = 0
+        for index in verbatim[:elide_count]:
+            messages[index] = self._elide(messages[index])
+
+        # Over budget: stub the remaining executions as well, oldest first
+        for index in verbatim[elide_count:]:
+            if not self._over_budget(messages):
+                break
+            messages[index] = self._elide(messages[index])
+
+        # Still over budget: drop the oldest messages after the system prompt
+        if self._over_budget(messages):
+            start = 0
+            while start < len(messages) and messages[start]["role"] == "system":
+                start += 1
+            dropped = 0
+            if start < len(messages):
+                match = _OMITTED_PATTERN.match(messages[start]["content"])
+                if match:
+                    dropped = int(match.group(1))
+                    del messages[start]
+            while self._over_budget(messages) and len(messages) > start + 1:
+                del messages[start]
+                dropped += 1
+            if dropped:
+                messages.insert(start, {
+                    "role": "user",
+                    "content": f"[{dropped} earlier messages omitted from the history. "
+                               "Variables they created are still available in the REPL.]",
+                })
+        return messages
+
+
+def history_policy_from_env() -> HistoryPolicy:
+    """
+    `CompactingHistory` configured by RLM_HISTORY_KEEP_TURNS and RLM_HISTORY_MAX_TOKENS if either
+    is set, otherwise a policy that keeps the full history.
+    """
+    keep_turns = os.getenv("RLM_HISTORY_KEEP_TURNS")
+    max_tokens = os.getenv("RLM_HISTORY_MAX_TOKENS")
+    if not keep_turns and not max_tokens:
+        return HistoryPolicy()
+    return CompactingHistory(
+        keep_turns=int(keep_turns) if keep_turns else 4,
+        max_tokens=int(max_tokens) if max_tokens else None,
+    )
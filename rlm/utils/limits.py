@@ -0,0 +1,157 @@
+"""
+Resource budgets for REPL cell execution.
+
+`ExecutionLimits` describes per-cell and per-session budgets (wall-clock, CPU, RSS and number of
+sub-LLM calls). `CellWatchdog` enforces the time and memory budgets on the thread running a cell
+by raising `ExecutionBudgetExceeded` inside it.
+"""
+
+import ctypes
+import dataclasses
+import os
+import sys
+import threading
+import time
+import warnings
+from dataclasses import dataclass
+from typing import Optional
+
+
+class ExecutionBudgetExceeded(BaseException):
+    """
+    Raised inside a REPL cell when it runs over budget. Derives from BaseException so that a
+    bare `except Exception` in model-written code can't swallow it.
+    """
+
+
+@dataclass
+class ExecutionLimits:
+    cell_timeout: Optional[float] = None  # Wall-clock seconds per cell
+    cell_cpu_time: Optional[float] = None  # CPU seconds per cell (process-wide CPU time, process backend only)
+    max_rss_mb: Optional[float] = None  # Resident memory of the executing process (process backend only)
+    session_timeout: Optional[float] = None  # Wall-clock seconds across all cells of a session
+    max_llm_calls_per_cell: Optional[int] = None
+    max_llm_calls: Optional[int] = None  # Sub-LLM calls across the session
+    poll_interval: float = 0.05
+
+    @classmethod
+    def from_env(cls) -> "ExecutionLimits":
+        """Read limits from RLM_CELL_TIMEOUT, RLM_CELL_CPU_TIME, RLM_MAX_RSS_MB,
+        RLM_SESSION_TIMEOUT, RLM_MAX_LLM_CALLS_PER_CELL and RLM_MAX_LLM_CALLS (unset = no limit)."""
+        def read(name, cast):
+            value = os.getenv(name)
+            return cast(value) if value else None
+
+        return cls(
+            cell_timeout=read("RLM_CELL_TIMEOUT", float),
+            cell_cpu_time=read("RLM_CELL_CPU_TIME", float),
+            max_rss_mb=read("RLM_MAX_RSS_MB", float),
+            session_timeout=read("RLM_SESSION_TIMEOUT", float),
+            max_llm_calls_per_cell=read("RLM_MAX_LLM_CALLS_PER_CELL", int),
+            max_llm_calls=read("RLM_MAX_LLM_CALLS", int),
+        )
+
+    def for_shared_process(self) -> "ExecutionLimits":
+        """
+        These limits for a REPL sharing its process with other sessions. CPU time and RSS are
+        measured for the whole process, so one session's work would count against another's
+        cells: those two limits are dropped, with a warning. They apply per session with
+        `repl_backend="process"`, where every session has its own worker.
+        """
+        if self.cell_cpu_time is None and self.max_rss_mb is None:
+            return self
+        warnings.warn(
+            "CPU time and memory limits are process-wide and are ignored for in-process REPLs; "
+            "use repl_backend=\"process\" (RLM_REPL_BACKEND=process) to enforce them per session",
+            RuntimeWarning,
+            stacklevel=3,
+        )
+        return dataclasses.replace(self, cell_cpu_time=None, max_rss_mb=None)
+
+    @property
+    def watches_resources(self) -> bool:
+        """Whether a watchdog thread is needed (any time or memory budget set)."""
+        return any(limit is not None for limit in (
+            self.cell_timeout, self.cell_cpu_time, self.max_rss_mb, self.session_timeout,
+        ))
+
+
+def current_rss_mb() -> float:
+    """Resident set size of this process in MB (peak RSS where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in bytes on macOS and in KB elsewhere
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _raise_in_thread(thread_id: int, exception_type: type) -> bool:
+    affected = ctypes.pythonapi.PyThreadState_SetAsyncExc(
+        ctypes.c_ulong(thread_id), ctypes.py_object(exception_type)
+    )
+    if affected > 1:
+        # Should never happen; undo rather than hit unrelated threads
+        ctypes.pythonapi.PyThreadState_SetAsyncExc(ctypes.c_ulong(thread_id), None)
+        return False
+    return affected == 1
+
+
+class CellWatchdog:
+    """
+    Polls wall-clock, CPU time and RSS while a cell runs on `thread_id`, and raises
+    `ExecutionBudgetExceeded` in that thread on the first breach. The reason is kept in
+    `self.reason`. The exception is delivered at the next Python bytecode, so a cell blocked
+    in a long C call is interrupted only once that call returns.
+    """
+
+    def __init__(self, limits: ExecutionLimits, thread_id: int, wall_limit: Optional[float],
+                 wall_limit_name: str = "wall-clock"):
+        self.limits = limits
+        self.thread_id = thread_id
+        self.wall_limit = wall_limit
+        self.wall_limit_name = wall_limit_name
+        self.reason: Optional[str] = None
+        self._finished = False
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="repl-watchdog", daemon=True)
+
+    def __enter__(self) -> "CellWatchdog":
+        self._wall_start = time.monotonic()
+        self._cpu_start = time.process_time()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.finish()
+        self._stop.set()
+        self._thread.join()
+
+    def finish(self) -> None:
+        """Mark the cell as done; no exception is raised into the thread after this."""
+        with self._lock:
+            self._finished = True
+
+    def _check(self) -> Optional[str]:
+        limits = self.limits
+        if self.wall_limit is not None and time.monotonic() - self._wall_start > self.wall_limit:
+            return f"{self.wall_limit_name} limit of {self.wall_limit:g}s exceeded"
+        if limits.cell_cpu_time is not None and time.process_time() - self._cpu_start > limits.cell_cpu_time:
+            return f"CPU time limit of {limits.cell_cpu_time:g}s exceeded"
+        if limits.max_rss_mb is not None and current_rss_mb() > limits.max_rss_mb:
+            return f"memory limit of {limits.max_rss_mb:g}MB exceeded"
+        return None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.limits.poll_interval):
+            reason = self._check()
+            if reason is None:
+                continue
+            with self._lock:
+                if not self._finished:
+                    self.reason = reason
+                    _raise_in_thread(self.thread_id, ExecutionBudgetExceeded)
+            return
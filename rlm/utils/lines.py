@@ -0,0 +1,79 @@
+"""
+Line-offset index for text contexts.
+
+`LineIndex` records where every line of the context starts, in one pass when the context is
+loaded, so the REPL can fetch lines by number or find the line of a character offset by
+slicing only what is asked for instead of splitting the whole context again.
+"""
+
+from array import array
+from bisect import bisect_right
+from itertools import accumulate, islice
+from typing import Iterator
+
+from rlm.utils.context import LazyText
+
+_BLOCK_SIZE = 1 << 20
+
+
+def _pieces(text: str) -> Iterator[str]:
+    for start in range(0, len(text), _BLOCK_SIZE):
+        yield text[start:start + _BLOCK_SIZE]
+
+
+class LineIndex:
+    """
+    Character offset of the start of every line of `text`, in a compact array (for a
+    `LazyText`, the table it built when the file was opened). Lines are numbered from 0 and
+    split on "\\n" exactly like `text.split("\\n")`.
+    """
+
+    def __init__(self, text: str | LazyText):
+        self.text = text
+        if isinstance(text, LazyText):
+            # Built while the file was scanned at open time
+            self.offsets = text.line_offsets
+            self.length = len(text)
+            return
+        self.offsets = array("Q", [0])
+        position = 0
+        for piece in _pieces(text):
+            parts = piece.split("\n")
+            # Every "\n" starts a new line right after it; the last part continues into the next piece
+            self.offsets.extend(islice(accumulate((len(part) + 1 for part in parts[:-1]), initial=position), 1, None))
+            position += len(piece)
+        self.length = position
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def line_at_char(self, position: int) -> int:
+        """Number of the line containing character offset `position`."""
+        if position < 0:
+            position += self.length
+        if not 0 <= position <= self.length:
+            raise IndexError("character offset out of range")
+        return bisect_right(self.offsets, position) - 1
+
+    def line_span(self, line: int) -> tuple[int, int]:
+        """(start, end) character offsets of `line`, excluding its newline."""
+        if line < 0:
+            line += len(self.offsets)
+        if not 0 <= line < len(self.offsets):
+            raise IndexError("line number out of range")
+        end = self.offsets[line + 1] - 1 if line + 1 < len(self.offsets) else self.length
+        return self.offsets[line], end
+
+    def get_lines(self, start: int, end: int | None = None) -> str:
+        """
+        Lines `start` up to (not including) `end`, joined by newlines, like
+        `"\\n".join(text.split("\\n")[start:end])` but only reading those lines.
+        Without `end`, just line `start`.
+        """
+        if end is None:
+            first, last = self.line_span(start)
+            return self.text[first:last]
+        start, end, _ = slice(start, end).indices(len(self.offsets))
+        if start >= end:
+            return ""
+        return self.text[self.offsets[start]:self.line_span(end - 1)[1]]
@@ -3,22 +3,318 @@ OpenAI Client wrapper specifically for GPT-5 models.
 """
 
 import os
-from typing import Optional
-from openai import OpenAI
+import asyncio
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import closing
+from typing import AsyncIterator, Iterator, Optional
+from openai import AsyncOpenAI
 from dotenv import load_dotenv
 
+from rlm.utils.context import LazyText
+from rlm.utils.usage import CallUsage, UsageTracker
+from rlm.utils.cache import CompletionCache, cache_from_env, make_cache_key
+from rlm.utils.transport import (
+    RetryPolicy,
+    acall_with_retries,
+    call_with_retries,
+    get_async_openai_client,
+    get_openai_client,
+)
+
 load_dotenv()
 
+
+def _normalize_messages(messages: list[dict[str, str]] | dict[str, str] | str) -> list[dict[str, str]]:
+    """
+    Accept a plain prompt string, a single message, or a list of messages. A `LazyText`
+    (prompt or message content) is decoded to a plain string.
+    """
+    if isinstance(messages, (str, LazyText)):
+        return [{"role": "user", "content": str(messages)}]
+    elif isinstance(messages, dict):
+        messages = [messages]
+    return [
+        {**message, "content": str(message["content"])} if isinstance(message.get("content"), LazyText) else message
+        for message in messages
+    ]
+
+
+def _with_prompt_cache_key(kwargs: dict, prompt_cache_key: Optional[str]) -> dict:
+    """
+    Add `prompt_cache_key`, which routes requests sharing a prefix to the same provider-side
+    prompt cache. Sent through `extra_body` so it works with any SDK version.
+    """
+    if prompt_cache_key is None or "prompt_cache_key" in kwargs:
+        return kwargs
+    extra_body = {"prompt_cache_key": prompt_cache_key, **(kwargs.get("extra_body") or {})}
+    return {**kwargs, "extra_body": extra_body}
+
+
+def estimate_tokens(messages: list[dict[str, str]], max_tokens: Optional[int] = None) -> int:
+    """Rough prompt + completion token estimate (~4 characters per token) for rate limiting."""
+    prompt_chars = sum(len(str(message.get("content") or "")) for message in messages)
+    return prompt_chars // 4 + 4 * len(messages) + (max_tokens or 0)
+
+
+class _TokenBucket:
+    """
+    Bucket holding up to `capacity` units, refilled at `capacity` per minute. Reservations may
+    drive the balance negative; the caller then waits until it's paid back, so concurrent
+    callers are served in the order they reserved.
+    """
+
+    def __init__(self, capacity: float):
+        self.capacity = capacity
+        self.level = capacity
+        self.updated = time.monotonic()
+
+    def reserve(self, amount: float, now: float) -> float:
+        """Take `amount` units and return how long to wait before using them."""
+        rate = self.capacity / 60.0
+        self.level = min(self.capacity, self.level + (now - self.updated) * rate)
+        self.updated = now
+        self.level -= min(amount, self.capacity)
+        return max(-self.level / rate, 0.0)
+
+    def refund(self, amount: float) -> None:
+        self.level = min(self.capacity, self.level + amount)
+
+
+class RateLimiter:
+    """
+    Client-side requests-per-minute and tokens-per-minute limiter, shared by every client in
+    the process. Calls over the limit are delayed (queued in arrival order) rather than sent and
+    throttled by the provider.
+
+    Limits are per model: `model_limits` maps a model name to (rpm, tpm), anything else uses the
+    defaults; None means unlimited. With `state_path`, bucket state lives in a SQLite file so
+    several processes on one host share the same budget.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        model_limits: Optional[dict[str, tuple[Optional[float], Optional[float]]]] = None,
+        state_path: Optional[str] = None,
+    ):
+        self.default_limits = (requests_per_minute, tokens_per_minute)
+        self.model_limits = model_limits or {}
+        self.state_path = state_path
+        self._lock = threading.Lock()
+        self._buckets: dict[tuple[str, str], _TokenBucket] = {}
+        self._waits: dict[str, deque] = {}
+        self._counts: dict[str, list] = {}  # model -> [requests, delayed requests, total wait]
+        if state_path:
+            os.makedirs(os.path.dirname(os.path.abspath(state_path)), exist_ok=True)
+            with self._connect() as conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS buckets ("
+                    " model TEXT, kind TEXT, level REAL, updated REAL, PRIMARY KEY (model, kind))"
+                )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.state_path, timeout=30, isolation_level=None)
+
+    def _limits_for(self, model: str) -> tuple[Optional[float], Optional[float]]:
+        return self.model_limits.get(model, self.default_limits)
+
+    def _reserve_local(self, model: str, amounts: dict[str, float], limits: dict[str, float]) -> float:
+        now = time.monotonic()
+        wait = 0.0
+        with self._lock:
+            for kind, amount in amounts.items():
+                bucket = self._buckets.get((model, kind))
+                if bucket is None:
+                    bucket = self._buckets[(model, kind)] = _TokenBucket(limits[kind])
+                wait = max(wait, bucket.reserve(amount, now))
+        return wait
+
+    def _reserve_shared(self, model: str, amounts: dict[str, float], limits: dict[str, float]) -> float:
+        # Wall-clock time, since monotonic clocks aren't comparable across processes
+        now = time.time()
+        wait = 0.0
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                for kind, amount in amounts.items():
+                    row = conn.execute(
+                        "SELECT level, updated FROM buckets WHERE model = ? AND kind = ?", (model, kind)
+                    ).fetchone()
+                    bucket = _TokenBucket(limits[kind])
+                    if row is not None:
+                        bucket.level, bucket.updated = row
+                    wait = max(wait, bucket.reserve(amount, now))
+                    conn.execute(
+                        "INSERT OR REPLACE INTO buckets (model, kind, level, updated) VALUES (?, ?, ?, ?)",
+                        (model, kind, bucket.level, bucket.updated),
+                    )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return wait
+
+    def reserve(self, model: str, estimated_tokens: int) -> float:
+        """Reserve one request and `estimated_tokens` tokens; return the seconds to wait."""
+        rpm, tpm = self._limits_for(model)
+        limits, amounts = {}, {}
+        if rpm is not None:
+            limits["requests"], amounts["requests"] = rpm, 1
+        if tpm is not None:
+            limits["tokens"], amounts["tokens"] = tpm, estimated_tokens
+        if not amounts:
+            wait = 0.0
+        elif self.state_path:
+            wait = self._reserve_shared(model, amounts, limits)
+        else:
+            wait = self._reserve_local(model, amounts, limits)
+        self._record_wait(model, wait)
+        return wait
+
+    def acquire(self, model: str, estimated_tokens: int) -> float:
+        """Block until a request of `estimated_tokens` may be sent; return the time waited."""
+        wait = self.reserve(model, estimated_tokens)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def aacquire(self, model: str, estimated_tokens: int) -> float:
+        if self.state_path:
+            # The shared reservation is a SQLite transaction that can wait on other processes'
+            # locks; keep it off the event loop
+            wait = await asyncio.to_thread(self.reserve, model, estimated_tokens)
+        else:
+            wait = self.reserve(model, estimated_tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def reconcile(self, model: str, estimated_tokens: int, actual_tokens: Optional[int]) -> None:
+        """Give back over-estimated tokens once the real usage is known (in-process buckets only)."""
+        if actual_tokens is None or actual_tokens >= estimated_tokens or self.state_path:
+            return
+        with self._lock:
+            bucket = self._buckets.get((model, "tokens"))
+            if bucket is not None:
+                bucket.refund(estimated_tokens - actual_tokens)
+
+    def _record_wait(self, model: str, wait: float) -> None:
+        with self._lock:
+            counts = self._counts.setdefault(model, [0, 0, 0.0])
+            counts[0] += 1
+            if wait > 0:
+                counts[1] += 1
+                counts[2] += wait
+            self._waits.setdefault(model, deque(maxlen=1000)).append(wait)
+
+    def stats(self) -> dict[str, dict[str, float]]:
+        """Queue wait metrics per model: totals plus p50/p95/max over the last 1000 requests."""
+        stats = {}
+        with self._lock:
+            for model, (requests, delayed, total_wait) in self._counts.items():
+                waits = sorted(self._waits.get(model, ()))
+                stats[model] = {
+                    "requests": requests,
+                    "delayed_requests": delayed,
+                    "total_wait_seconds": total_wait,
+                    "p50_wait_seconds": waits[len(waits) // 2] if waits else 0.0,
+                    "p95_wait_seconds": waits[min(int(len(waits) * 0.95), len(waits) - 1)] if waits else 0.0,
+                    "max_wait_seconds": waits[-1] if waits else 0.0,
+                }
+        return stats
+
+
+_env_rate_limiter: Optional[RateLimiter] = None
+_env_rate_limiter_lock = threading.Lock()
+
+def rate_limiter_from_env() -> Optional[RateLimiter]:
+    """
+    Process-wide limiter configured by RLM_RPM and RLM_TPM (applied per model), or None if
+    neither is set. RLM_RATE_LIMIT_DB names a SQLite file to share the budget across processes.
+    """
+    global _env_rate_limiter
+    rpm, tpm = os.getenv("RLM_RPM"), os.getenv("RLM_TPM")
+    if not rpm and not tpm:
+        return None
+    with _env_rate_limiter_lock:
+        if _env_rate_limiter is None:
+            _env_rate_limiter = RateLimiter(
+                requests_per_minute=float(rpm) if rpm else None,
+                tokens_per_minute=float(tpm) if tpm else None,
+                state_path=os.getenv("RLM_RATE_LIMIT_DB") or None,
+            )
+        return _env_rate_limiter
+
+
+def _total_tokens(response) -> Optional[int]:
+    usage = getattr(response, "usage", None)
+    return getattr(usage, "total_tokens", None)
+
+
+class _StreamTracker:
+    """Collects the text and usage of a streamed completion."""
+
+    def __init__(self, messages: list[dict[str, str]]):
+        self._messages = messages
+        self._parts: list[str] = []
+        self._usage: Optional[CallUsage] = None
+
+    def add(self, chunk) -> Optional[str]:
+        if getattr(chunk, "usage", None) is not None:
+            self._usage = CallUsage.from_response(chunk)
+        if not chunk.choices:
+            return None
+        delta = chunk.choices[0].delta.content
+        if delta:
+            self._parts.append(delta)
+        return delta
+
+    def text(self) -> str:
+        return "".join(self._parts)
+
+    def usage(self) -> CallUsage:
+        # The usage chunk comes last, so a stream closed early only has estimates
+        if self._usage is not None:
+            return self._usage
+        return CallUsage(
+            prompt_tokens=estimate_tokens(self._messages),
+            completion_tokens=len(self.text()) // 4,
+        )
+
+
 class OpenAIClient:
-    def __init__(self, api_key: Optional[str] = None, model: str = "gpt-5"):
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        model: str = "gpt-5",
+        cache: Optional[CompletionCache] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        usage: Optional[UsageTracker] = None,
+        usage_role: str = "root",
+        prompt_cache_key: Optional[str] = None,
+    ):
         self.api_key = api_key or os.getenv("OPENAI_API_KEY")
         if not self.api_key:
             raise ValueError("OpenAI API key is required. Set OPENAI_API_KEY environment variable or pass api_key parameter.")
         
         self.model = model
-        self.client = OpenAI(api_key=self.api_key)
-
-        # Implement cost tracking logic here.
+        # Shared with every other client using this API key (one keep-alive connection pool)
+        self.client = get_openai_client(self.api_key)
+        self.retry_policy = retry_policy if retry_policy is not None else RetryPolicy.from_env()
+        # Shared RPM/TPM limiter; falls back to the one configured through RLM_RPM/RLM_TPM (if any)
+        self.rate_limiter = rate_limiter if rate_limiter is not None else rate_limiter_from_env()
+        # Response cache; falls back to the one configured through RLM_CACHE (if any)
+        self.cache = cache if cache is not None else cache_from_env()
+        # Token/cost accounting; RLM_REPL passes one tracker shared by its root and sub-LM clients
+        self.usage = usage if usage is not None else UsageTracker()
+        self.usage_role = usage_role
+        # Requests with the same key and a common message prefix reuse the provider's prompt cache
+        self.prompt_cache_key = prompt_cache_key
     
     def completion(
         self,
@@ -27,18 +323,241 @@ class OpenAIClient:
         **kwargs
     ) -> str:
         try:
-            if isinstance(messages, str):
-                messages = [{"role": "user", "content": messages}]
-            elif isinstance(messages, dict):
-                messages = [messages]
+            messages = _normalize_messages(messages)
+
+            cache_key = None
+            if self.cache is not None:
+                cache_key = make_cache_key(self.model, messages, {"max_tokens": max_tokens, **kwargs})
+                cached = self.cache.get(cache_key)
+                if cached is not None:
+                    self.usage.record_cache_hit(self.usage_role, self.model)
+                    return cached
+
+            estimated_tokens = estimate_tokens(messages, max_tokens)
+
+            def request():
+                if self.rate_limiter is not None:
+                    self.rate_limiter.acquire(self.model, estimated_tokens)
+                return self.client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    max_completion_tokens=max_tokens,
+                    **_with_prompt_cache_key(kwargs, self.prompt_cache_key)
+                )
+
+            start_time = time.perf_counter()
+            try:
+                response = call_with_retries(request, self.retry_policy)
+            except Exception:
+                self.usage.record_error(self.usage_role, self.model)
+                raise
+            self.usage.record(
+                self.usage_role, self.model, CallUsage.from_response(response), time.perf_counter() - start_time
+            )
+            if self.rate_limiter is not None:
+                self.rate_limiter.reconcile(self.model, estimated_tokens, _total_tokens(response))
+            content = response.choices[0].message.content
+            if cache_key is not None and content is not None:
+                self.cache.set(cache_key, content)
+            return content
+
+        except Exception as e:
+            raise RuntimeError(f"Error generating completion: {str(e)}")
+
+    def stream_completion(
+        self,
+        messages: list[dict[str, str]] | str,
+        max_tokens: Optional[int] = None,
+        **kwargs
+    ) -> Iterator[str]:
+        """
+        Like `completion`, but yields the response text piece by piece as it is generated.
+        A cached response is yielded in one piece. Closing the generator early aborts the request.
+        """
+        messages = _normalize_messages(messages)
+
+        cache_key = None
+        if self.cache is not None:
+            cache_key = make_cache_key(self.model, messages, {"max_tokens": max_tokens, **kwargs})
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                self.usage.record_cache_hit(self.usage_role, self.model)
+                yield cached
+                return
+
+        estimated_tokens = estimate_tokens(messages, max_tokens)
+
+        def request():
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire(self.model, estimated_tokens)
+            return self.client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                max_completion_tokens=max_tokens,
+                stream=True,
+                stream_options={"include_usage": True},
+                **_with_prompt_cache_key(kwargs, self.prompt_cache_key)
+            )
+
+        start_time = time.perf_counter()
+        stream = None
+        failed = False
+        tracker = _StreamTracker(messages)
+        try:
+            stream = call_with_retries(request, self.retry_policy)
+            for chunk in stream:
+                delta = tracker.add(chunk)
+                if delta:
+                    yield delta
+        except Exception as e:
+            failed = True
+            self.usage.record_error(self.usage_role, self.model)
+            raise RuntimeError(f"Error generating completion: {str(e)}")
+        finally:
+            if stream is not None:
+                stream.close()
+            # Also reached when the consumer stops early; the tokens generated so far are billed
+            if not failed:
+                self.usage.record(self.usage_role, self.model, tracker.usage(), time.perf_counter() - start_time)
+        
+        if cache_key is not None:
+            self.cache.set(cache_key, tracker.text())
+
+
+class AsyncOpenAIClient:
+    """asyncio-native counterpart of `OpenAIClient`, backed by `openai.AsyncOpenAI`."""
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        model: str = "gpt-5",
+        cache: Optional[CompletionCache] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        usage: Optional[UsageTracker] = None,
+        usage_role: str = "root",
+        prompt_cache_key: Optional[str] = None,
+    ):
+        self.api_key = api_key or os.getenv("OPENAI_API_KEY")
+        if not self.api_key:
+            raise ValueError("OpenAI API key is required. Set OPENAI_API_KEY environment variable or pass api_key parameter.")
+        
+        self.model = model
+        self.retry_policy = retry_policy if retry_policy is not None else RetryPolicy.from_env()
+        self.rate_limiter = rate_limiter if rate_limiter is not None else rate_limiter_from_env()
+        self.cache = cache if cache is not None else cache_from_env()
+        self.usage = usage if usage is not None else UsageTracker()
+        self.usage_role = usage_role
+        # Requests with the same key and a common message prefix reuse the provider's prompt cache
+        self.prompt_cache_key = prompt_cache_key
+    
+    @property
+    def client(self) -> AsyncOpenAI:
+        """The pooled `AsyncOpenAI` client of the running event loop."""
+        return get_async_openai_client(self.api_key)
+    
+    async def completion(
+        self,
+        messages: list[dict[str, str]] | str,
+        max_tokens: Optional[int] = None,
+        **kwargs
+    ) -> str:
+        try:
+            messages = _normalize_messages(messages)
+
+            cache_key = None
+            if self.cache is not None:
+                cache_key = make_cache_key(self.model, messages, {"max_tokens": max_tokens, **kwargs})
+                cached = self.cache.get(cache_key)
+                if cached is not None:
+                    self.usage.record_cache_hit(self.usage_role, self.model)
+                    return cached
+
+            client = self.client
+            estimated_tokens = estimate_tokens(messages, max_tokens)
+
+            async def request():
+                if self.rate_limiter is not None:
+                    await self.rate_limiter.aacquire(self.model, estimated_tokens)
+                return await client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    max_completion_tokens=max_tokens,
+                    **_with_prompt_cache_key(kwargs, self.prompt_cache_key)
+                )
+
+            start_time = time.perf_counter()
+            try:
+                response = await acall_with_retries(request, self.retry_policy)
+            except Exception:
+                self.usage.record_error(self.usage_role, self.model)
+                raise
+            self.usage.record(
+                self.usage_role, self.model, CallUsage.from_response(response), time.perf_counter() - start_time
+            )
+            if self.rate_limiter is not None:
+                self.rate_limiter.reconcile(self.model, estimated_tokens, _total_tokens(response))
+            content = response.choices[0].message.content
+            if cache_key is not None and content is not None:
+                self.cache.set(cache_key, content)
+            return content
+
+        except Exception as e:
+            raise RuntimeError(f"Error generating completion: {str(e)}")
+
+    async def stream_completion(
+        self,
+        messages: list[dict[str, str]] | str,
+        max_tokens: Optional[int] = None,
+        **kwargs
+    ) -> AsyncIterator[str]:
+        """Async variant of `OpenAIClient.stream_completion`."""
+        messages = _normalize_messages(messages)
+
+        cache_key = None
+        if self.cache is not None:
+            cache_key = make_cache_key(self.model, messages, {"max_tokens": max_tokens, **kwargs})
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                self.usage.record_cache_hit(self.usage_role, self.model)
+                yield cached
+                return
 
-            response = self.client.chat.completions.create(
+        client = self.client
+        estimated_tokens = estimate_tokens(messages, max_tokens)
+
+        async def request():
+            if self.rate_limiter is not None:
+                await self.rate_limiter.aacquire(self.model, estimated_tokens)
+            return await client.chat.completions.create(
                 model=self.model,
                 messages=messages,
                 max_completion_tokens=max_tokens,
-                **kwargs
+                stream=True,
+                stream_options={"include_usage": True},
+                **_with_prompt_cache_key(kwargs, self.prompt_cache_key)
             )
-            return response.choices[0].message.content
 
+        start_time = time.perf_counter()
+        stream = None
+        failed = False
+        tracker = _StreamTracker(messages)
+        try:
+            stream = await acall_with_retries(request, self.retry_policy)
+            async for chunk in stream:
+                delta = tracker.add(chunk)
+                if delta:
+                    yield delta
         except Exception as e:
-            raise RuntimeError(f"Error generating completion: {str(e)}")
\ No newline at end of file
+            failed = True
+            self.usage.record_error(self.usage_role, self.model)
+            raise RuntimeError(f"Error generating completion: {str(e)}")
+        finally:
+            if stream is not None:
+                await stream.close()
+            # Also reached when the consumer stops early; the tokens generated so far are billed
+            if not failed:
+                self.usage.record(self.usage_role, self.model, tracker.usage(), time.perf_counter() - start_time)
+        
+        if cache_key is not None:
+            self.cache.set(cache_key, tracker.text())
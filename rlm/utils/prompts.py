@@ -2,7 +2,7 @@
 Example prompt templates for the RLM REPL Client.
 """
 
-from typing import Dict
+from typing import Dict, Iterable, Optional
 
 DEFAULT_QUERY = "Please read through the context and answer any queries or respond to any instructions contained within it."
 
@@ -10,9 +10,10 @@ DEFAULT_QUERY = "Please read through the context and answer any queries or respo
 REPL_SYSTEM_PROMPT = """You are tasked with answering a query with associated context. You can access, transform, and analyze this context interactively in a REPL environment that can recursively query sub-LLMs, which you are strongly encouraged to use as much as possible. You will be queried iteratively until you provide a final answer.
 
 The REPL environment is initialized with:
-1. A `context` variable that contains extremely important information about your query. You should check the content of the `context` variable to understand what you are working with. Make sure you look through it sufficiently as you answer your query.
+1. A `context` variable that contains extremely important information about your query. You should check the content of the `context` variable to understand what you are working with. Make sure you look through it sufficiently as you answer your query. Files over 64MB are given as a memory-mapped `LazyText` instead of a `str`: it supports `len()`, slicing, `in`, `find()` and `count()` without loading the whole file, any other string method works on the full text, and `str(context)` gives you a plain string. The `re` module does not accept a `LazyText`: use `grep()` to search it with a regular expression. If the context was loaded from an archive (zip, tar), it is a list with one document per text file, and each document's `name` attribute is its path in the archive.
 2. A `llm_query` function that allows you to query an LLM (that can handle around 500K chars) inside your REPL environment.
-3. The ability to use `print()` statements to view the output of your REPL code and continue your reasoning.
+3. A `llm_query_batch` function that takes a list of prompts, queries the LLM on all of them concurrently, and returns the list of answers in the same order. Prefer it over calling `llm_query` in a loop whenever the prompts don't depend on each other.
+4. The ability to use `print()` statements to view the output of your REPL code and continue your reasoning.
 
 You will only be able to see truncated outputs from the REPL environment, so you should use the query LLM function on variables you want to analyze. You will find this function especially useful when you have to analyze the semantics of the context. Use these variables as buffers to build up your final answer.
 Make sure to explicitly look through the entire context in REPL before answering your query. An example strategy is to first look at the context and figure out a chunking strategy, then break up the context into smart chunks, and query an LLM per chunk with a particular question and save the answers to a buffer, then query an LLM with all the buffers to produce your final answer.
@@ -21,8 +22,8 @@ You can use the REPL environment to help you understand your context, especially
 
 When you want to execute Python code in the REPL environment, wrap it in triple backticks with 'repl' language identifier. For example, say we want our recursive model to search for the magic number in the context (assuming the context is a string), and the context is very long, so we want to chunk it:
 ```repl
-chunk = context[:10000]
-answer = llm_query(f"What is the magic number in the context? Here is the chunk: {{chunk}}")
+snippet = context[:10000]
+answer = llm_query(f"What is the magic number in the context? Here is the chunk: {{snippet}}")
 print(answer)
 ```
 
@@ -48,11 +49,41 @@ IMPORTANT: When you are done with the iterative process, you MUST provide a fina
 Think step by step carefully, plan, and execute this plan immediately in your response -- do not just say "I will do this" or "I will do that". Output to the REPL environment and recursive LLMs as much as possible. Remember to explicitly answer the original query in your final answer.
 """
 
-def build_system_prompt() -> list[Dict[str, str]]:
+# One line per group of context helpers, listed when the REPL defines the group's first name
+CONTEXT_HELPERS = (
+    (("grep",), "`grep(pattern, context_window=2, max_hits=50)`: regular expression search over the whole context in one pass, returning hits with line numbers and surrounding lines. Use it first to locate relevant parts."),
+    (("search",), "`search(query, k=10)`: top k passages (or documents, for a list context) ranked by keyword relevance, for when you don't know the exact wording."),
+    (("semantic_search",), "`semantic_search(query, k=10)`: the same kind of results, ranked by meaning (e.g. \"where is authentication configured?\")."),
+    (("get_lines", "line_at_char", "num_lines"), "`get_lines(start, end)`: lines start..end-1 (0-based) joined by newlines; `line_at_char(pos)`: line number of a character offset; `num_lines`: number of lines."),
+    (("chunk",), "`chunk(context, max_tokens=100000, overlap=0, by=\"lines\")`: (start, end) offsets of chunks of at most max_tokens tokens, cut at `\"lines\"`, `\"paragraphs\"`, `\"headers\"` or `\"files\"` boundaries (document index ranges for a list context)."),
+    (("files", "read_file", "find_files"), "The context is a concatenated codebase dump or an archive: `files` lists its files (`path`, `start`, `end`, `lines`, `language`; the content is `context[start:end]`, or `context[document]` for an archive member), `read_file(path)` returns one file and `find_files(glob)` the files matching a pattern like `\"*.py\"` or `\"src/auth/*\"`. Go straight to the relevant files instead of chunking the whole dump."),
+)
+# Worked examples shown after the helper list when the REPL defines the named helper
+CONTEXT_HELPER_EXAMPLES = (
+    ("chunk", """When the chunks are independent, run the sub-LLM calls in parallel with `llm_query_batch`, for example over the spans returned by `chunk`:
+```repl
+spans = chunk(context, max_tokens=100000)
+answers = llm_query_batch([f"What is the magic number in the context? Here is the chunk: {{context[start:end]}}" for start, end in spans])
+for i, answer in enumerate(answers):
+    print(i, answer)
+```"""),
+)
+_HELPERS_ANCHOR = "\nYou will only be able to see truncated outputs"
+
+
+def build_system_prompt(helper_names: Optional[Iterable[str]] = None) -> list[Dict[str, str]]:
+    """The system message, with a section on the context helpers in `helper_names`, if any."""
+    prompt = REPL_SYSTEM_PROMPT
+    names = set(helper_names or ())
+    lines = [f"- {text}" for group, text in CONTEXT_HELPERS if group[0] in names]
+    if lines:
+        section = "\nHelpers defined for this context (prefer them to splitting or scanning the whole context yourself):\n" + "\n".join(lines) + "\n"
+        section += "".join(f"\n{example}\n" for name, example in CONTEXT_HELPER_EXAMPLES if name in names)
+        prompt = prompt.replace(_HELPERS_ANCHOR, section + _HELPERS_ANCHOR, 1)
     return [
         {
             "role": "system",
-            "content": REPL_SYSTEM_PROMPT
+            "content": prompt
         },
     ]
 
@@ -0,0 +1,321 @@
+"""
+Deterministic search over the context, exposed in the REPL.
+
+`grep` scans the raw context once: the mapped bytes of a `LazyText` or the `str` itself,
+with `find()` for plain literals and a compiled regex otherwise. It returns line numbers and
+snippets without decoding or splitting the context.
+
+`BM25Index` is a keyword index over passages of the context (or its documents) that ranks
+them by relevance to a query.
+"""
+
+import heapq
+import math
+import re
+from array import array
+from collections import Counter
+from typing import Any, Iterator
+
+from rlm.utils.context import LazyText
+
+_REGEX_SPECIAL = frozenset(".^$*+?{}[]\\|()")
+_COUNT_CHUNK = 1 << 22
+
+
+def _count_newlines(buffer, newline, start: int, end: int) -> int:
+    if isinstance(buffer, str):
+        return buffer.count(newline, start, end)
+    # mmap has no count(); count in bounded slices so no large copy is made
+    return sum(
+        buffer[position:min(position + _COUNT_CHUNK, end)].count(newline)
+        for position in range(start, end, _COUNT_CHUNK)
+    )
+
+
+def _grep_text(
+    text: str | LazyText,
+    pattern: str,
+    context_window: int,
+    ignore_case: bool,
+    literal: bool,
+    max_line_chars: int,
+) -> Iterator[dict[str, Any]]:
+    if isinstance(text, LazyText):
+        # Match on the UTF-8 bytes directly
+        buffer, newline, needle = text.buffer, b"\n", pattern.encode("utf-8")
+        decode = lambda data: data.decode("utf-8", errors="replace")
+    else:
+        buffer, newline, needle = text, "\n", pattern
+        decode = lambda data: data
+    size = len(buffer)
+
+    use_find = not ignore_case and (literal or not _REGEX_SPECIAL.intersection(pattern))
+    if not use_find:
+        flags = re.MULTILINE | (re.IGNORECASE if ignore_case else 0)
+        regex = re.compile(re.escape(needle) if literal else needle, flags)
+
+    def line_end(position: int) -> int:
+        end = buffer.find(newline, position)
+        return size if end == -1 else end
+
+    def clip(start: int, end: int, focus_start: int, focus_end: int) -> str:
+        # Keep at most max_line_chars around [focus_start, focus_end) of the line [start, end)
+        if end - start <= max_line_chars:
+            return decode(buffer[start:end])
+        half = max(max_line_chars - (focus_end - focus_start), 0) // 2
+        clip_start = max(start, focus_start - half)
+        clip_end = min(end, max(focus_end + half, clip_start + max_line_chars))
+        prefix = "..." if clip_start > start else ""
+        suffix = "..." if clip_end < end else ""
+        return prefix + decode(buffer[clip_start:clip_end]) + suffix
+
+    line = counted = position = 0
+    while position <= size:
+        if use_find:
+            start = buffer.find(needle, position)
+            if start == -1:
+                return
+            end = start + len(needle)
+        else:
+            match = regex.search(buffer, position)
+            if match is None:
+                return
+            start, end = match.span()
+        line += _count_newlines(buffer, newline, counted, start)
+        counted = start
+
+        hit_start = buffer.rfind(newline, 0, start) + 1
+        hit_end = line_end(start)
+
+        snippet = []
+        # Lines before the hit, walking back one newline at a time
+        line_starts = []
+        cursor = hit_start
+        for _ in range(context_window):
+            if cursor == 0:
+                break
+            cursor = buffer.rfind(newline, 0, cursor - 1) + 1
+            line_starts.append(cursor)
+        for offset, before_start in enumerate(reversed(line_starts)):
+            before_end = line_end(before_start)
+            snippet.append(f"{line - len(line_starts) + offset}- {clip(before_start, before_end, before_start, before_start)}")
+        snippet.append(f"{line}: {clip(hit_start, hit_end, start, min(end, hit_end))}")
+        cursor = hit_end
+        for offset in range(1, context_window + 1):
+            if cursor >= size:
+                break
+            after_end = line_end(cursor + 1)
+            snippet.append(f"{line + offset}- {clip(cursor + 1, after_end, cursor + 1, cursor + 1)}")
+            cursor = after_end
+
+        yield {
+            "line": line,
+            "match": clip(start, end, start, start),
+            "snippet": "\n".join(snippet),
+        }
+        # One hit per line: continue on the line after the hit
+        position = hit_end + 1
+
+
+def grep(
+    context: str | LazyText | list,
+    pattern: str,
+    context_window: int = 2,
+    max_hits: int = 50,
+    ignore_case: bool = False,
+    literal: bool = False,
+    max_line_chars: int = 300,
+) -> list[dict[str, Any]]:
+    """
+    Find the lines of `context` matching `pattern` (a regular expression, `^`/`$` anchored at
+    line boundaries) in a single pass.
+
+    Args:
+        context: A string, a `LazyText`, or a list of strings (each searched as a document)
+        pattern: Regular expression, or a plain string with `literal=True`
+        context_window: Number of lines to include before and after each hit
+        max_hits: Stop after this many matching lines
+        ignore_case: Case-insensitive matching
+        literal: Treat `pattern` as plain text rather than a regular expression
+        max_line_chars: Longer lines are shortened around the match
+
+    Returns:
+        One dict per matching line: "line" (0-based line number), "match" (the matched text),
+        "snippet" (the surrounding lines, numbered, the hit marked with ":") and, for list
+        contexts, "document" (index of the document).
+    """
+    if isinstance(context, (list, tuple)):
+        hits = []
+        for index, document in enumerate(context):
+            if len(hits) >= max_hits:
+                break
+            if not isinstance(document, (str, LazyText)):
+                continue
+            for hit in _grep_text(document, pattern, context_window, ignore_case, literal, max_line_chars):
+                hits.append({"document": index, **hit})
+                if len(hits) >= max_hits:
+                    break
+        return hits
+
+    hits = []
+    for hit in _grep_text(context, pattern, context_window, ignore_case, literal, max_line_chars):
+        hits.append(hit)
+        if len(hits) >= max_hits:
+            break
+    return hits
+
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercased word tokens, as used by `BM25Index`."""
+    return _TOKEN_PATTERN.findall(text.lower())
+
+
+def text_passages(text: str | LazyText, line_index, passage_chars: int = 2000) -> Iterator[tuple[int, int]]:
+    """
+    (start, end) character offsets of consecutive passages of about `passage_chars`, ending at
+    line boundaries where possible (a single longer line is cut).
+    """
+    offsets, length = line_index.offsets, line_index.length
+    start = 0
+    while start < length:
+        target = min(start + passage_chars, length)
+        if target < length:
+            # Last line start that fits, so the passage ends right before it
+            line = line_index.line_at_char(target)
+            if offsets[line] > start:
+                target = offsets[line]
+        yield start, target
+        start = target
+
+
+def _read_spans(text: str | LazyText, spans: Iterator[tuple[int, int]]) -> Iterator[str]:
+    """Text of consecutive (start, end) spans; a `LazyText` is decoded block by block, once."""
+    if not isinstance(text, LazyText):
+        for start, end in spans:
+            yield text[start:end]
+        return
+    blocks = text.blocks()
+    buffered, offset = "", 0  # `buffered` holds the characters from `offset` on
+    for start, end in spans:
+        while offset + len(buffered) < end:
+            buffered = buffered[start - offset:] + next(blocks)
+            offset = start
+        yield buffered[start - offset:end - offset]
+
+
+def _document_text(document: Any) -> str:
+    if isinstance(document, dict):
+        return " ".join(str(value) for value in document.values())
+    return str(document)
+
+
+class PassageIndex:
+    """
+    Base of the context indexes. A text is indexed as passages (see `text_passages`), a list
+    as one entry per document; subclasses implement `_build` and rank entries in `search`.
+    """
+
+    def __init__(self):
+        self.spans: list[tuple[int, int]] = []  # Character span of each passage (text contexts)
+        self.source: Any = None
+
+    @classmethod
+    def from_text(cls, text: str | LazyText, line_index, passage_chars: int = 2000, **options) -> "PassageIndex":
+        index = cls(**options)
+        index._build(index._load(text, line_index, passage_chars))
+        return index
+
+    @classmethod
+    def from_documents(cls, documents: list, **options) -> "PassageIndex":
+        index = cls(**options)
+        index._build(index._load(documents))
+        return index
+
+    def _load(self, source: Any, line_index=None, passage_chars: int = 2000) -> Iterator[str]:
+        """Record the passages of `source` and yield the text of each."""
+        self.source = source
+        if isinstance(source, list):
+            for document in source:
+                yield _document_text(document)
+            return
+        self.spans = list(text_passages(source, line_index, passage_chars))
+        yield from _read_spans(source, iter(self.spans))
+
+    def _build(self, texts: Iterator[str]) -> None:
+        raise NotImplementedError
+
+    def __len__(self) -> int:
+        return len(self.spans) if self.spans else len(self.source or ())
+
+    def _result(self, passage: int, score: float) -> dict[str, Any]:
+        """
+        Text contexts give "start"/"end" character offsets and the passage "text"; list
+        contexts give "document" (the index) and the document itself as "text".
+        """
+        if self.spans:
+            start, end = self.spans[passage]
+            return {
+                "passage": passage, "score": round(score, 4), "start": start, "end": end,
+                "text": self.source[start:end],
+            }
+        return {"document": passage, "score": round(score, 4), "text": self.source[passage]}
+
+
+class BM25Index(PassageIndex):
+    """
+    In-memory inverted index over passages of a text (or the documents of a list), ranked
+    with Okapi BM25. Postings are stored per term as two compact arrays: passage ids and term
+    frequencies.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        super().__init__()
+        self.k1 = k1
+        self.b = b
+        self.postings: dict[str, tuple[array, array]] = {}
+        self.lengths = array("I")
+
+    def _build(self, texts: Iterator[str]) -> None:
+        for text in texts:
+            self._add(text)
+
+    def _add(self, text: str) -> None:
+        passage = len(self.lengths)
+        tokens = tokenize(text)
+        self.lengths.append(len(tokens))
+        for token, count in Counter(tokens).items():
+            entry = self.postings.get(token)
+            if entry is None:
+                entry = self.postings[token] = (array("I"), array("I"))
+            entry[0].append(passage)
+            entry[1].append(count)
+
+    def scores(self, query: str) -> dict[int, float]:
+        """BM25 score of every passage containing at least one query term."""
+        count = len(self.lengths)
+        if not count:
+            return {}
+        average_length = sum(self.lengths) / count or 1.0
+        k1, b, lengths = self.k1, self.b, self.lengths
+        scores: dict[int, float] = {}
+        for term in set(tokenize(query)):
+            entry = self.postings.get(term)
+            if entry is None:
+                continue
+            passages, frequencies = entry
+            idf = math.log(1 + (count - len(passages) + 0.5) / (len(passages) + 0.5))
+            for passage, frequency in zip(passages, frequencies):
+                norm = k1 * (1 - b + b * lengths[passage] / average_length)
+                scores[passage] = scores.get(passage, 0.0) + idf * frequency * (k1 + 1) / (frequency + norm)
+        return scores
+
+    def search(self, query: str, k: int = 10) -> list[dict[str, Any]]:
+        """Top `k` passages for `query` by BM25, best first."""
+        scores = self.scores(query)
+        return [
+            self._result(passage, score)
+            for passage, score in heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        ]
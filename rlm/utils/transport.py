@@ -0,0 +1,134 @@
+"""
+Shared HTTP transport and retry policy for the OpenAI clients.
+
+All `OpenAIClient`s in a process (root and every sub-RLM) share one keep-alive connection pool
+per API key instead of opening a new one per client. Transient failures (429, 5xx, timeouts,
+dropped connections) are retried with jittered exponential backoff that honors `Retry-After`.
+"""
+
+import asyncio
+import os
+import random
+import threading
+import time
+import weakref
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import Awaitable, Callable, Optional, TypeVar
+
+import httpx
+import openai
+from openai import OpenAI, AsyncOpenAI
+
+T = TypeVar("T")
+
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+
+@dataclass
+class RetryPolicy:
+    max_retries: int = 5
+    base_delay: float = 1.0  # Seconds before the first retry
+    max_delay: float = 60.0
+    jitter: float = 0.5  # Fraction of the delay that is randomized
+
+    @classmethod
+    def from_env(cls) -> "RetryPolicy":
+        return cls(max_retries=int(os.getenv("RLM_MAX_RETRIES", "5")))
+
+    def is_retryable(self, error: Exception) -> bool:
+        if isinstance(error, (openai.APIConnectionError, openai.APITimeoutError)):
+            return True
+        status = getattr(error, "status_code", None)
+        return status in RETRYABLE_STATUS_CODES or (status is not None and status >= 500)
+
+    def delay(self, error: Exception, attempt: int) -> float:
+        """Seconds to wait before retry number `attempt` (0-based)."""
+        retry_after = _retry_after_seconds(error)
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+        delay = min(self.base_delay * (2 ** attempt), self.max_delay)
+        return delay * (1 - self.jitter) + random.uniform(0, delay * self.jitter)
+
+
+def _retry_after_seconds(error: Exception) -> Optional[float]:
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    if headers.get("retry-after-ms"):
+        try:
+            return float(headers["retry-after-ms"]) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def call_with_retries(request: Callable[[], T], policy: RetryPolicy) -> T:
+    for attempt in range(policy.max_retries + 1):
+        try:
+            return request()
+        except Exception as e:
+            if attempt >= policy.max_retries or not policy.is_retryable(e):
+                raise
+            time.sleep(policy.delay(e, attempt))
+
+
+async def acall_with_retries(request: Callable[[], Awaitable[T]], policy: RetryPolicy) -> T:
+    for attempt in range(policy.max_retries + 1):
+        try:
+            return await request()
+        except Exception as e:
+            if attempt >= policy.max_retries or not policy.is_retryable(e):
+                raise
+            await asyncio.sleep(policy.delay(e, attempt))
+
+
+def _connection_limits() -> httpx.Limits:
+    max_connections = int(os.getenv("RLM_MAX_CONNECTIONS", "100"))
+    return httpx.Limits(
+        max_connections=max_connections,
+        max_keepalive_connections=min(max_connections, int(os.getenv("RLM_MAX_KEEPALIVE_CONNECTIONS", "20"))),
+        keepalive_expiry=30.0,
+    )
+
+
+_lock = threading.Lock()
+_sync_clients: dict[str, OpenAI] = {}
+# httpx async pools are bound to the event loop that created them, so keep one per loop
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[str, AsyncOpenAI]]" = weakref.WeakKeyDictionary()
+
+
+def get_openai_client(api_key: str) -> OpenAI:
+    """Process-wide `OpenAI` client for `api_key`, sharing one pooled HTTP transport."""
+    with _lock:
+        client = _sync_clients.get(api_key)
+        if client is None:
+            # Retries are handled by RetryPolicy so the SDK's own retry loop is disabled
+            http_client = httpx.Client(limits=_connection_limits(), timeout=httpx.Timeout(600.0, connect=10.0))
+            client = OpenAI(api_key=api_key, http_client=http_client, max_retries=0)
+            _sync_clients[api_key] = client
+        return client
+
+
+def get_async_openai_client(api_key: str) -> AsyncOpenAI:
+    """`AsyncOpenAI` client for `api_key` shared by everything on the running event loop."""
+    loop = asyncio.get_running_loop()
+    with _lock:
+        clients = _async_clients.setdefault(loop, {})
+        client = clients.get(api_key)
+        if client is None:
+            http_client = httpx.AsyncClient(limits=_connection_limits(), timeout=httpx.Timeout(600.0, connect=10.0))
+            client = AsyncOpenAI(api_key=api_key, http_client=http_client, max_retries=0)
+            clients[api_key] = client
+        return client
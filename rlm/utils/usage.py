@@ -0,0 +1,172 @@
+"""
+Token, latency and cost accounting for LLM calls.
+
+Each `OpenAIClient` records the `usage` block of every response into a `UsageTracker`, tagged
+with a role ("root" or "sub"). An `RLM_REPL` shares one tracker between its root client and
+its sub-LLM clients, so `cost_summary()` can split a session by role and by model.
+"""
+
+import threading
+from bisect import bisect_left
+from dataclasses import dataclass
+from typing import Any, Optional
+
+# USD per 1M tokens: (input, cached input, output). Reasoning tokens are billed as output.
+# Looked up by longest matching prefix, so dated snapshots ("gpt-5-mini-2025-08-07") resolve too.
+PRICING: dict[str, tuple[float, float, float]] = {
+    "gpt-5": (1.25, 0.125, 10.00),
+    "gpt-5-mini": (0.25, 0.025, 2.00),
+    "gpt-5-nano": (0.05, 0.005, 0.40),
+    "gpt-4.1": (2.00, 0.50, 8.00),
+    "gpt-4.1-mini": (0.40, 0.10, 1.60),
+    "gpt-4.1-nano": (0.10, 0.025, 0.40),
+    "gpt-4o": (2.50, 1.25, 10.00),
+    "gpt-4o-mini": (0.15, 0.075, 0.60),
+    "o3": (2.00, 0.50, 8.00),
+    "o4-mini": (1.10, 0.275, 4.40),
+}
+
+# Upper bounds (seconds) of the latency histogram buckets; the last bucket is open-ended
+LATENCY_BUCKETS = (0.5, 1.0, 2.0, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+def model_pricing(model: str, pricing: Optional[dict] = None) -> Optional[tuple[float, float, float]]:
+    pricing = pricing if pricing is not None else PRICING
+    matches = [name for name in pricing if model == name or model.startswith(name + "-")]
+    return pricing[max(matches, key=len)] if matches else None
+
+
+@dataclass
+class CallUsage:
+    """Token counts of a single completion call."""
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached_tokens: int = 0  # Prompt tokens served from the provider's prefix cache
+    reasoning_tokens: int = 0  # Part of completion_tokens
+
+    @classmethod
+    def from_response(cls, response) -> "CallUsage":
+        usage = getattr(response, "usage", None)
+        if usage is None:
+            return cls()
+        prompt_details = getattr(usage, "prompt_tokens_details", None)
+        completion_details = getattr(usage, "completion_tokens_details", None)
+        return cls(
+            prompt_tokens=getattr(usage, "prompt_tokens", 0) or 0,
+            completion_tokens=getattr(usage, "completion_tokens", 0) or 0,
+            cached_tokens=getattr(prompt_details, "cached_tokens", 0) or 0,
+            reasoning_tokens=getattr(completion_details, "reasoning_tokens", 0) or 0,
+        )
+
+    def cost(self, prices: tuple[float, float, float]) -> float:
+        input_price, cached_price, output_price = prices
+        uncached = self.prompt_tokens - self.cached_tokens
+        return (
+            uncached * input_price + self.cached_tokens * cached_price + self.completion_tokens * output_price
+        ) / 1_000_000
+
+
+class _UsageTotals:
+    __slots__ = (
+        "calls", "cache_hits", "errors", "prompt_tokens", "completion_tokens", "cached_tokens",
+        "reasoning_tokens", "cost_usd", "latency_total", "latency_histogram",
+    )
+
+    def __init__(self):
+        self.calls = self.cache_hits = self.errors = 0
+        self.prompt_tokens = self.completion_tokens = self.cached_tokens = self.reasoning_tokens = 0
+        self.cost_usd = self.latency_total = 0.0
+        self.latency_histogram = [0] * (len(LATENCY_BUCKETS) + 1)
+
+    def add(self, usage: CallUsage, latency: float, cost: float) -> None:
+        self.calls += 1
+        self.prompt_tokens += usage.prompt_tokens
+        self.completion_tokens += usage.completion_tokens
+        self.cached_tokens += usage.cached_tokens
+        self.reasoning_tokens += usage.reasoning_tokens
+        self.cost_usd += cost
+        self.latency_total += latency
+        self.latency_histogram[bisect_left(LATENCY_BUCKETS, latency)] += 1
+
+    def merge(self, other: "_UsageTotals") -> None:
+        for name in self.__slots__:
+            if name == "latency_histogram":
+                self.latency_histogram = [a + b for a, b in zip(self.latency_histogram, other.latency_histogram)]
+            else:
+                setattr(self, name, getattr(self, name) + getattr(other, name))
+
+    def as_dict(self) -> dict[str, Any]:
+        labels = [f"<={bound:g}s" for bound in LATENCY_BUCKETS] + [f">{LATENCY_BUCKETS[-1]:g}s"]
+        return {
+            "calls": self.calls,
+            "cache_hits": self.cache_hits,
+            "errors": self.errors,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "cached_tokens": self.cached_tokens,
+            "reasoning_tokens": self.reasoning_tokens,
+            "total_tokens": self.prompt_tokens + self.completion_tokens,
+            # Share of prompt tokens served from the provider's prefix cache
+            "cached_prompt_ratio": self.cached_tokens / self.prompt_tokens if self.prompt_tokens else 0.0,
+            "cost_usd": round(self.cost_usd, 6),
+            "mean_latency_seconds": self.latency_total / self.calls if self.calls else 0.0,
+            "latency_histogram": dict(zip(labels, self.latency_histogram)),
+        }
+
+
+class UsageTracker:
+    """
+    Thread-safe running totals of LLM usage, keyed by (role, model). `summary()` returns the
+    totals overall, per role and per model. Models missing from the pricing table are counted
+    at zero cost and listed under "unpriced_models".
+    """
+
+    def __init__(self, pricing: Optional[dict[str, tuple[float, float, float]]] = None):
+        self.pricing = pricing
+        self._lock = threading.Lock()
+        self._totals: dict[tuple[str, str], _UsageTotals] = {}
+
+    def _entry(self, role: str, model: str) -> _UsageTotals:
+        entry = self._totals.get((role, model))
+        if entry is None:
+            entry = self._totals[(role, model)] = _UsageTotals()
+        return entry
+
+    def record(self, role: str, model: str, usage: CallUsage, latency: float) -> None:
+        prices = model_pricing(model, self.pricing)
+        cost = usage.cost(prices) if prices is not None else 0.0
+        with self._lock:
+            self._entry(role, model).add(usage, latency, cost)
+
+    def record_cache_hit(self, role: str, model: str) -> None:
+        with self._lock:
+            self._entry(role, model).cache_hits += 1
+
+    def record_error(self, role: str, model: str) -> None:
+        with self._lock:
+            self._entry(role, model).errors += 1
+
+    def reset(self) -> None:
+        with self._lock:
+            self._totals.clear()
+
+    def summary(self, role: Optional[str] = None) -> dict[str, Any]:
+        """Usage since the last reset, restricted to one role if given."""
+        total = _UsageTotals()
+        by_role: dict[str, _UsageTotals] = {}
+        by_model: dict[str, _UsageTotals] = {}
+        with self._lock:
+            for (entry_role, model), entry in self._totals.items():
+                if role is not None and entry_role != role:
+                    continue
+                total.merge(entry)
+                by_role.setdefault(entry_role, _UsageTotals()).merge(entry)
+                by_model.setdefault(model, _UsageTotals()).merge(entry)
+        return {
+            **total.as_dict(),
+            "by_role": {name: totals.as_dict() for name, totals in by_role.items()},
+            "by_model": {name: totals.as_dict() for name, totals in by_model.items()},
+            "unpriced_models": sorted(
+                model for model in by_model if model_pricing(model, self.pricing) is None
+            ),
+        }
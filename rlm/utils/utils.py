@@ -3,17 +3,26 @@ Utility functions for the RLM REPL Client.
 """
 
 import re
-from typing import List, Dict, Optional, Tuple, Any
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Iterator, List, Dict, Optional, Tuple, Any
+
+from rlm.utils.context import LazyText
+from rlm.utils.variables import VariableSummarizer, VariableSummary
+
+_log = logging.getLogger(__name__)
+
+_CODE_BLOCK_PATTERN = re.compile(r'```repl\s*\n(.*?)\n```', re.DOTALL)
 
 def find_code_blocks(text: str) -> List[str]:
     """
     Find REPL code blocks in text wrapped in triple backticks and return List of content(s).
     Returns None if no code blocks are found.
     """
-    pattern = r'```repl\s*\n(.*?)\n```'
     results = []
     
-    for match in re.finditer(pattern, text, re.DOTALL):
+    for match in _CODE_BLOCK_PATTERN.finditer(text):
         code_content = match.group(1).strip()
         results.append(code_content)
     
@@ -73,7 +82,9 @@ def format_execution_result(
     stdout: str,
     stderr: str,
     locals_dict: Dict[str, Any],
-    truncate_length: int = 100
+    truncate_length: int = 100,
+    summarizer: Optional[VariableSummarizer] = None,
+    variables: Optional[List[VariableSummary]] = None,
 ) -> str:
     """
     Format the execution result as a string for display.
@@ -83,6 +94,8 @@ def format_execution_result(
         stderr: Standard error from execution
         locals_dict: Local variables after execution
         truncate_length: Maximum length of the string to display per var
+        summarizer: Summary cache to reuse across executions (e.g. the REPL environment's)
+        variables: Precomputed variable summaries; when given, locals_dict is not inspected
     """
     result_parts = []
     
@@ -92,22 +105,16 @@ def format_execution_result(
     if stderr:
         result_parts.append(f"\n{stderr}")
     
-    # Show some key variables (excluding internal ones)
-    important_vars = {}
-    for key, value in locals_dict.items():
-        if not key.startswith('_') and not key in ['__builtins__', '__name__', '__doc__']:
-            try:
-                # Only show simple types or short representations
-                if isinstance(value, (str, int, float, bool, list, dict, tuple)):
-                    if isinstance(value, str) and len(value) > truncate_length:
-                        important_vars[key] = f"'{value[:truncate_length]}...'"
-                    else:
-                        important_vars[key] = repr(value)
-            except:
-                important_vars[key] = f"<{type(value).__name__}>"
+    # Show some key variables (excluding internal ones). Only names are listed, so values
+    # are summarized by type without ever computing their repr.
+    if variables is None:
+        if summarizer is None:
+            summarizer = VariableSummarizer(max_preview=truncate_length)
+        variables = summarizer.summarize_all(locals_dict)
+    important_vars = [summary.name for summary in variables if summary.is_simple]
     
     if important_vars:
-        result_parts.append(f"REPL variables: {list(important_vars.keys())}\n")
+        result_parts.append(f"REPL variables: {important_vars}\n")
     
     return "\n\n".join(result_parts) if result_parts else "No output"
 
@@ -130,9 +137,37 @@ def execute_code(repl_env, code: str, repl_env_logger, logger) -> str:
         result = repl_env.code_execution(code)
         
         formatted_result = format_execution_result(
-            result.stdout, result.stderr, result.locals
+            result.stdout, result.stderr, result.locals, variables=result.variables,
+        )
+        changed_vars = [summary for summary in result.variables if summary.name in result.changed]
+        repl_env_logger.log_execution(
+            code, result.stdout, result.stderr, result.execution_time, variables=changed_vars
+        )
+        repl_env_logger.display_last()
+
+        # Print out tool execution to root
+        logger.log_tool_execution("CODE_EXECUTION", formatted_result)
+        
+        return formatted_result
+        
+    except Exception as e:
+        error_msg = f"Error executing code: {str(e)}"
+        return error_msg
+
+async def aexecute_code(repl_env, code: str, repl_env_logger, logger) -> str:
+    """
+    Async variant of `execute_code` that awaits `repl_env.acode_execution`.
+    """
+    try:
+        result = await repl_env.acode_execution(code)
+        
+        formatted_result = format_execution_result(
+            result.stdout, result.stderr, result.locals, variables=result.variables,
+        )
+        changed_vars = [summary for summary in result.variables if summary.name in result.changed]
+        repl_env_logger.log_execution(
+            code, result.stdout, result.stderr, result.execution_time, variables=changed_vars
         )
-        repl_env_logger.log_execution(code, result.stdout, result.stderr, result.execution_time)
         repl_env_logger.display_last()
 
         # Print out tool execution to root
@@ -180,6 +215,151 @@ def process_code_execution(
     
     return messages
 
+async def aprocess_code_execution(
+    response: str,
+    messages: List[Dict[str, str]],
+    repl_env,
+    repl_env_logger,
+    logger,
+) -> List[Dict[str, str]]:
+    """
+    Async variant of `process_code_execution`. Code blocks still run one after another.
+    """
+    code_blocks = find_code_blocks(response)
+    
+    if code_blocks:
+        for code in code_blocks:
+            execution_result = await aexecute_code(repl_env, code, repl_env_logger, logger)
+            
+            messages = add_execution_result_to_messages(
+                messages, code, execution_result, 
+            )
+    
+    return messages
+
+class StreamingResponseParser:
+    """
+    Incremental counterpart of `find_code_blocks` / `find_final_answer` for a streamed response.
+    `feed()` returns the code blocks completed by each new piece of text, in the same form
+    `find_code_blocks` would return them for the full response.
+    """
+
+    def __init__(self):
+        self._text = ""
+        self._pending: List[str] = []
+        self._position = 0  # End of the last complete code block
+        self.final_answer_seen = False
+
+    @property
+    def text(self) -> str:
+        if self._pending:
+            self._text += "".join(self._pending)
+            self._pending.clear()
+        return self._text
+
+    def feed(self, delta: str) -> List[str]:
+        self._pending.append(delta)
+        blocks = []
+        # A closing fence needs a backtick and a FINAL(...) a closing parenthesis, so other pieces
+        # can't complete anything and the accumulated text isn't re-scanned for them
+        if "`" in delta:
+            text = self.text
+            for match in _CODE_BLOCK_PATTERN.finditer(text, self._position):
+                blocks.append(match.group(1).strip())
+                self._position = match.end()
+        if not self.final_answer_seen and ("`" in delta or ")" in delta):
+            text = self.text
+            # FINAL_VAR(...) inside a code block that hasn't closed yet is a call, not an answer
+            inside_block = text.find("```repl", self._position) != -1
+            self.final_answer_seen = not inside_block and find_final_answer(text) is not None
+        return blocks
+
+
+def process_streamed_response(
+    chunks: Iterator[str],
+    messages: List[Dict[str, str]],
+    repl_env,
+    repl_env_logger,
+    logger,
+) -> Tuple[str, List[Dict[str, str]]]:
+    """
+    Streaming variant of `process_code_execution`. Each code block starts executing (in order,
+    on a background thread) as soon as its closing fence arrives, while the rest of the response
+    is still being generated. The stream is abandoned once a FINAL/FINAL_VAR answer outside an
+    open code block appears; code blocks after it are not run.
+    
+    Args:
+        chunks: The root model response as it streams in (e.g. `OpenAIClient.stream_completion`)
+        messages: Current conversation messages
+        repl_env: The REPL environment
+        repl_env_logger: Logger for execution environment
+        logger: Main logger
+        
+    Returns:
+        The (possibly cut short) response text and the updated messages list
+    """
+    parser = StreamingResponseParser()
+    executions = []
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="repl-stream") as executor:
+        try:
+            for delta in chunks:
+                for code in parser.feed(delta):
+                    executions.append((code, executor.submit(execute_code, repl_env, code, repl_env_logger, logger)))
+                if parser.final_answer_seen:
+                    break
+        finally:
+            close = getattr(chunks, "close", None)
+            if close is not None:
+                close()
+        
+        for code, execution in executions:
+            messages = add_execution_result_to_messages(
+                messages, code, execution.result(),
+            )
+    
+    return parser.text, messages
+
+async def aprocess_streamed_response(
+    chunks: AsyncIterator[str],
+    messages: List[Dict[str, str]],
+    repl_env,
+    repl_env_logger,
+    logger,
+) -> Tuple[str, List[Dict[str, str]]]:
+    """
+    Async variant of `process_streamed_response`. Code blocks run as tasks on the running loop,
+    each one starting after the previous block has finished.
+    """
+    async def run_after(previous: Optional[asyncio.Task], code: str) -> str:
+        if previous is not None:
+            await asyncio.wait([previous])
+        return await aexecute_code(repl_env, code, repl_env_logger, logger)
+    
+    parser = StreamingResponseParser()
+    executions = []
+    try:
+        async for delta in chunks:
+            for code in parser.feed(delta):
+                previous = executions[-1][1] if executions else None
+                executions.append((code, asyncio.create_task(run_after(previous, code))))
+            if parser.final_answer_seen:
+                break
+    finally:
+        aclose = getattr(chunks, "aclose", None)
+        if aclose is not None:
+            await aclose()
+        # Let the blocks that did arrive finish, even if the stream failed
+        results = await asyncio.gather(*(task for _, task in executions), return_exceptions=True)
+    
+    for (code, _), result in zip(executions, results):
+        if isinstance(result, BaseException):
+            result = f"Error executing code: {str(result)}"
+        messages = add_execution_result_to_messages(
+            messages, code, result,
+        )
+    
+    return parser.text, messages
+
 def check_for_final_answer(response: str, repl_env, logger) -> Optional[str]:
     """Check if response contains a final answer."""
     result = find_final_answer(response)
@@ -196,6 +376,13 @@ def check_for_final_answer(response: str, repl_env, logger) -> Optional[str]:
             # Strip spaces, quotes, and newlines from variable name
             variable_name = content.strip().strip('"').strip("'").strip('\n').strip('\r')
             
+            # A process-backed REPL whose worker was killed has lost its variables
+            ended = getattr(repl_env, "ended", None)
+            if ended is not None:
+                error_msg = f"Variable '{variable_name}' is no longer available: the REPL session has ended ({ended})"
+                logger.log_tool_execution("FINAL_VAR", error_msg)
+                return None
+            
             # Check if variable exists in the REPL environment's locals
             if variable_name in repl_env.locals:
                 variable_value = repl_env.locals[variable_name]
@@ -206,7 +393,7 @@ def check_for_final_answer(response: str, repl_env, logger) -> Optional[str]:
                 return None
         except Exception as e:
             error_msg = f"Error retrieving variable '{variable_name}': {str(e)}"
-            print('ERROR MESSAGE', error_msg)
+            _log.warning(error_msg)
             logger.log_tool_execution("FINAL_VAR", error_msg)
             return None
     
@@ -219,7 +406,7 @@ def convert_context_for_repl(context):
     if isinstance(context, dict):
         context_data = context
         context_str = None
-    elif isinstance(context, str):
+    elif isinstance(context, (str, LazyText)):
         context_data = None
         context_str = context
     elif isinstance(context, list):
@@ -0,0 +1,140 @@
+"""
+Cheap summaries of REPL variables, shared by the result formatter and the loggers.
+
+Summaries never call `repr()` on a whole value: they record the type and length up front and
+build a bounded preview only when someone asks for it.
+"""
+
+import reprlib
+import sys
+from collections.abc import Mapping
+from typing import Any, Iterable, Optional
+
+# Types listed as "REPL variables" in the execution result shown to the root model
+SIMPLE_TYPES = (str, int, float, bool, list, dict, tuple)
+
+
+def _length(value: Any) -> Optional[int]:
+    if hasattr(type(value), "__len__"):
+        try:
+            return len(value)
+        except Exception:
+            return None
+    return None
+
+
+def bounded_repr(value: Any, max_length: int = 100) -> str:
+    """repr() that only looks at a bounded prefix of strings and containers."""
+    limiter = reprlib.Repr()
+    limiter.maxlevel = 2
+    limiter.maxstring = max_length
+    limiter.maxother = max_length
+    limiter.maxlist = limiter.maxtuple = limiter.maxset = limiter.maxdict = 10
+    try:
+        text = limiter.repr(value)
+    except Exception:
+        text = f"<{type(value).__name__}>"
+    return text if len(text) <= max_length else text[:max_length] + "..."
+
+
+def approximate_size(value: Any, max_objects: int = 10000) -> int:
+    """
+    Approximate memory footprint in bytes: `sys.getsizeof` of the value plus the contents of
+    nested lists, tuples, sets and dicts, visiting at most `max_objects` objects.
+    """
+    seen = set()
+    stack = [value]
+    total = 0
+    while stack and len(seen) < max_objects:
+        item = stack.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        try:
+            total += sys.getsizeof(item)
+        except Exception:
+            continue
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            stack.extend(item)
+    return total
+
+
+class VariableSummary:
+    """Type, length and a lazily computed, bounded preview of one variable."""
+
+    __slots__ = ("name", "type_name", "length", "is_simple", "max_preview", "_value", "_preview")
+
+    def __init__(self, name: str, value: Any, max_preview: int = 100):
+        self.name = name
+        self.type_name = type(value).__name__
+        self.length = _length(value)
+        self.is_simple = isinstance(value, SIMPLE_TYPES)
+        self.max_preview = max_preview
+        self._value = value
+        self._preview: Optional[str] = None
+
+    @property
+    def preview(self) -> str:
+        if self._preview is None:
+            self._preview = bounded_repr(self._value, self.max_preview)
+            self._value = None  # Don't keep the object alive once the preview exists
+        return self._preview
+
+    def describe(self) -> str:
+        """One-line description, e.g. `chunks: list[120] = ['abc', ...]`."""
+        size = f"[{self.length}]" if self.length is not None else ""
+        return f"{self.name}: {self.type_name}{size} = {self.preview}"
+
+    def __getstate__(self):
+        # Ship the bounded preview, never the value itself (e.g. from a REPL worker process)
+        return (self.name, self.type_name, self.length, self.is_simple, self.max_preview, self.preview)
+
+    def __setstate__(self, state) -> None:
+        self.name, self.type_name, self.length, self.is_simple, self.max_preview, self._preview = state
+        self._value = None
+
+    def __repr__(self) -> str:
+        return f"VariableSummary(name={self.name!r}, type={self.type_name}, length={self.length})"
+
+
+class VariableSummarizer:
+    """
+    Per-environment cache of variable summaries. An entry is reused while the variable still
+    refers to the same object with the same length, so unchanged buffers are never re-inspected.
+    """
+
+    def __init__(self, max_preview: int = 100):
+        self.max_preview = max_preview
+        self._cache: dict[str, tuple[tuple[int, Optional[int]], VariableSummary]] = {}
+
+    def summarize(self, name: str, value: Any) -> VariableSummary:
+        version = (id(value), _length(value))
+        cached = self._cache.get(name)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        summary = VariableSummary(name, value, self.max_preview)
+        self._cache[name] = (version, summary)
+        return summary
+
+    def summarize_all(self, variables: Mapping, names: Optional[Iterable[str]] = None) -> list[VariableSummary]:
+        """
+        Summarize the public (non-underscore) variables, or only `names` if given. A full pass
+        also drops cache entries for variables that no longer exist.
+        """
+        if names is None:
+            summaries = [
+                self.summarize(name, value) for name, value in variables.items()
+                if not name.startswith('_')
+            ]
+            live = {summary.name for summary in summaries}
+            for name in list(self._cache):
+                if name not in live:
+                    del self._cache[name]
+            return summaries
+        return [
+            self.summarize(name, variables[name]) for name in names
+            if not name.startswith('_') and name in variables
+        ]
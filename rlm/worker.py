@@ -0,0 +1,390 @@
+"""
+Process-isolated REPL execution.
+
+`ProcessREPLEnv` is a drop-in alternative to `REPLEnv` whose namespace lives in a separate
+worker process taken from a warm `WorkerPool`. Model-generated code, its `os.chdir` and
+`sys.stdout` swaps, and its CPU time all stay in the worker, so sessions in one process run in
+parallel across cores. Sub-LLM calls made by the code are sent back to the parent over the
+pipe, so caching and client configuration stay in one place.
+"""
+
+import asyncio
+import multiprocessing
+import os
+import pickle
+import threading
+import time
+from collections.abc import Mapping
+from multiprocessing.connection import Connection
+from typing import Callable, Optional
+
+from rlm import RLM
+from rlm.repl import REPLEnv, REPLResult, Sub_RLM, _SubLMDispatch, redirect_uncaptured_stdout
+from rlm.utils.context import LazyText
+from rlm.utils.limits import ExecutionLimits
+from rlm.utils.usage import UsageTracker
+
+
+class _ParentSubRLM(RLM):
+    """Sub-RLM used inside a worker: forwards every query to the parent process."""
+
+    def __init__(self, conn: Connection):
+        self._conn = conn
+        self._lock = threading.Lock()
+
+    def _request(self, message: tuple):
+        with self._lock:
+            self._conn.send(message)
+            return self._conn.recv()
+
+    def completion(self, prompt) -> str:
+        return self._request(("llm_query", prompt))
+
+    def batch_completion(self, prompts: list, max_concurrency: int) -> list[str]:
+        return self._request(("llm_query_batch", prompts, max_concurrency))
+
+    def send_output(self, stream_name: str, text: str) -> None:
+        with self._lock:
+            self._conn.send(("output", stream_name, text))
+
+    def cost_summary(self) -> dict[str, float]:
+        raise NotImplementedError("Cost tracking happens in the parent process.")
+
+    def reset(self):
+        raise NotImplementedError("Reset is not implemented for the worker Sub-RLM.")
+
+
+def _worker_main(conn: Connection) -> None:
+    """Entry point of a pooled worker process: serve one REPL session, then exit."""
+    try:
+        message = conn.recv()
+    except EOFError:
+        return
+    # An idle worker is closed before it ever served a session
+    if message[0] != "init":
+        return
+    _, options = message
+    # The worker shares the parent's stdout, which may be a protocol channel (MCP)
+    redirect_uncaptured_stdout()
+
+    sub_rlm = _ParentSubRLM(conn)
+    try:
+        env = REPLEnv(
+            context_json=options["context_json"],
+            context_str=options["context_str"],
+            setup_code=options["setup_code"],
+            max_concurrency=options["max_concurrency"],
+            sub_rlm=sub_rlm,
+            on_output=sub_rlm.send_output if options["stream_output"] else None,
+            limits=options["limits"],
+            dedicated_process=True,
+        )
+    except Exception as e:
+        conn.send(("error", f"Failed to start REPL worker: {e}"))
+        return
+    # The worker serves this one session, so relative paths in its code can use the process
+    # working directory
+    os.chdir(env.temp_dir)
+    conn.send(("ready", env.helper_names))
+
+    missing = object()
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            break
+        kind = message[0]
+        if kind == "execute":
+            result = env.code_execution(message[1])
+            conn.send((
+                "result", result.stdout, result.stderr, result.execution_time,
+                result.changed, result.deleted, result.variables, result.budget_exceeded,
+            ))
+        elif kind == "contains":
+            conn.send(("value", message[1] in env.locals))
+        elif kind == "keys":
+            conn.send(("value", list(env.locals)))
+        elif kind == "get":
+            value = env.locals.get(message[1], missing)
+            if value is missing:
+                conn.send(("missing",))
+                continue
+            try:
+                payload = pickle.dumps(("value", value))
+            except Exception:
+                # Unpicklable values (e.g. functions defined in the REPL) come back as str
+                payload = pickle.dumps(("value", str(value)))
+            conn.send_bytes(payload)
+        elif kind == "reset_session_budget":
+            env.reset_session_budget()
+            conn.send(("ok",))
+        elif kind == "memory":
+            conn.send(("value", env.memory_usage()))
+        elif kind == "close":
+            break
+
+
+class _Worker:
+    """A started worker process and the parent's end of its pipe."""
+
+    def __init__(self, mp_context):
+        self.conn, child_conn = mp_context.Pipe()
+        self.process = mp_context.Process(target=_worker_main, args=(child_conn,), daemon=True)
+        self.process.start()
+        child_conn.close()
+
+    def stop(self, timeout: float = 1.0) -> None:
+        try:
+            self.conn.send(("close",))
+        except (OSError, EOFError, BrokenPipeError):
+            pass
+        self.conn.close()
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join(timeout)
+
+
+class WorkerPool:
+    """
+    Keeps `size` worker processes started and idle so a new session never pays interpreter
+    start-up. Each worker serves exactly one session and is discarded afterwards; the pool
+    starts a replacement right away.
+    """
+
+    def __init__(self, size: int = 2, start_method: str = "spawn"):
+        self.size = size
+        self._mp_context = multiprocessing.get_context(start_method)
+        self._idle: list[_Worker] = []
+        self._lock = threading.Lock()
+        self._fill()
+
+    def _fill(self) -> None:
+        with self._lock:
+            while len(self._idle) < self.size:
+                self._idle.append(_Worker(self._mp_context))
+
+    def acquire(self) -> _Worker:
+        with self._lock:
+            worker = None
+            while self._idle and worker is None:
+                candidate = self._idle.pop(0)
+                if candidate.process.is_alive():
+                    worker = candidate
+                else:
+                    candidate.conn.close()
+        if worker is None:
+            worker = _Worker(self._mp_context)
+        self._fill()
+        return worker
+
+    def release(self, worker: _Worker) -> None:
+        worker.stop()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+            self.size = 0
+        for worker in idle:
+            worker.stop()
+
+
+_default_pool: Optional[WorkerPool] = None
+_default_pool_lock = threading.Lock()
+
+def get_worker_pool() -> WorkerPool:
+    """Process-wide pool, sized by RLM_WORKER_POOL_SIZE (default 2)."""
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = WorkerPool(size=int(os.getenv("RLM_WORKER_POOL_SIZE", "2")))
+        return _default_pool
+
+
+class RemoteVariables(Mapping):
+    """Read-only view of the variables living in a worker's namespace, fetched on demand."""
+
+    def __init__(self, env: "ProcessREPLEnv"):
+        self._env = env
+
+    def __getitem__(self, key):
+        reply = self._env._request(("get", key))
+        if reply[0] == "missing":
+            raise KeyError(key)
+        return reply[1]
+
+    def __contains__(self, key) -> bool:
+        return self._env._request(("contains", key))[1]
+
+    def __iter__(self):
+        return iter(self._env._request(("keys",))[1])
+
+    def __len__(self) -> int:
+        return len(self._env._request(("keys",))[1])
+
+    def __repr__(self) -> str:
+        return f"RemoteVariables({list(self)})"
+
+
+class ProcessREPLEnv(_SubLMDispatch):
+    """
+    REPL environment backed by a worker process. Same interface as `REPLEnv`:
+    `code_execution`, `acode_execution` and a `locals` mapping (fetched from the worker).
+    """
+
+    def __init__(
+        self,
+        recursive_model: str = "gpt-5-mini",
+        context_json: Optional[dict | list] = None,
+        context_str: Optional[str | LazyText] = None,
+        setup_code: str = None,
+        max_concurrency: int = 8,
+        cache=None,
+        sub_rlm: Optional[RLM] = None,
+        on_output: Optional[Callable[[str, str], None]] = None,
+        pool: Optional[WorkerPool] = None,
+        limits: Optional[ExecutionLimits] = None,
+        kill_grace_period: float = 5.0,
+        usage: Optional[UsageTracker] = None,
+    ):
+        self.sub_rlm: RLM = sub_rlm if sub_rlm is not None else Sub_RLM(model=recursive_model, cache=cache, usage=usage)
+        self.max_concurrency = max_concurrency
+        self.on_output = on_output
+        # Budgets are enforced inside the worker; if a cell overruns its time budget by more than
+        # `kill_grace_period` (e.g. stuck in C code), the worker process is killed instead
+        self.limits = limits if limits is not None else ExecutionLimits()
+        self.kill_grace_period = kill_grace_period
+        self._session_elapsed = 0.0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+
+        self.pool = pool if pool is not None else get_worker_pool()
+        self._worker = self.pool.acquire()
+        # A LazyText context is pickled by path, so the worker maps the same file pages
+        ready = self._request(("init", {
+            "context_json": context_json,
+            "context_str": context_str,
+            "setup_code": setup_code,
+            "max_concurrency": max_concurrency,
+            "stream_output": on_output is not None,
+            "limits": self.limits,
+        }))
+        # Context helpers the worker's REPL defined, for the system prompt
+        self.helper_names: list[str] = ready[1]
+        self.locals: Mapping = RemoteVariables(self)
+        # Why the session ended early (its worker was killed), if it did
+        self.ended: Optional[str] = None
+
+    def _charge_llm_calls(self, count: int) -> None:
+        # Sub-LLM budgets are counted by the REPL inside the worker
+        pass
+    
+    def _request(self, message: tuple, timeout: Optional[float] = None) -> tuple:
+        """
+        Send a message and serve the worker's sub-LLM calls and output until it replies.
+        Raises TimeoutError if no reply arrives within `timeout` seconds.
+        """
+        with self._lock:
+            if self._worker is None:
+                raise RuntimeError("REPL worker has been closed")
+            conn = self._worker.conn
+            deadline = time.monotonic() + timeout if timeout is not None else None
+            try:
+                conn.send(message)
+                while True:
+                    if deadline is not None and not conn.poll(max(deadline - time.monotonic(), 0)):
+                        raise TimeoutError("REPL worker did not respond in time")
+                    reply = conn.recv()
+                    kind = reply[0]
+                    if kind == "output":
+                        if self.on_output is not None:
+                            self.on_output(reply[1], reply[2])
+                    elif kind == "llm_query":
+                        conn.send(self._llm_query(reply[1]))
+                    elif kind == "llm_query_batch":
+                        conn.send(self._llm_query_batch(reply[1], reply[2]))
+                    elif kind == "error":
+                        raise RuntimeError(reply[1])
+                    else:
+                        return reply
+            except TimeoutError:
+                raise
+            except (EOFError, OSError, BrokenPipeError) as e:
+                raise RuntimeError(f"REPL worker exited unexpectedly: {e}")
+
+    def _hard_timeout(self) -> Optional[float]:
+        limits = self.limits
+        wall_limits = [limit for limit in (
+            limits.cell_timeout,
+            limits.session_timeout - self._session_elapsed if limits.session_timeout is not None else None,
+        ) if limit is not None]
+        return max(min(wall_limits), 0.0) + self.kill_grace_period if wall_limits else None
+    
+    def code_execution(self, code) -> REPLResult:
+        if self.ended is not None:
+            return REPLResult(
+                "", f"The REPL session has ended ({self.ended}); its variables are gone and no more code can run.\n",
+                self.locals, 0.0, variables=[], budget_exceeded=self.ended,
+            )
+        start_time = time.time()
+        try:
+            reply = self._request(("execute", code), timeout=self._hard_timeout())
+        except TimeoutError:
+            # The worker ignored its own budget, so kill it; the session's namespace is lost
+            worker = self._worker
+            if worker is not None:
+                worker.process.kill()
+            self.close()
+            execution_time = time.time() - start_time
+            self._session_elapsed += execution_time
+            self.ended = "wall-clock limit exceeded and the REPL worker had to be killed"
+            self.locals = {}
+            return REPLResult(
+                "", f"ExecutionBudgetExceeded: {self.ended}. The REPL session has ended.\n",
+                self.locals, execution_time, variables=[], budget_exceeded=self.ended,
+            )
+        _, stdout, stderr, execution_time, changed, deleted, variables, budget_exceeded = reply
+        self._session_elapsed += execution_time
+        return REPLResult(
+            stdout, stderr, self.locals, execution_time,
+            changed, deleted, variables, budget_exceeded,
+        )
+
+    async def acode_execution(self, code) -> REPLResult:
+        """
+        Async variant of `code_execution`. Waiting on the worker happens in a thread, and the
+        worker's sub-LLM calls are awaited on the running loop.
+        """
+        self._loop = asyncio.get_running_loop()
+        try:
+            return await asyncio.to_thread(self.code_execution, code)
+        finally:
+            self._loop = None
+
+    def close(self) -> None:
+        """Release the worker process. The environment can't be used afterwards."""
+        with self._lock:
+            worker, self._worker = self._worker, None
+        if worker is not None:
+            self.pool.release(worker)
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
+    def get_cost_summary(self) -> dict:
+        """Token usage, latency and cost of the sub-LM calls (made from this, the parent, process)."""
+        return self.sub_rlm.cost_summary()
+    
+    def reset_session_budget(self) -> None:
+        self._session_elapsed = 0.0
+        if self.ended is None:
+            self._request(("reset_session_budget",))
+    
+    def memory_usage(self) -> dict:
+        """Same as `REPLEnv.memory_usage`; `rss_mb` is the worker process's."""
+        if self.ended is not None:
+            return {"variables": {}, "variable_bytes": 0, "rss_mb": 0.0}
+        return self._request(("memory",))[1]
@@ -3,11 +3,29 @@ Shared query logic for both CLI and MCP server.
 """
 
 import os
+import threading
 from pathlib import Path
 from rlm.rlm_repl import RLM_REPL
+from rlm.session import SessionManager
+from rlm.utils.context import LazyText
 
 
-def query_text(text: str, query: str, max_iterations: int = 10, enable_logging: bool = False) -> str:
+_session_manager = None
+_session_manager_lock = threading.Lock()
+
+def get_session_manager() -> SessionManager:
+    """
+    Sessions shared by `query_file`/`aquery_file`: asking several questions about the same file
+    loads it once, and REPL variables from earlier questions stay available.
+    """
+    global _session_manager
+    with _session_manager_lock:
+        if _session_manager is None:
+            _session_manager = SessionManager.from_env(model="gpt-4o-mini", recursive_model="gpt-4o-mini")
+        return _session_manager
+
+
+def query_text(text: str | LazyText, query: str, max_iterations: int = 10, enable_logging: bool = False) -> str:
     """
     Query text using RLM.
     
@@ -55,8 +73,63 @@ def query_file(file_path: str, query: str, max_iterations: int = 10, enable_logg
     if not path.exists():
         raise FileNotFoundError(f"File not found: {file_path}")
     
-    with open(path, 'r', encoding='utf-8') as f:
-        text = f.read()
+    if not os.getenv("OPENAI_API_KEY"):
+        raise ValueError("OPENAI_API_KEY environment variable not set")
+    
+    # A large file is memory-mapped (never read into memory) and scanned once for its block
+    # and line tables, then loaded into a REPL that is reused while the file is unchanged.
+    # Compressed files and archives are decompressed as a stream (see load_file_context)
+    return get_session_manager().query_file(
+        path, query, max_iterations=max_iterations, enable_logging=enable_logging,
+    )
+
+
+async def aquery_text(text: str | LazyText, query: str, max_iterations: int = 10, enable_logging: bool = False) -> str:
+    """
+    Async variant of `query_text` that runs the RLM on the current event loop.
+    
+    Args:
+        text: The text/document to query
+        query: The question to ask
+        max_iterations: Maximum RLM iterations
+        enable_logging: Whether to show RLM iterations
+    
+    Returns:
+        The answer from RLM
+    """
+    if not os.getenv("OPENAI_API_KEY"):
+        raise ValueError("OPENAI_API_KEY environment variable not set")
+    
+    rlm = RLM_REPL(
+        model="gpt-4o-mini",
+        recursive_model="gpt-4o-mini",
+        max_iterations=max_iterations,
+        enable_logging=enable_logging,
+    )
+    
+    return await rlm.acompletion(context=text, query=query)
+
+
+async def aquery_file(file_path: str, query: str, max_iterations: int = 10, enable_logging: bool = False) -> str:
+    """
+    Async variant of `query_file`. A new file is mapped and indexed in a worker thread.
+    
+    Args:
+        file_path: Path to the file
+        query: The question to ask
+        max_iterations: Maximum RLM iterations
+        enable_logging: Whether to show RLM iterations
+    
+    Returns:
+        The answer from RLM
+    """
+    path = Path(file_path)
+    if not path.exists():
+        raise FileNotFoundError(f"File not found: {file_path}")
+    
+    if not os.getenv("OPENAI_API_KEY"):
+        raise ValueError("OPENAI_API_KEY environment variable not set")
     
-    # Use shared query_text logic
-    return query_text(text, query, max_iterations, enable_logging)
+    return await get_session_manager().aquery_file(
+        path, query, max_iterations=max_iterations, enable_logging=enable_logging,
+    )
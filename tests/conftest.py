@@ -0,0 +1,23 @@
+import pytest
+
+
+class EchoLM:
+    """Sub-LM stand-in that answers every prompt with a copy of it, without any network call."""
+
+    def __init__(self):
+        self.prompts = []
+
+    def completion(self, prompt) -> str:
+        self.prompts.append(prompt)
+        return f"echo: {prompt}"
+
+    async def acompletion(self, prompt) -> str:
+        return self.completion(prompt)
+
+    def cost_summary(self) -> dict:
+        return {"calls": len(self.prompts)}
+
+
+@pytest.fixture
+def echo_lm():
+    return EchoLM()
@@ -0,0 +1,146 @@
+import bz2
+import gzip
+import io
+import lzma
+import os
+import pickle
+import tarfile
+import zipfile
+
+import pytest
+
+from rlm.utils import archives
+from rlm.utils.archives import close_context, detect_format, load_file_context
+from rlm.utils.context import Document, LazyText
+
+TEXT = "première ligne\nsecond line €\n" * 20
+MEMBERS = {"docs/a.txt": TEXT, "b.md": "# title\nbody\n", "image.bin": b"\x89PNG\x00\x00binary"}
+
+
+def write_tar(path, mode):
+    with tarfile.open(path, mode) as archive:
+        directory = tarfile.TarInfo("docs")
+        directory.type = tarfile.DIRTYPE
+        archive.addfile(directory)
+        for name, content in MEMBERS.items():
+            data = content.encode("utf-8") if isinstance(content, str) else content
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+
+
+def write_zip(path):
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("docs/", "")
+        for name, content in MEMBERS.items():
+            archive.writestr(name, content)
+
+
+@pytest.mark.parametrize("suffix, compress, expected_format", [
+    (".gz", gzip.compress, "gzip"),
+    (".bz2", bz2.compress, "bzip2"),
+    (".xz", lzma.compress, "xz"),
+])
+def test_compressed_text(tmp_path, suffix, compress, expected_format):
+    path = tmp_path / f"context.txt{suffix}"
+    path.write_bytes(compress(TEXT.encode("utf-8")))
+    assert detect_format(path) == expected_format
+    context = load_file_context(str(path))
+    assert isinstance(context, Document)
+    assert context == TEXT
+    assert context.name == str(path)
+
+
+@pytest.mark.parametrize("suffix, mode", [(".tar", "w"), (".tar.gz", "w:gz"), (".tar.xz", "w:xz"), (".zip", None)])
+def test_archive_members(tmp_path, suffix, mode):
+    path = tmp_path / f"context{suffix}"
+    if mode is None:
+        write_zip(path)
+    else:
+        write_tar(path, mode)
+    context = load_file_context(str(path))
+    # Directories and binary members are skipped, text members keep their path
+    assert [document.name for document in context] == ["docs/a.txt", "b.md"]
+    assert context == [TEXT, MEMBERS["b.md"]]
+    assert all(isinstance(document, Document) for document in context)
+
+
+def test_plain_file(tmp_path):
+    path = tmp_path / "context.txt"
+    path.write_text(TEXT, encoding="utf-8")
+    assert detect_format(path) is None
+    context = load_file_context(str(path))
+    assert isinstance(context, Document)
+    assert context == TEXT
+    assert pickle.loads(pickle.dumps(context)).name == str(path)
+
+    large = load_file_context(str(path), max_in_memory=16)
+    try:
+        assert isinstance(large, LazyText)
+        assert large == TEXT
+    finally:
+        close_context(large)
+
+
+def test_large_compressed_text_is_spilled(tmp_path):
+    path = tmp_path / "context.txt.gz"
+    path.write_bytes(gzip.compress(TEXT.encode("utf-8")))
+    context = load_file_context(str(path), max_in_memory=64)
+    assert isinstance(context, LazyText)
+    assert context == TEXT
+    assert context.name == str(path)
+    spill = context.path
+    assert os.path.exists(spill)
+    close_context(context)
+    assert not os.path.exists(spill)
+
+
+def test_large_archive_member_is_spilled(tmp_path):
+    path = tmp_path / "context.tar.gz"
+    write_tar(path, "w:gz")
+    context = load_file_context(str(path), max_in_memory=64)
+    assert isinstance(context[0], LazyText)
+    assert context[0] == TEXT
+    assert isinstance(context[1], Document)
+    spill = context[0].path
+    close_context(context)
+    assert not os.path.exists(spill)
+
+
+class ShortReads(io.RawIOBase):
+    """Decompressed stream returning at most 100 bytes per read, like zstandard's stream_reader."""
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size=-1):
+        return self.stream.read(100 if size is None or size < 0 else min(size, 100))
+
+    def __exit__(self, *exc_info):
+        self.stream.close()
+
+
+@pytest.mark.parametrize("max_in_memory", [archives.MAX_IN_MEMORY_BYTES, 64])
+def test_short_reads_from_the_decompressor(tmp_path, monkeypatch, max_in_memory):
+    decompressor = archives._decompressor
+    monkeypatch.setattr(archives, "_decompressor", lambda file, compression: ShortReads(decompressor(file, compression)))
+
+    path = tmp_path / "context.tar.gz"
+    write_tar(path, "w:gz")
+    context = load_file_context(str(path), max_in_memory=max_in_memory)
+    try:
+        assert [document.name for document in context] == ["docs/a.txt", "b.md"]
+        assert context == [TEXT, MEMBERS["b.md"]]
+    finally:
+        close_context(context)
+
+    path = tmp_path / "context.txt.gz"
+    path.write_bytes(gzip.compress(TEXT.encode("utf-8")))
+    context = load_file_context(str(path), max_in_memory=max_in_memory)
+    try:
+        assert context == TEXT
+    finally:
+        close_context(context)
@@ -0,0 +1,66 @@
+import pytest
+
+from rlm.utils.context import LazyText
+from rlm.utils.lines import LineIndex
+from rlm.utils.search import BM25Index, text_passages, tokenize
+
+PASSAGES = [
+    "The quarterly revenue grew while costs fell.",
+    "Weather report: rain expected, rain and more rain.",
+    "Revenue recognition rules for the quarterly report.",
+    "Unrelated notes about gardening.",
+]
+
+
+def test_tokenize():
+    assert tokenize("Hello, WORLD! größe_2 x") == ["hello", "world", "größe_2", "x"]
+
+
+def test_ranks_documents_by_bm25():
+    index = BM25Index.from_documents(PASSAGES)
+    assert len(index) == 4
+    results = index.search("quarterly revenue")
+    assert [result["document"] for result in results] == [0, 2]
+    assert results[0]["text"] == PASSAGES[0]
+    assert results[0]["score"] >= results[1]["score"] > 0
+    # Term frequency counts, saturated by k1
+    assert index.search("rain", k=1)[0]["document"] == 1
+    assert index.search("missing words") == []
+    assert len(index.search("the rain revenue gardening", k=2)) == 2
+
+
+def test_rare_terms_weigh_more():
+    index = BM25Index.from_documents(["common rare", "common", "common", "common"])
+    scores = index.scores("common rare")
+    assert max(scores, key=scores.get) == 0
+    assert BM25Index.from_documents([]).scores("anything") == {}
+
+
+def test_dict_documents():
+    index = BM25Index.from_documents([{"title": "alpha", "body": "first"}, {"title": "beta", "body": "second"}])
+    assert index.search("second")[0]["document"] == 1
+
+
+@pytest.mark.parametrize("lazy", [False, True])
+def test_text_passages(tmp_path, lazy):
+    text = "".join(f"line {number} über {'needle' if number == 37 else 'hay'}\n" for number in range(60))
+    context = text
+    if lazy:
+        path = tmp_path / "context.txt"
+        path.write_text(text, encoding="utf-8")
+        context = LazyText(path, block_size=64)
+    try:
+        line_index = LineIndex(context)
+        spans = list(text_passages(context, line_index, passage_chars=100))
+        assert spans[0][0] == 0 and spans[-1][1] == len(text)
+        for (_, end), (start, _) in zip(spans, spans[1:]):
+            assert end == start and text[end - 1] == "\n"
+
+        index = BM25Index.from_text(context, line_index, passage_chars=100)
+        assert index.spans == spans
+        best = index.search("needle", k=1)[0]
+        assert "line 37 über needle" in best["text"]
+        assert best["text"] == text[best["start"]:best["end"]]
+    finally:
+        if lazy:
+            context.close()
@@ -0,0 +1,97 @@
+import types
+
+import pytest
+
+from rlm.utils import cache as cache_module
+from rlm.utils.cache import MemoryCache, SQLiteCache, TieredCache, make_cache_key
+
+MESSAGES = [{"role": "user", "content": "Größe?"}]
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_module, "time", types.SimpleNamespace(time=lambda: now[0]))
+    return now
+
+
+@pytest.fixture
+def sqlite_cache(tmp_path):
+    caches = []
+
+    def make(**options) -> SQLiteCache:
+        caches.append(SQLiteCache(str(tmp_path / "cache" / "completions.db"), **options))
+        return caches[-1]
+
+    yield make
+    for cache in caches:
+        cache.close()
+
+
+def test_cache_key():
+    key = make_cache_key("model", MESSAGES, {"temperature": 0, "max_tokens": 10})
+    assert len(key) == 64
+    # Stable across kwargs order, and transport-only kwargs don't change it
+    assert key == make_cache_key("model", MESSAGES, {"max_tokens": 10, "temperature": 0})
+    assert key == make_cache_key("model", MESSAGES, {"temperature": 0, "max_tokens": 10, "timeout": 30, "extra_headers": {"a": "b"}})
+    assert key != make_cache_key("other", MESSAGES, {"temperature": 0, "max_tokens": 10})
+    assert key != make_cache_key("model", MESSAGES, {"temperature": 1, "max_tokens": 10})
+    assert key != make_cache_key("model", [{"role": "user", "content": "Grösse?"}], {"temperature": 0, "max_tokens": 10})
+
+
+def test_memory_cache_lru():
+    cache = MemoryCache(max_entries=2)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    assert cache.get("a") == "1"
+    cache.set("c", "3")
+    # "b" was the least recently used
+    assert cache.get("b") is None
+    assert cache.get("a") == "1" and cache.get("c") == "3"
+    assert cache.stats() == {"hits": 3, "misses": 1, "evictions": 1, "size": 2}
+
+
+def test_memory_cache_ttl(clock):
+    cache = MemoryCache(ttl=10)
+    cache.set("a", "1")
+    clock[0] += 10
+    assert cache.get("a") == "1"
+    clock[0] += 0.5
+    assert cache.get("a") is None
+    assert cache.stats() == {"hits": 1, "misses": 1, "evictions": 1, "size": 0}
+
+
+def test_sqlite_cache_persists_and_expires(sqlite_cache, clock):
+    cache = sqlite_cache(ttl=10)
+    cache.set("a", "1")
+    assert sqlite_cache(ttl=10).get("a") == "1"
+    clock[0] += 11
+    assert cache.get("a") is None
+    assert cache.evictions == 1
+    assert len(cache) == 0
+
+
+def test_sqlite_cache_lru(sqlite_cache, clock):
+    cache = sqlite_cache(max_entries=2)
+    for key in "abc":
+        clock[0] += 1
+        cache.set(key, key.upper())
+        if key == "b":
+            clock[0] += 1
+            cache.get("a")
+    assert cache.get("b") is None
+    assert cache.get("a") == "A" and cache.get("c") == "C"
+    assert cache.evictions == 1
+
+
+def test_tiered_cache_promotes_disk_hits(sqlite_cache):
+    disk = sqlite_cache()
+    disk.set("a", "1")
+    cache = TieredCache(MemoryCache(), disk)
+    assert cache.get("a") == "1"
+    assert cache.memory.get("a") == "1"
+    cache.set("b", "2")
+    assert disk.get("b") == "2"
+    assert cache.get("missing") is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (1, 1, 2)
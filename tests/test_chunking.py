@@ -0,0 +1,89 @@
+import pytest
+
+from rlm.utils.chunking import TokenEstimator, chunk_documents, chunk_offsets, heuristic_token_count
+from rlm.utils.context import LazyText
+
+ONE_CHAR = TokenEstimator(chars_per_token=1.0)
+
+
+def assert_covers(text, chunks):
+    # Without overlap, chunks are contiguous and cover the whole text
+    assert chunks[0][0] == 0 and chunks[-1][1] == len(text)
+    for (_, end), (start, _) in zip(chunks, chunks[1:]):
+        assert end == start
+
+
+def test_chunks_end_at_line_boundaries():
+    text = "".join(f"line {number:02d}\n" for number in range(20))  # 8 characters per line
+    chunks = chunk_offsets(text, max_tokens=30, estimator=ONE_CHAR)
+    assert_covers(text, chunks)
+    assert all(end - start <= 30 for start, end in chunks)
+    assert all(text[start:end].endswith("\n") for start, end in chunks[:-1])
+    assert chunks[0] == (0, 24)
+
+
+def test_long_line_is_cut_at_max_tokens():
+    text = "short\n" + "x" * 50 + "\nend"
+    chunks = chunk_offsets(text, max_tokens=20, estimator=ONE_CHAR)
+    assert_covers(text, chunks)
+    assert all(end - start <= 20 for start, end in chunks)
+    assert chunks[0] == (0, 6)
+
+
+def test_paragraphs_and_headers():
+    paragraphs = "one one\none\n\ntwo two\ntwo\n\nthree\n"
+    chunks = chunk_offsets(paragraphs, max_tokens=16, by="paragraphs", estimator=ONE_CHAR)
+    assert [paragraphs[start:end] for start, end in chunks] == ["one one\none\n\n", "two two\ntwo\n\n", "three\n"]
+
+    markdown = "# A\ntext\nmore\n## B\ntext\n# C\nlast\n"
+    chunks = chunk_offsets(markdown, max_tokens=18, by="headers", estimator=ONE_CHAR)
+    assert [markdown[start:end] for start, end in chunks] == ["# A\ntext\nmore\n", "## B\ntext\n", "# C\nlast\n"]
+
+
+def test_files_boundaries():
+    dump = "".join(f"// FILE: src/file{number}.py\nprint({number})\n" for number in range(4))
+    chunks = chunk_offsets(dump, max_tokens=70, by="files", estimator=ONE_CHAR)
+    assert_covers(dump, chunks)
+    assert all(dump[start:end].startswith("// FILE:") for start, end in chunks)
+
+
+def test_overlap_starts_on_an_earlier_line():
+    text = "".join(f"line {number:02d}\n" for number in range(20))
+    chunks = chunk_offsets(text, max_tokens=32, overlap=10, estimator=ONE_CHAR)
+    assert chunks[-1][1] == len(text)
+    for (start, end), (next_start, _) in zip(chunks, chunks[1:]):
+        assert start < next_start < end
+        assert end - next_start <= 10
+        assert text[next_start - 1] == "\n"
+
+
+def test_lazy_text_matches_str(tmp_path):
+    text = "".join(f"zeile {number} – größe\n\n" for number in range(40))
+    path = tmp_path / "context.txt"
+    path.write_text(text, encoding="utf-8")
+    lazy = LazyText(path, block_size=64)
+    try:
+        for by in ["lines", "paragraphs"]:
+            assert chunk_offsets(lazy, 50, by=by, estimator=ONE_CHAR) == chunk_offsets(text, 50, by=by, estimator=ONE_CHAR)
+    finally:
+        lazy.close()
+
+
+def test_invalid_arguments():
+    with pytest.raises(ValueError):
+        chunk_offsets("text", by="sentences")
+    with pytest.raises(ValueError):
+        chunk_offsets("text", max_tokens=10, overlap=10, estimator=ONE_CHAR)
+
+
+def test_chunk_documents():
+    documents = ["a" * 10, "b" * 10, "c" * 30, "d" * 5, "e" * 5]
+    assert chunk_documents(documents, max_tokens=25, estimator=ONE_CHAR) == [(0, 2), (2, 3), (3, 5)]
+    assert chunk_documents([], max_tokens=25, estimator=ONE_CHAR) == []
+
+
+def test_token_estimates():
+    assert heuristic_token_count("def foo(bar):\n    return 1234") == 10
+    estimator = TokenEstimator.calibrate("word " * 1000)
+    assert 1.0 <= estimator.chars_per_token <= 8.0
+    assert estimator.count(estimator.chars_for(100)) == 100
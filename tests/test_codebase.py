@@ -0,0 +1,100 @@
+import io
+import tarfile
+from pathlib import Path
+
+import pytest
+
+from rlm.repl import REPLEnv
+from rlm.utils.archives import load_file_context
+from rlm.utils.codebase import CodebaseIndex, language_of
+from rlm.utils.context import Document, LazyText
+
+CODEBASE = Path(__file__).resolve().parent.parent / "Codebase.txt"
+
+
+@pytest.fixture(scope="module")
+def codebase():
+    text = LazyText(CODEBASE)
+    yield text
+    text.close()
+
+
+def test_detects_codebase_dump(codebase):
+    index = CodebaseIndex.detect(codebase)
+    assert index is not None
+    assert index.format == "banner"
+    assert len(index) == 337
+    assert index.files[0].path == "./crates/goose-bench/src/bench_config.rs"
+    assert index.files[0].language == "rust"
+    assert index.read_file("bench_config.rs") == codebase[index.files[0].start:index.files[0].end]
+
+
+def test_str_and_lazy_text_agree(codebase):
+    lazy_index = CodebaseIndex.detect(codebase)
+    text = str(codebase)
+    str_index = CodebaseIndex.detect(text)
+    assert [(entry.path, entry.start, entry.end) for entry in str_index.files] == [
+        (entry.path, entry.start, entry.end) for entry in lazy_index.files
+    ]
+
+
+@pytest.mark.parametrize("dump, dump_format", [
+    ("// FILE: a.py\nx = 1\n// FILE: pkg/b.rs\nfn main() {}\n", "banner"),
+    ("=" * 16 + "\nFile: a.py\n" + "=" * 16 + "\nx = 1\n\n" + "=" * 16 + "\nFile: pkg/b.rs\n" + "=" * 16 + "\nfn main() {}\n", "repomix"),
+    ('<files>\n<file path="a.py">\nx = 1\n</file>\n<file path="pkg/b.rs">\nfn main() {}\n</file>\n</files>\n', "repomix-xml"),
+    ("## File: a.py\n```python\nx = 1\n```\n\n## File: pkg/b.rs\n```rust\nfn main() {}\n```\n", "repomix-markdown"),
+    ("==> a.py <==\nx = 1\n\n==> pkg/b.rs <==\nfn main() {}\n", "head"),
+])
+def test_dump_formats(dump, dump_format):
+    index = CodebaseIndex.detect(dump)
+    assert index.format == dump_format
+    assert [entry.path for entry in index.files] == ["a.py", "pkg/b.rs"]
+    assert index.read_file("a.py").strip() == "x = 1"
+    assert index.read_file("b.rs").strip() == "fn main() {}"
+
+
+def test_lookup():
+    index = CodebaseIndex.detect("// FILE: src/a.py\n1\n// FILE: lib/a.py\n2\n// FILE: src/main.rs\n3\n")
+    assert index.get("./src/a.py").path == "src/a.py"
+    assert index.get("main.rs").path == "src/main.rs"
+    with pytest.raises(FileNotFoundError, match="ambiguous"):
+        index.get("a.py")
+    with pytest.raises(FileNotFoundError):
+        index.get("missing.py")
+    assert [entry.path for entry in index.find_files("*.py")] == ["src/a.py", "lib/a.py"]
+    assert [entry.path for entry in index.find_files("src/*")] == ["src/a.py", "src/main.rs"]
+
+
+def test_not_a_codebase():
+    assert CodebaseIndex.detect("just some prose\nwith lines\n") is None
+    assert CodebaseIndex.detect("// FILE: only.py\nx = 1\n") is None
+    assert language_of("Dockerfile") == "dockerfile"
+    assert language_of("notes.unknown") is None
+
+
+def test_archive_members_form_a_file_table(tmp_path):
+    with tarfile.open(tmp_path / "repo.tar", "w") as archive:
+        for name, content in [("src/app.py", "import os\nprint(1)\n"), ("src/lib.rs", "fn main() {}\n"), ("logo.png", "\x00PNG")]:
+            data = content.encode("utf-8")
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+    context = load_file_context(str(tmp_path / "repo.tar"))
+    index = CodebaseIndex.from_documents(context)
+    assert index.format == "archive"
+    assert [(entry.path, entry.document, entry.lines, entry.language) for entry in index.files] == [
+        ("src/app.py", 0, 3, "python"), ("src/lib.rs", 1, 2, "rust"),
+    ]
+    assert index.read_file("app.py") == "import os\nprint(1)\n"
+    assert [entry.path for entry in index.find_files("*.rs")] == ["src/lib.rs"]
+    assert CodebaseIndex.from_documents(["plain", "strings"]) is None
+
+
+def test_repl_defines_file_helpers_for_archives(echo_lm):
+    documents = [Document("x = 1\n", "pkg/a.py"), Document("y = 2\n", "pkg/b.py")]
+    env = REPLEnv(context_json=documents, sub_rlm=echo_lm)
+    try:
+        assert {"files", "read_file", "find_files"} <= set(env.helper_names)
+        assert env.code_execution("print(read_file('b.py').strip(), len(find_files('pkg/*')))").stdout == "y = 2 2\n"
+    finally:
+        env.close()
@@ -0,0 +1,101 @@
+import pickle
+
+import pytest
+
+from rlm.utils.context import LazyText
+
+NON_ASCII = "Größe: 42 €\n日本語のテキスト\nemoji 😀 here\n" * 3 + "x" * 20 + "needle" + "\nfin ü"
+
+
+@pytest.fixture
+def make_text(tmp_path):
+    texts = []
+
+    def make(content: str | bytes, block_size: int = 1 << 20) -> LazyText:
+        path = tmp_path / f"context_{len(texts)}.txt"
+        path.write_bytes(content.encode("utf-8") if isinstance(content, str) else content)
+        text = LazyText(path, block_size=block_size)
+        texts.append(text)
+        return text
+
+    yield make
+    for text in texts:
+        text.close()
+
+
+@pytest.mark.parametrize("block_size", [1 << 20, 16, 5])
+def test_find_non_ascii_matches_str(make_text, block_size):
+    text = make_text(NON_ASCII, block_size=block_size)
+    assert "needle" in text
+    assert text.find("needle") == NON_ASCII.find("needle")
+    for sub in ["needle", "€", "😀", "\n", "ü", "", "missing"]:
+        for start, end in [(None, None), (3, None), (10, 60), (-20, None), (-30, -5), (50, 10), (500, None)]:
+            assert text.find(sub, start, end) == NON_ASCII.find(sub, start, end), (sub, start, end)
+
+
+@pytest.mark.parametrize("block_size", [1 << 20, 16, 5])
+def test_slice_and_index_non_ascii_match_str(make_text, block_size):
+    text = make_text(NON_ASCII, block_size=block_size)
+    assert len(text) == len(NON_ASCII)
+    assert str(text) == NON_ASCII
+    for key in [slice(None), slice(3, 40), slice(-25, -2), slice(10, 5), slice(0, None, 3), slice(None, None, -1)]:
+        assert text[key] == NON_ASCII[key], key
+    assert text[7] == NON_ASCII[7]
+    assert text[-1] == NON_ASCII[-1]
+    with pytest.raises(IndexError):
+        text[len(NON_ASCII)]
+
+
+@pytest.mark.parametrize("block_size", [1 << 20, 16, 5])
+def test_line_offsets_non_ascii(make_text, block_size):
+    text = make_text(NON_ASCII, block_size=block_size)
+    lines = NON_ASCII.split("\n")
+    offsets = list(text.line_offsets)
+    assert len(offsets) == len(lines)
+    for offset, line in zip(offsets, lines):
+        assert text[offset:offset + len(line)] == line
+
+
+def test_count_and_equality(make_text):
+    text = make_text(NON_ASCII)
+    assert text.count("€") == NON_ASCII.count("€")
+    assert text.count("") == len(NON_ASCII) + 1
+    assert text == NON_ASCII
+    assert text != NON_ASCII + "!"
+    assert text.upper() == NON_ASCII.upper()
+
+
+def test_spilled_line_offsets(make_text, monkeypatch):
+    monkeypatch.setattr("rlm.utils.context._SPILL_LINES", 4)
+    content = "".join(f"line {number} ü\n" for number in range(50))
+    text = make_text(content, block_size=16)
+    assert isinstance(text.line_offsets, memoryview)
+    expected = [0]
+    for line in content.split("\n")[:-1]:
+        expected.append(expected[-1] + len(line) + 1)
+    assert list(text.line_offsets) == expected
+
+
+def test_pickle_round_trip(make_text):
+    text = make_text(NON_ASCII, block_size=16)
+    copy = pickle.loads(pickle.dumps(text))
+    try:
+        assert copy == NON_ASCII
+        assert list(copy.line_offsets) == list(text.line_offsets)
+        assert copy.find("needle") == NON_ASCII.find("needle")
+    finally:
+        copy.close()
+
+
+@pytest.mark.parametrize("block_size", [1 << 20, 7, 3])
+def test_find_with_invalid_utf8_matches_str(make_text, block_size):
+    # Truncated and stray bytes each decode to one U+FFFD
+    content = b"\n\n\xe4\xb8\xada \xc3\xa9\xc3\xa9\xc3\n\nb\n\xe4\xb8\n\xff\x80x\xf0\x9f\n\xe4\xb8\xad\n"
+    expected = content.decode("utf-8", errors="replace")
+    text = make_text(content, block_size=block_size)
+    assert len(text) == len(expected)
+    assert text.find("\n", 8) == expected.find("\n", 8) == 8
+    for sub in ["\n", "x", "b", "é", "中", ""]:
+        for start in range(-3, len(expected) + 2):
+            for end in [None, start + 3, len(expected) - 2]:
+                assert text.find(sub, start, end) == expected.find(sub, start, end), (sub, start, end)
@@ -0,0 +1,77 @@
+from rlm.utils.history import CompactingHistory, HistoryPolicy, assigned_names
+from rlm.utils.llm import estimate_tokens
+from rlm.utils.utils import add_execution_result_to_messages
+
+
+def conversation(turns: int, output_chars: int = 1000) -> list[dict[str, str]]:
+    messages = [{"role": "system", "content": "system prompt"}]
+    for turn in range(turns):
+        messages.append({"role": "assistant", "content": f"step {turn}"})
+        add_execution_result_to_messages(messages, f"result_{turn} = compute({turn})", str(turn) * output_chars)
+    return messages
+
+
+def is_elided(message: dict[str, str]) -> bool:
+    return "REPL output (elided" in message["content"]
+
+
+def test_assigned_names():
+    code = "import os.path\nfrom re import compile as rc\nx, (y, _z) = 1, (2, 3)\ndef f():\n    inner = 1\nclass C: pass\n[w for w in range(3)]\nx = 2"
+    assert assigned_names(code) == ["os", "rc", "x", "y", "f", "C"]
+    assert assigned_names("not python (") == []
+
+
+def test_default_policy_keeps_everything():
+    messages = conversation(10)
+    assert HistoryPolicy().compact(messages) is messages
+
+
+def test_keeps_recent_turns_and_elides_in_batches():
+    policy = CompactingHistory(keep_turns=2, preview_chars=20, elide_batch=3)
+    # Two executions past keep_turns: fewer than a batch, nothing changes
+    assert not any(is_elided(message) for message in policy.compact(conversation(4)))
+
+    messages = conversation(5)
+    compacted = policy.compact(messages)
+    assert len(compacted) == len(messages)
+    executions = compacted[2::2]
+    assert [is_elided(message) for message in executions] == [True, True, True, False, False]
+    assert executions[3] == messages[8]
+    stub = executions[0]["content"]
+    assert stub.startswith("Code executed:\n```python\nresult_0 = compute(0)\n```")
+    assert "(elided, 1000 characters originally):\n" + "0" * 20 + "..." in stub
+    assert "still available in the REPL: ['result_0']" in stub
+    # The input list is left alone
+    assert not is_elided(messages[2])
+
+
+def test_compaction_is_stable():
+    policy = CompactingHistory(keep_turns=2, elide_batch=1)
+    compacted = policy.compact(conversation(6))
+    assert policy.compact(compacted) == compacted
+
+
+def test_token_budget_elides_then_drops():
+    messages = conversation(6)
+    budget = CompactingHistory(keep_turns=6, max_tokens=estimate_tokens(messages) * 3 // 4)
+    compacted = budget.compact(messages)
+    assert estimate_tokens(compacted) <= budget.max_tokens
+    assert len(compacted) == len(messages)
+    # Oldest executions are stubbed first, and only as many as needed
+    elided = [is_elided(message) for message in compacted[2::2]]
+    assert elided == sorted(elided, reverse=True)
+    assert elided[0] and not elided[-1]
+
+    tight = CompactingHistory(keep_turns=6, max_tokens=200)
+    compacted = tight.compact(messages)
+    assert compacted[0]["role"] == "system"
+    assert compacted[1]["content"].startswith("[")
+    assert "earlier messages omitted" in compacted[1]["content"]
+    assert compacted[-1]["content"].startswith("Code executed:")
+    assert estimate_tokens(compacted) <= 200
+
+    # Later drops add to the count instead of stacking notices
+    dropped = int(compacted[1]["content"][1:].split()[0])
+    compacted = tight.compact(compacted + conversation(2)[1:])
+    assert sum("earlier messages omitted" in message["content"] for message in compacted) == 1
+    assert int(compacted[1]["content"][1:].split()[0]) > dropped
@@ -0,0 +1,134 @@
+import threading
+import time
+
+import pytest
+
+from rlm.repl import REPLEnv
+from rlm.utils.limits import CellWatchdog, ExecutionBudgetExceeded, ExecutionLimits
+
+
+@pytest.fixture
+def make_env(echo_lm):
+    envs = []
+
+    def make(**limits) -> REPLEnv:
+        envs.append(REPLEnv(sub_rlm=echo_lm, limits=ExecutionLimits(poll_interval=0.01, **limits)))
+        return envs[-1]
+
+    yield make
+    for env in envs:
+        env.close()
+
+
+def test_cell_timeout_stops_an_endless_loop(make_env):
+    env = make_env(cell_timeout=0.2)
+
+    started = time.monotonic()
+    result = env.code_execution("before = 1\nwhile True:\n    pass")
+
+    assert time.monotonic() - started < 5
+    assert result.budget_exceeded == "cell wall-clock limit of 0.2s exceeded"
+    assert "ExecutionBudgetExceeded" in result.stderr
+    assert env.locals["before"] == 1
+    # The environment stays usable and the next cell gets a fresh budget
+    assert env.code_execution("before + 1").stdout == "2\n"
+
+
+def test_model_code_cannot_swallow_the_budget_error(make_env):
+    env = make_env(cell_timeout=0.2)
+
+    result = env.code_execution(
+        "while True:\n"
+        "    try:\n"
+        "        while True:\n"
+        "            pass\n"
+        "    except Exception:\n"
+        "        pass"
+    )
+
+    assert result.budget_exceeded == "cell wall-clock limit of 0.2s exceeded"
+
+
+def test_session_timeout_spans_cells_until_reset(make_env):
+    env = make_env(session_timeout=0.3)
+
+    env.code_execution("import time\ntime.sleep(0.2)")
+    result = env.code_execution("while True:\n    pass")
+    assert result.budget_exceeded.startswith("remaining session wall-clock limit of 0.")
+
+    exhausted = env.code_execution("x = 1")
+    assert exhausted.budget_exceeded == "session wall-clock limit of 0.3s exhausted"
+    assert "x" not in env.locals
+
+    env.reset_session_budget()
+    assert env.code_execution("x = 1").budget_exceeded is None
+
+
+def test_sub_llm_calls_are_limited_per_cell_and_per_session(make_env, echo_lm):
+    env = make_env(max_llm_calls_per_cell=2, max_llm_calls=3)
+
+    result = env.code_execution("answers = [llm_query('a'), llm_query('b'), llm_query('c')]")
+    assert result.budget_exceeded == "sub-LLM call limit of 2 per cell exceeded"
+    assert echo_lm.prompts == ["a", "b"]
+
+    # A batch is charged for all its prompts before any of them is sent
+    result = env.code_execution("llm_query_batch(['d', 'e'])")
+    assert result.budget_exceeded == "sub-LLM call limit of 3 per session exceeded"
+    assert echo_lm.prompts == ["a", "b"]
+
+    assert env.code_execution("llm_query('f')").stdout == "'echo: f'\n"
+    env.reset_session_budget()
+    assert env.code_execution("len(llm_query_batch(['g', 'h']))").stdout == "2\n"
+
+
+def test_process_wide_limits_are_dropped_in_process(echo_lm):
+    limits = ExecutionLimits(cell_timeout=5, cell_cpu_time=1, max_rss_mb=100)
+
+    with pytest.warns(RuntimeWarning, match="process-wide"):
+        env = REPLEnv(sub_rlm=echo_lm, limits=limits)
+    assert (env.limits.cell_timeout, env.limits.cell_cpu_time, env.limits.max_rss_mb) == (5, None, None)
+    env.close()
+
+    dedicated = REPLEnv(sub_rlm=echo_lm, limits=limits, dedicated_process=True)
+    assert dedicated.limits is limits
+    dedicated.close()
+
+    wall_only = ExecutionLimits(cell_timeout=5)
+    assert wall_only.for_shared_process() is wall_only
+
+
+def test_limits_from_env(monkeypatch):
+    monkeypatch.setenv("RLM_CELL_TIMEOUT", "2.5")
+    monkeypatch.setenv("RLM_MAX_LLM_CALLS", "40")
+    monkeypatch.delenv("RLM_SESSION_TIMEOUT", raising=False)
+
+    limits = ExecutionLimits.from_env()
+
+    assert limits.cell_timeout == 2.5
+    assert limits.max_llm_calls == 40
+    assert limits.session_timeout is None
+    assert not ExecutionLimits().watches_resources
+    assert limits.watches_resources
+
+
+def test_watchdog_does_not_fire_after_finish():
+    limits = ExecutionLimits(poll_interval=0.01)
+    watchdog = CellWatchdog(limits, threading.get_ident(), wall_limit=0.05)
+
+    with watchdog:
+        watchdog.finish()
+        time.sleep(0.2)
+
+    assert watchdog.reason is None
+
+
+def test_watchdog_raises_in_the_watched_thread():
+    limits = ExecutionLimits(poll_interval=0.01)
+    watchdog = CellWatchdog(limits, threading.get_ident(), wall_limit=0.05, wall_limit_name="test")
+
+    with pytest.raises(ExecutionBudgetExceeded):
+        with watchdog:
+            while True:
+                pass
+
+    assert watchdog.reason == "test limit of 0.05s exceeded"
@@ -0,0 +1,35 @@
+import pytest
+
+from rlm.utils.context import LazyText
+from rlm.utils.lines import LineIndex
+
+TEXT = "alpha\nbeta ü\n\ngamma € beta\ndelta\nepsilon beta\n"
+
+
+@pytest.fixture
+def lazy_text(tmp_path):
+    path = tmp_path / "context.txt"
+    path.write_text(TEXT, encoding="utf-8")
+    text = LazyText(path, block_size=8)
+    yield text
+    text.close()
+
+
+@pytest.mark.parametrize("lazy", [False, True])
+def test_line_index_matches_split(lazy, lazy_text):
+    index = LineIndex(lazy_text if lazy else TEXT)
+    lines = TEXT.split("\n")
+    assert len(index) == len(lines)
+    for number, line in enumerate(lines):
+        start, end = index.line_span(number)
+        assert TEXT[start:end] == line
+        assert index.get_lines(number) == line
+        assert index.line_at_char(start) == number
+    assert index.get_lines(1, 4) == "\n".join(lines[1:4])
+    assert index.get_lines(-3, None) == lines[-3]
+    assert index.get_lines(4, 2) == ""
+    assert index.line_at_char(len(TEXT)) == len(lines) - 1
+    with pytest.raises(IndexError):
+        index.line_span(len(lines))
+    with pytest.raises(IndexError):
+        index.line_at_char(len(TEXT) + 1)
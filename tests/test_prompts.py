@@ -0,0 +1,30 @@
+import re
+
+from rlm.utils.prompts import CONTEXT_HELPERS, build_system_prompt
+
+
+def system_prompt(helper_names=None) -> str:
+    return build_system_prompt(helper_names)[0]["content"]
+
+
+def test_examples_dont_rebind_helpers():
+    helper_names = [name for group, _ in CONTEXT_HELPERS for name in group]
+    prompt = system_prompt(helper_names)
+    for code in re.findall(r"```repl\n(.*?)```", prompt, re.DOTALL):
+        for name in helper_names:
+            assert not re.search(rf"^\s*{name}\s*=", code, re.MULTILINE), name
+
+
+def test_helper_section_lists_defined_helpers_only():
+    assert "Helpers defined for this context" not in system_prompt()
+    prompt = system_prompt(["grep", "get_lines", "line_at_char", "num_lines"])
+    assert "`grep(" in prompt and "`get_lines(" in prompt
+    assert "`chunk(" not in prompt and "spans = chunk(" not in prompt
+    # The section sits before the general advice
+    assert prompt.index("Helpers defined") < prompt.index("You will only be able to see truncated outputs")
+
+
+def test_chunk_example_only_with_chunk():
+    prompt = system_prompt(["chunk"])
+    assert "spans = chunk(context" in prompt
+    assert prompt.index("`chunk(context") < prompt.index("spans = chunk(context")
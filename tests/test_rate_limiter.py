@@ -0,0 +1,82 @@
+import asyncio
+import types
+
+import pytest
+
+from rlm.utils import llm as llm_module
+from rlm.utils.llm import RateLimiter, _TokenBucket
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(llm_module, "time", types.SimpleNamespace(monotonic=lambda: now[0], time=lambda: now[0]))
+    return now
+
+
+def test_token_bucket_refills_at_capacity_per_minute():
+    bucket = _TokenBucket(60)  # One unit per second
+    bucket.updated = 0.0
+    assert bucket.reserve(60, now=0.0) == 0.0
+    # Empty: the next unit is available a second later
+    assert bucket.reserve(1, now=0.0) == pytest.approx(1.0)
+    # Reservations queue behind each other
+    assert bucket.reserve(2, now=0.0) == pytest.approx(3.0)
+    assert bucket.reserve(1, now=10.0) == 0.0
+    assert bucket.level == pytest.approx(6.0)
+
+
+def test_token_bucket_caps_requests_larger_than_capacity():
+    bucket = _TokenBucket(60)
+    bucket.updated = 0.0
+    bucket.reserve(60, now=0.0)
+    # Waits for a full bucket rather than forever
+    assert bucket.reserve(1000, now=0.0) == pytest.approx(60.0)
+    bucket.refund(1000)
+    assert bucket.level == 60
+
+
+@pytest.mark.parametrize("shared", [False, True])
+def test_rate_limiter_requests_and_tokens(tmp_path, clock, shared):
+    limiter = RateLimiter(
+        requests_per_minute=2,
+        tokens_per_minute=600,
+        model_limits={"unlimited": (None, None)},
+        state_path=str(tmp_path / "limits.db") if shared else None,
+    )
+    assert limiter.reserve("model", 100) == 0.0
+    assert limiter.reserve("model", 100) == 0.0
+    # Third request within the minute waits for the request bucket (30s per request)
+    assert limiter.reserve("model", 100) == pytest.approx(30.0)
+    # Token limit: 200 tokens past the balance take 20s at 10 tokens/s
+    assert limiter.reserve("tokens", 400) == 0.0
+    assert limiter.reserve("tokens", 400) == pytest.approx(20.0)
+    # Buckets are per model
+    assert limiter.reserve("other", 100) == 0.0
+    assert limiter.reserve("unlimited", 10 ** 9) == 0.0
+
+    stats = limiter.stats()
+    assert stats["model"]["requests"] == 3
+    assert stats["model"]["delayed_requests"] == 1
+    assert stats["model"]["max_wait_seconds"] == pytest.approx(30.0)
+    assert stats["tokens"]["total_wait_seconds"] == pytest.approx(20.0)
+
+
+def test_shared_state_across_limiters(tmp_path, clock):
+    path = str(tmp_path / "limits.db")
+    first, second = RateLimiter(requests_per_minute=1, state_path=path), RateLimiter(requests_per_minute=1, state_path=path)
+    assert first.reserve("model", 0) == 0.0
+    assert second.reserve("model", 0) == pytest.approx(60.0)
+
+
+def test_reconcile_refunds_overestimates(clock):
+    limiter = RateLimiter(tokens_per_minute=600)
+    limiter.reserve("model", 600)
+    limiter.reconcile("model", 600, 100)
+    assert limiter.reserve("model", 500) == 0.0
+    assert limiter.reserve("model", 10) == pytest.approx(1.0)
+
+
+def test_aacquire_without_limits_does_not_wait():
+    limiter = RateLimiter(requests_per_minute=60)
+    assert asyncio.run(limiter.aacquire("model", 10)) == 0.0
@@ -0,0 +1,182 @@
+import io
+import sys
+import threading
+
+import pytest
+
+from rlm.repl import REPLEnv, _compile_cell, redirect_uncaptured_stdout
+
+
+@pytest.fixture
+def make_env(echo_lm):
+    envs = []
+
+    def make(**options) -> REPLEnv:
+        envs.append(REPLEnv(sub_rlm=echo_lm, **options))
+        return envs[-1]
+
+    yield make
+    for env in envs:
+        env.close()
+
+
+def replace_streams(monkeypatch) -> tuple[io.StringIO, io.StringIO]:
+    """
+    Stand-ins for the process's stdout and stderr until the end of the test. Called in the
+    test body: pytest swaps its own capture streams in between setup and the call.
+    """
+    stdout, stderr = io.StringIO(), io.StringIO()
+    monkeypatch.setattr(sys, "stdout", stdout)
+    monkeypatch.setattr(sys, "stderr", stderr)
+    return stdout, stderr
+
+
+def test_concurrent_cells_capture_only_their_own_output(make_env):
+    envs = [make_env() for _ in range(4)]
+    results = [None] * len(envs)
+    start = threading.Barrier(len(envs))
+
+    def run(index):
+        start.wait()
+        results[index] = envs[index].code_execution(f"for i in range(200):\n    print('env {index}')")
+
+    threads = [threading.Thread(target=run, args=(index,)) for index in range(len(envs))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    for index, result in enumerate(results):
+        assert result.stdout == f"env {index}\n" * 200
+
+
+def test_uncaptured_stdout_goes_to_the_original_stream_by_default(monkeypatch, make_env):
+    stdout, stderr = replace_streams(monkeypatch)
+    env = make_env()
+
+    assert env.code_execution("print('captured')").stdout == "captured\n"
+    print("stray")
+
+    assert stdout.getvalue() == "stray\n"
+    assert stderr.getvalue() == ""
+
+
+def test_redirected_stdout_keeps_protocol_stream_clean(monkeypatch, make_env):
+    stdout, stderr = replace_streams(monkeypatch)
+    redirect_uncaptured_stdout()
+    env = make_env()
+
+    result = env.code_execution(
+        "import threading\n"
+        "print('captured')\n"
+        "thread = threading.Thread(target=lambda: print('from a background thread'))\n"
+        "thread.start()\n"
+        "thread.join()"
+    )
+    print("stray")
+
+    assert result.stdout == "captured\n"
+    assert stdout.getvalue() == ""
+    assert stderr.getvalue() == "from a background thread\nstray\n"
+    # Other attributes still reach the real stdout, e.g. for a transport writing to it
+    assert sys.stdout.getvalue.__self__ is stdout
+
+
+def test_cells_share_one_persistent_namespace(make_env):
+    env = make_env()
+
+    env.code_execution("def double(x):\n    return 2 * x\nfactor = 3")
+    result = env.code_execution("values = [double(n) * factor for n in range(3)]\nprint(values)")
+
+    assert result.stdout == "[0, 6, 12]\n"
+    assert env.locals["values"] == [0, 6, 12]
+
+
+def test_result_reports_changed_and_deleted_variables(make_env):
+    env = make_env()
+    env.code_execution("a = 1\nb = [1]\nc = 'kept'")
+
+    result = env.code_execution("a = 2\nb.append(2)\ndel c\nd = None")
+
+    # In-place mutation keeps the binding, so only rebound and new names count as changed
+    assert sorted(result.changed) == ["a", "d"]
+    assert result.deleted == ["c"]
+    assert [summary.name for summary in result.variables] == ["a", "b", "d"]
+
+
+def test_locals_is_a_live_view_without_injected_helpers(make_env):
+    context = "line one\nline two\n"
+    env = make_env(context_str=context)
+
+    result = env.code_execution("x = 1")
+    assert env.locals["context"] is context
+    for helper in ("llm_query", "FINAL_VAR", "grep", "chunk"):
+        assert helper not in result.locals
+    with pytest.raises(KeyError):
+        result.locals["llm_query"]
+
+    # Nothing was copied: the earlier result sees later cells, including a reused helper name
+    env.code_execution("x = 2\nchunk = 'mine'")
+    assert result.locals["x"] == 2
+    assert result.locals["chunk"] == "mine"
+    assert set(result.locals) == {"context", "x", "chunk", "_stdout", "_stderr"}
+
+
+def test_trailing_expression_is_echoed_once(make_env):
+    env = make_env()
+
+    result = env.code_execution("calls = []\ncalls.append(1)\n'middle'\nlen(calls)")
+
+    assert result.stdout == "1\n"
+    assert env.locals["calls"] == [1]
+    assert env.code_execution("calls.append(2)").stdout == ""
+
+
+def test_multiline_statements_run_as_written(make_env):
+    env = make_env()
+
+    result = env.code_execution(
+        "text = \"\"\"\n"
+        "key = value\n"
+        "print('not code')\n"
+        "\"\"\"\n"
+        "if len(text) > 5:\n"
+        "    size = 'long'\n"
+        "else:\n"
+        "    size = 'short'\n"
+        "total = (1 +\n"
+        "         2)\n"
+        "size, total"
+    )
+
+    assert result.stderr == ""
+    assert result.stdout == "('long', 3)\n"
+
+
+def test_syntax_error_runs_nothing(make_env):
+    env = make_env()
+
+    result = env.code_execution("before = 1\nif True print('x')")
+
+    assert "SyntaxError" in result.stderr
+    assert "before" not in env.locals
+
+
+def test_runtime_error_keeps_earlier_assignments(make_env):
+    env = make_env()
+
+    result = env.code_execution("before = 1\n1 / 0\nafter = 2")
+
+    assert result.stderr == "ZeroDivisionError: division by zero\n"
+    assert env.locals["before"] == 1
+    assert "after" not in env.locals
+
+
+def test_repeated_cells_are_compiled_once(make_env):
+    env = make_env()
+    code = "counter = 0\ncounter + 1"
+    env.code_execution(code)
+    hits = _compile_cell.cache_info().hits
+
+    assert env.code_execution(code).stdout == "1\n"
+    assert _compile_cell.cache_info().hits == hits + 1
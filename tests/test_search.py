@@ -0,0 +1,50 @@
+import pytest
+
+from rlm.utils.context import LazyText
+from rlm.utils.search import grep
+
+TEXT = "alpha\nbeta ü\n\ngamma € beta\ndelta\nepsilon beta\n"
+
+
+@pytest.fixture
+def lazy_text(tmp_path):
+    path = tmp_path / "context.txt"
+    path.write_text(TEXT, encoding="utf-8")
+    text = LazyText(path, block_size=8)
+    yield text
+    text.close()
+
+
+@pytest.mark.parametrize("lazy", [False, True])
+def test_grep_finds_lines_with_context(lazy, lazy_text):
+    hits = grep(lazy_text if lazy else TEXT, "beta", context_window=1)
+    assert [hit["line"] for hit in hits] == [1, 3, 5]
+    assert all(hit["match"] == "beta" for hit in hits)
+    assert hits[1]["snippet"] == "2- \n3: gamma € beta\n4- delta"
+    assert hits[0]["snippet"] == "0- alpha\n1: beta ü\n2- "
+
+
+@pytest.mark.parametrize("lazy", [False, True])
+def test_grep_regex_options(lazy, lazy_text):
+    context = lazy_text if lazy else TEXT
+    assert [hit["line"] for hit in grep(context, r"^\w+a$")] == [0, 4]
+    assert [hit["line"] for hit in grep(context, "BETA", ignore_case=True)] == [1, 3, 5]
+    assert grep(context, "a.b") == []
+    assert [hit["line"] for hit in grep(context, "€", literal=True)] == [3]
+    assert len(grep(context, "beta", max_hits=2)) == 2
+
+
+def test_grep_clips_long_lines():
+    text = "x" * 1000 + "needle" + "y" * 1000
+    hit = grep(text, "needle", max_line_chars=40)[0]
+    line = hit["snippet"].split(": ", 1)[1]
+    assert "needle" in line
+    assert line.startswith("...") and line.endswith("...")
+    assert len(line) <= 46
+
+
+def test_grep_documents():
+    documents = ["no match here", "first beta\nsecond beta", 42, "beta"]
+    hits = grep(documents, "beta")
+    assert [(hit["document"], hit["line"]) for hit in hits] == [(1, 0), (1, 1), (3, 0)]
+    assert len(grep(documents, "beta", max_hits=1)) == 1
@@ -0,0 +1,227 @@
+import asyncio
+import os
+import threading
+import time
+
+import pytest
+
+import rlm.session as session_module
+from rlm.session import ContextSession, SessionManager
+from rlm.utils.archives import load_file_context
+from rlm.utils.context import LazyText
+
+
+class ScriptedRLM:
+    """Root model stand-in: runs the query as REPL code and answers with its output."""
+
+    def __init__(self, session: ContextSession):
+        self.session = session
+
+    def completion(self, context, query: str) -> str:
+        # Like RLM_REPL, refuse to run on a closed environment
+        if self.session.closed:
+            raise RuntimeError("REPL environment is closed")
+        result = self.session.repl_env.code_execution(query)
+        return result.stdout.strip() or result.stderr.strip()
+
+    async def acompletion(self, context, query: str) -> str:
+        return await asyncio.to_thread(self.completion, context, query)
+
+
+@pytest.fixture(autouse=True)
+def scripted_sessions(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    monkeypatch.setattr(ContextSession, "_rlm", lambda self, max_iterations, enable_logging: ScriptedRLM(self))
+
+
+@pytest.fixture
+def context_file(tmp_path):
+    path = tmp_path / "context.txt"
+    path.write_text("alpha\nbeta\ngamma\n", encoding="utf-8")
+    return path
+
+
+@pytest.fixture
+def manager():
+    manager = SessionManager(max_sessions=2, idle_timeout=None)
+    yield manager
+    manager.close_all()
+
+
+def rewrite(path, text: str) -> None:
+    path.write_text(text, encoding="utf-8")
+    # Make sure the version key changes even on coarse-grained file systems
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def test_session_keeps_variables_across_queries():
+    with ContextSession("one two three") as session:
+        assert session.query("words = context.split()\nprint(len(words))") == "3"
+        assert session.query("print(words[-1])") == "three"
+        assert session.query_count == 2
+        assert session.memory_usage()["variables"].keys() == {"words"}
+    assert session.closed
+    with pytest.raises(RuntimeError, match="closed"):
+        session.query("print(1)")
+
+
+def test_manager_reuses_sessions_until_the_file_changes(manager, context_file):
+    assert manager.query_file(context_file, "lines = context.split()\nprint(len(lines))") == "3"
+    assert manager.query_file(str(context_file), "print(lines[0])") == "alpha"
+    [stats] = manager.stats()
+    assert stats["path"] == str(context_file) and stats["queries"] == 2
+
+    rewrite(context_file, "delta\n")
+    assert "NameError" in manager.query_file(context_file, "print(lines)")
+    assert manager.query_file(context_file, "print(context.strip())") == "delta"
+
+
+def test_changed_file_doesnt_close_a_session_in_use(manager, context_file):
+    with manager.session(context_file) as old:
+        rewrite(context_file, "delta\n")
+        with manager.session(context_file) as new:
+            assert new is not old
+            assert not old.closed
+            assert old.query("print(context.split()[0])") == "alpha"
+            assert new.query("print(context.strip())") == "delta"
+        assert not old.closed
+    # Closed once its last user is done
+    assert old.closed
+    assert not new.closed
+
+
+def test_lru_and_idle_eviction(tmp_path):
+    paths = []
+    for number in range(3):
+        paths.append(tmp_path / f"context{number}.txt")
+        paths[-1].write_text(f"file {number}\n", encoding="utf-8")
+    manager = SessionManager(max_sessions=2, idle_timeout=None)
+    try:
+        sessions = []
+        for path in paths:
+            with manager.session(path) as session:
+                sessions.append(session)
+        assert [sessions[0].closed, sessions[1].closed, sessions[2].closed] == [True, False, False]
+        assert [entry["path"] for entry in manager.stats()] == [str(paths[1]), str(paths[2])]
+    finally:
+        manager.close_all()
+    assert all(session.closed for session in sessions)
+
+    manager = SessionManager(max_sessions=4, idle_timeout=0.05)
+    try:
+        with manager.session(paths[0]) as first:
+            time.sleep(0.1)
+            # In use, so not evicted despite being idle
+            with manager.session(paths[1]):
+                pass
+            assert not first.closed
+        time.sleep(0.1)
+        with manager.session(paths[2]):
+            pass
+        assert first.closed
+    finally:
+        manager.close_all()
+
+
+def test_concurrent_callers_share_one_load(manager, context_file, monkeypatch):
+    loads = []
+
+    def slow_load(path, *args, **kwargs):
+        loads.append(path)
+        time.sleep(0.2)
+        return load_file_context(path, *args, **kwargs)
+
+    monkeypatch.setattr(session_module, "load_file_context", slow_load)
+    results = []
+
+    def query():
+        results.append(manager.query_file(context_file, "print(len(context))"))
+
+    threads = [threading.Thread(target=query) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == ["17"] * 4
+    assert len(loads) == 1
+
+
+def test_failed_session_start_closes_the_loaded_context(manager, context_file, monkeypatch):
+    loaded = []
+
+    def load_lazily(path):
+        loaded.append(load_file_context(path, max_in_memory=1))
+        return loaded[-1]
+
+    def broken_repl(**kwargs):
+        raise RuntimeError("no REPL today")
+
+    monkeypatch.setattr(session_module, "load_file_context", load_lazily)
+    monkeypatch.setattr(session_module, "REPLEnv", broken_repl)
+    with pytest.raises(RuntimeError, match="no REPL today"):
+        manager.query_file(context_file, "print(1)")
+    assert isinstance(loaded[0], LazyText)
+    assert loaded[0]._file.closed
+    assert manager.stats() == []
+
+
+def test_async_queries_run_one_at_a_time_per_session(manager, context_file):
+    async def run():
+        await manager.aquery_file(context_file, "total = 0")
+        return await asyncio.gather(*(
+            manager.aquery_file(context_file, f"total += {number}\nprint(total)") for number in range(1, 5)
+        ))
+
+    totals = sorted(int(result) for result in asyncio.run(run()))
+    # Serialized in some order: each query saw the previous ones' updates
+    assert sorted(b - a for a, b in zip([0] + totals, totals)) == [1, 2, 3, 4]
+    assert manager._in_use == {}
+
+
+def test_cancelled_aquery_file_releases_the_session(manager, context_file, monkeypatch):
+    loading, finish = threading.Event(), threading.Event()
+
+    def blocking_load(path, *args, **kwargs):
+        loading.set()
+        finish.wait(5)
+        return load_file_context(path, *args, **kwargs)
+
+    monkeypatch.setattr(session_module, "load_file_context", blocking_load)
+
+    async def run():
+        task = asyncio.ensure_future(manager.aquery_file(context_file, "print(1)"))
+        await asyncio.to_thread(loading.wait, 5)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        finish.set()
+        # The load completes in its thread, then the session is handed back
+        for _ in range(100):
+            if manager.stats() and not manager._in_use:
+                break
+            await asyncio.sleep(0.02)
+
+    asyncio.run(run())
+    assert manager._in_use == {}
+    assert len(manager.stats()) == 1
+
+
+def test_cancelled_aquery_releases_the_session_lock():
+    session = ContextSession("text")
+
+    async def run():
+        session._lock.acquire()
+        waiting = asyncio.ensure_future(session.aquery("print(1)"))
+        await asyncio.sleep(0.05)
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        session._lock.release()
+        await asyncio.sleep(0.1)
+        return await asyncio.wait_for(session.aquery("print(2)"), 5)
+
+    try:
+        assert asyncio.run(run()) == "2"
+    finally:
+        session.close()
@@ -0,0 +1,56 @@
+import pytest
+
+from rlm.utils.utils import StreamingResponseParser, find_code_blocks
+
+RESPONSE = (
+    "Let me look at the context first.\n"
+    "```repl\nprint(len(context))\n```\n"
+    "Some `inline code` and a python block that is not run:\n"
+    "```python\nignored()\n```\n"
+    "```repl\nchunks = chunk(context)\nfor c in chunks:\n    print(c[:10])\n```\n"
+    "Done for now."
+)
+
+
+def feed_in_pieces(text: str, size: int) -> tuple[StreamingResponseParser, list[str], list[int]]:
+    parser = StreamingResponseParser()
+    blocks, completed_at = [], []
+    for position in range(0, len(text), size):
+        new_blocks = parser.feed(text[position:position + size])
+        blocks.extend(new_blocks)
+        completed_at.extend([position + size] * len(new_blocks))
+    return parser, blocks, completed_at
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64, len(RESPONSE)])
+def test_blocks_match_find_code_blocks(size):
+    parser, blocks, _ = feed_in_pieces(RESPONSE, size)
+    assert blocks == find_code_blocks(RESPONSE)
+    assert blocks == ["print(len(context))", "chunks = chunk(context)\nfor c in chunks:\n    print(c[:10])"]
+    assert parser.text == RESPONSE
+    assert not parser.final_answer_seen
+
+
+def test_blocks_are_reported_when_their_fence_closes():
+    _, _, completed_at = feed_in_pieces(RESPONSE, 1)
+    first_close = RESPONSE.index("```\n", RESPONSE.index("```repl")) + 3
+    assert completed_at[0] == first_close
+    assert completed_at[1] < len(RESPONSE)
+
+
+@pytest.mark.parametrize("size", [1, 5, 1000])
+def test_final_answer(size):
+    parser, _, _ = feed_in_pieces("Thinking...\nFINAL(42 is the answer)", size)
+    assert parser.final_answer_seen
+
+    parser, _, _ = feed_in_pieces("Thinking...\nFINAL_VAR(answer)\n", size)
+    assert parser.final_answer_seen
+
+
+@pytest.mark.parametrize("size", [1, 5, 1000])
+def test_final_var_inside_open_block_is_not_an_answer(size):
+    text = "```repl\nanswer = compute()\nFINAL_VAR(answer)\n"
+    parser, blocks, _ = feed_in_pieces(text, size)
+    assert blocks == []
+    assert not parser.final_answer_seen
+    assert parser.feed("```") == ["answer = compute()\nFINAL_VAR(answer)"]
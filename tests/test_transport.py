@@ -0,0 +1,131 @@
+import asyncio
+from email.utils import formatdate
+
+import httpx
+import openai
+import pytest
+
+from rlm.utils import transport
+from rlm.utils.transport import (
+    RetryPolicy,
+    acall_with_retries,
+    call_with_retries,
+    get_async_openai_client,
+    get_openai_client,
+)
+
+REQUEST = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+
+
+def status_error(status: int, headers: dict | None = None) -> openai.APIStatusError:
+    response = httpx.Response(status, headers=headers, request=REQUEST)
+    return openai.APIStatusError(f"status {status}", response=response, body=None)
+
+
+class Flaky:
+    """Request that raises the given errors in turn, then answers."""
+
+    def __init__(self, *errors: Exception):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def __call__(self) -> str:
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return "ok"
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    delays = []
+    monkeypatch.setattr(transport.time, "sleep", delays.append)
+    return delays
+
+
+def test_transient_errors_are_retried(sleeps):
+    request = Flaky(status_error(429), status_error(503), openai.APIConnectionError(request=REQUEST))
+
+    assert call_with_retries(request, RetryPolicy(base_delay=1.0, jitter=0.0)) == "ok"
+
+    assert request.calls == 4
+    assert sleeps == [1.0, 2.0, 4.0]
+
+
+def test_client_errors_are_not_retried(sleeps):
+    request = Flaky(status_error(400))
+
+    with pytest.raises(openai.APIStatusError):
+        call_with_retries(request, RetryPolicy())
+
+    assert request.calls == 1
+    assert sleeps == []
+
+
+def test_retries_stop_after_max_retries(sleeps):
+    request = Flaky(*(status_error(500) for _ in range(3)))
+
+    with pytest.raises(openai.APIStatusError):
+        call_with_retries(request, RetryPolicy(max_retries=2))
+
+    assert request.calls == 3
+    assert len(sleeps) == 2
+
+
+def test_delay_backs_off_with_bounded_jitter():
+    policy = RetryPolicy(base_delay=1.0, max_delay=10.0, jitter=0.5)
+    error = status_error(503)
+
+    for attempt, full in [(0, 1.0), (2, 4.0), (10, 10.0)]:
+        for _ in range(20):
+            assert full * 0.5 <= policy.delay(error, attempt) <= full
+
+
+def test_delay_honors_retry_after():
+    policy = RetryPolicy(max_delay=30.0)
+
+    assert policy.delay(status_error(429, {"retry-after": "7"}), 0) == 7.0
+    assert policy.delay(status_error(429, {"retry-after-ms": "250"}), 0) == 0.25
+    assert policy.delay(status_error(429, {"retry-after": "3600"}), 0) == 30.0
+    dated = policy.delay(status_error(503, {"retry-after": formatdate(usegmt=True)}), 3)
+    assert 0.0 <= dated <= 1.0
+
+
+def test_retry_policy_from_env(monkeypatch):
+    monkeypatch.setenv("RLM_MAX_RETRIES", "2")
+
+    assert RetryPolicy.from_env().max_retries == 2
+
+
+def test_async_retries(monkeypatch):
+    delays = []
+
+    async def fake_sleep(delay):
+        delays.append(delay)
+
+    monkeypatch.setattr(transport.asyncio, "sleep", fake_sleep)
+    request = Flaky(openai.APITimeoutError(request=REQUEST))
+
+    async def call():
+        return request()
+
+    assert asyncio.run(acall_with_retries(call, RetryPolicy(base_delay=0.5, jitter=0.0))) == "ok"
+    assert delays == [0.5]
+
+
+def test_clients_are_shared_per_api_key():
+    client = get_openai_client("key-a")
+
+    assert get_openai_client("key-a") is client
+    assert get_openai_client("key-b") is not client
+    # Retries happen in RetryPolicy, not in the SDK
+    assert client.max_retries == 0
+
+
+def test_async_clients_are_shared_per_event_loop():
+    async def clients():
+        return get_async_openai_client("key-a"), get_async_openai_client("key-a")
+
+    first, second = asyncio.run(clients())
+    assert first is second
+    assert asyncio.run(clients())[0] is not first
@@ -0,0 +1,153 @@
+from types import SimpleNamespace
+
+import httpx
+import openai
+import pytest
+
+from rlm.repl import Sub_RLM
+from rlm.utils.cache import MemoryCache
+from rlm.utils.llm import OpenAIClient
+from rlm.utils.transport import RetryPolicy
+from rlm.utils.usage import CallUsage, UsageTracker, model_pricing
+
+
+def response(text: str, prompt_tokens: int, completion_tokens: int, cached_tokens: int = 0,
+             reasoning_tokens: int = 0) -> SimpleNamespace:
+    """Chat completion response shaped like the OpenAI SDK's."""
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=text))],
+        usage=SimpleNamespace(
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            total_tokens=prompt_tokens + completion_tokens,
+            prompt_tokens_details=SimpleNamespace(cached_tokens=cached_tokens),
+            completion_tokens_details=SimpleNamespace(reasoning_tokens=reasoning_tokens),
+        ),
+    )
+
+
+class FakeCompletions:
+    """Stand-in for `client.chat.completions` answering with queued responses or errors."""
+
+    def __init__(self, *replies):
+        self.replies = list(replies)
+        self.requests = []
+
+    def create(self, **request):
+        self.requests.append(request)
+        reply = self.replies.pop(0)
+        if isinstance(reply, Exception):
+            raise reply
+        return reply
+
+
+def fake_client(client: OpenAIClient, *replies) -> FakeCompletions:
+    completions = FakeCompletions(*replies)
+    client.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    return completions
+
+
+def test_pricing_resolves_the_longest_matching_prefix():
+    assert model_pricing("gpt-5") == (1.25, 0.125, 10.00)
+    assert model_pricing("gpt-5-mini-2025-08-07") == (0.25, 0.025, 2.00)
+    assert model_pricing("gpt-5x") is None
+    assert model_pricing("local-model", {"local": (1.0, 1.0, 1.0)}) == (1.0, 1.0, 1.0)
+    assert model_pricing("localmodel", {"local": (1.0, 1.0, 1.0)}) is None
+
+
+def test_call_cost_bills_cached_prompt_tokens_at_the_cached_price():
+    usage = CallUsage.from_response(response("", 1_000_000, 100_000, cached_tokens=400_000, reasoning_tokens=50_000))
+
+    assert usage == CallUsage(1_000_000, 100_000, 400_000, 50_000)
+    # 600k uncached at 1.25, 400k cached at 0.125, 100k output at 10 (reasoning included)
+    assert usage.cost((1.25, 0.125, 10.00)) == pytest.approx(0.75 + 0.05 + 1.0)
+    assert CallUsage.from_response(SimpleNamespace()) == CallUsage()
+
+
+def test_tracker_splits_totals_by_role_and_model():
+    tracker = UsageTracker()
+    tracker.record("root", "gpt-5", CallUsage(1000, 200), latency=0.3)
+    tracker.record("sub", "gpt-5-mini", CallUsage(2000, 100, cached_tokens=1000), latency=3.0)
+    tracker.record("sub", "local-model", CallUsage(10, 10), latency=200.0)
+    tracker.record_cache_hit("sub", "gpt-5-mini")
+    tracker.record_error("root", "gpt-5")
+
+    summary = tracker.summary()
+    assert summary["calls"] == 3
+    assert summary["cache_hits"] == 1
+    assert summary["errors"] == 1
+    assert summary["prompt_tokens"] == 3010
+    assert summary["total_tokens"] == 3320
+    assert summary["cached_prompt_ratio"] == pytest.approx(1000 / 3010)
+    assert summary["by_role"]["root"]["cost_usd"] == pytest.approx((1000 * 1.25 + 200 * 10.0) / 1e6)
+    assert summary["by_model"]["gpt-5-mini"]["cost_usd"] == pytest.approx((1000 * 0.25 + 1000 * 0.025 + 100 * 2.0) / 1e6)
+    assert summary["by_model"]["local-model"]["cost_usd"] == 0.0
+    assert summary["unpriced_models"] == ["local-model"]
+    assert summary["latency_histogram"] == {
+        "<=0.5s": 1, "<=1s": 0, "<=2s": 0, "<=5s": 1, "<=10s": 0, "<=30s": 0, "<=60s": 0,
+        "<=120s": 0, ">120s": 1,
+    }
+
+    sub = tracker.summary(role="sub")
+    assert sub["calls"] == 2
+    assert list(sub["by_role"]) == ["sub"]
+
+    tracker.reset()
+    assert tracker.summary()["calls"] == 0
+
+
+def test_client_records_usage_of_each_call():
+    tracker = UsageTracker()
+    client = OpenAIClient(api_key="test-key", model="gpt-5-mini", usage=tracker, usage_role="sub")
+    completions = fake_client(client, response("first", 100, 10), response("second", 200, 20, cached_tokens=100))
+
+    assert client.completion("question one") == "first"
+    assert client.completion([{"role": "user", "content": "question two"}]) == "second"
+
+    summary = tracker.summary()
+    assert summary["by_role"]["sub"]["calls"] == 2
+    assert summary["prompt_tokens"] == 300
+    assert summary["cached_tokens"] == 100
+    assert summary["by_model"]["gpt-5-mini"]["cost_usd"] > 0
+    assert completions.requests[0]["messages"] == [{"role": "user", "content": "question one"}]
+
+
+def test_cache_hits_are_counted_without_tokens():
+    tracker = UsageTracker()
+    client = OpenAIClient(api_key="test-key", model="gpt-5", usage=tracker, cache=MemoryCache())
+    completions = fake_client(client, response("answer", 100, 10))
+
+    assert client.completion("same question") == "answer"
+    assert client.completion("same question") == "answer"
+
+    summary = tracker.summary()
+    assert (summary["calls"], summary["cache_hits"], summary["prompt_tokens"]) == (1, 1, 100)
+    assert len(completions.requests) == 1
+
+
+def test_failed_calls_are_counted_as_errors():
+    tracker = UsageTracker()
+    client = OpenAIClient(api_key="test-key", usage=tracker, retry_policy=RetryPolicy(max_retries=0))
+    request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+    fake_client(client, openai.APIStatusError("bad request", response=httpx.Response(400, request=request), body=None))
+
+    with pytest.raises(RuntimeError, match="bad request"):
+        client.completion("question")
+
+    summary = tracker.summary()
+    assert (summary["calls"], summary["errors"]) == (0, 1)
+
+
+def test_sub_rlm_reports_only_sub_llm_usage(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    tracker = UsageTracker()
+    tracker.record("root", "gpt-5", CallUsage(1000, 100), latency=1.0)
+    sub_rlm = Sub_RLM(model="gpt-5-mini", usage=tracker)
+    fake_client(sub_rlm.client, response("sub answer", 50, 5))
+
+    assert sub_rlm.completion("prompt") == "sub answer"
+
+    summary = sub_rlm.cost_summary()
+    assert summary["calls"] == 1
+    assert list(summary["by_model"]) == ["gpt-5-mini"]
+    assert tracker.summary()["calls"] == 2
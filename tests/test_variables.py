@@ -0,0 +1,110 @@
+import gc
+import pickle
+import weakref
+
+from rlm.utils.utils import format_execution_result
+from rlm.utils.variables import VariableSummarizer, VariableSummary, bounded_repr
+
+
+class CountingRepr:
+    """Object whose repr() is counted, to check when summaries compute it."""
+
+    calls = 0
+
+    def __repr__(self) -> str:
+        CountingRepr.calls += 1
+        return "CountingRepr()"
+
+
+class ExplodingRepr:
+    def __repr__(self) -> str:
+        raise AssertionError("repr() of a variable was computed")
+
+
+def test_summary_computes_its_preview_only_on_demand():
+    CountingRepr.calls = 0
+    summary = VariableSummary("value", CountingRepr())
+
+    assert summary.type_name == "CountingRepr"
+    assert summary.length is None
+    assert not summary.is_simple
+    assert CountingRepr.calls == 0
+
+    assert summary.describe() == "value: CountingRepr = CountingRepr()"
+    assert summary.preview == "CountingRepr()"
+    assert CountingRepr.calls == 1
+
+
+def test_preview_of_a_large_value_is_bounded():
+    summary = VariableSummary("text", "x" * 10_000_000, max_preview=50)
+
+    assert summary.length == 10_000_000
+    assert len(summary.preview) <= 53
+    assert len(bounded_repr(list(range(1_000_000)))) <= 103
+
+
+def test_summary_releases_the_value_once_previewed():
+    value = CountingRepr()
+    reference = weakref.ref(value)
+    summary = VariableSummary("value", value)
+
+    summary.preview
+    del value
+    gc.collect()
+
+    assert reference() is None
+    assert summary.preview == "CountingRepr()"
+
+
+def test_pickled_summary_carries_the_preview_not_the_value():
+    summary = pickle.loads(pickle.dumps(VariableSummary("rows", [CountingRepr()] * 3)))
+
+    assert (summary.name, summary.type_name, summary.length) == ("rows", "list", 3)
+    assert summary.preview == "[CountingRepr(), CountingRepr(), CountingRepr()]"
+
+
+def test_summarizer_reuses_summaries_of_unchanged_variables():
+    summarizer = VariableSummarizer()
+    rows = [1, 2]
+    variables = {"rows": rows, "name": "abc", "_hidden": 1}
+
+    first = summarizer.summarize_all(variables)
+    assert [summary.name for summary in first] == ["rows", "name"]
+    assert summarizer.summarize_all(variables) == first
+
+    # A changed length or a rebinding is summarized again
+    rows.append(3)
+    variables["name"] = "abd"
+    second = summarizer.summarize_all(variables)
+    assert second[0] is not first[0] and second[0].length == 3
+    assert second[1] is not first[1]
+
+    del variables["name"]
+    assert [summary.name for summary in summarizer.summarize_all(variables)] == ["rows"]
+    assert set(summarizer._cache) == {"rows"}
+
+
+def test_summarizing_only_given_names():
+    summarizer = VariableSummarizer()
+    variables = {"a": 1, "b": 2, "_c": 3}
+
+    summaries = summarizer.summarize_all(variables, names=["b", "_c", "missing"])
+
+    assert [summary.name for summary in summaries] == ["b"]
+
+
+def test_execution_result_lists_variables_without_repr():
+    result = format_execution_result(
+        "out\n", "", {"big": "x" * 10_000_000, "obj": ExplodingRepr(), "items": [ExplodingRepr()]},
+    )
+
+    assert result == "\nout\n\n\nREPL variables: ['big', 'items']\n"
+
+
+def test_execution_result_uses_precomputed_summaries():
+    variables = [VariableSummary("a", 1), VariableSummary("f", len)]
+
+    result = format_execution_result("", "", {"ignored": 1}, variables=variables)
+
+    assert result == "REPL variables: ['a']\n"
+    assert format_execution_result("", "", {}) == "No output"
@@ -0,0 +1,121 @@
+import asyncio
+
+import pytest
+
+from rlm.logger.repl_logger import REPLEnvLogger
+from rlm.utils.limits import ExecutionLimits
+from rlm.utils.utils import check_for_final_answer, execute_code
+from rlm.worker import ProcessREPLEnv, WorkerPool
+
+
+class RecordingLogger:
+    def __init__(self):
+        self.entries = []
+
+    def log_tool_execution(self, name: str, result: str) -> None:
+        self.entries.append((name, result))
+
+
+@pytest.fixture(scope="module")
+def pool():
+    pool = WorkerPool(size=1)
+    yield pool
+    pool.shutdown()
+
+
+@pytest.fixture
+def make_env(pool, echo_lm):
+    envs = []
+
+    def make(**options) -> ProcessREPLEnv:
+        envs.append(ProcessREPLEnv(sub_rlm=echo_lm, pool=pool, **options))
+        return envs[-1]
+
+    yield make
+    for env in envs:
+        env.close()
+
+
+def test_cells_share_a_namespace_in_the_worker(make_env):
+    env = make_env(context_str="line one\nline two\n")
+    assert "grep" in env.helper_names and "get_lines" in env.helper_names
+    result = env.code_execution("import os\ncount = len(context.split('\\n'))\nprint(get_lines(1))")
+    assert result.stdout == "line two\n"
+    assert result.stderr == ""
+    assert "count" in result.changed
+    assert [summary.name for summary in result.variables if summary.name == "count"] == ["count"]
+    assert env.code_execution("count * 2").stdout == "6\n"
+    assert env.locals["count"] == 3
+    assert "count" in env.locals and "missing" not in env.locals
+    # Code runs in the worker process and in its own directory
+    assert env.code_execution("print(os.getpid() != PARENT)".replace("PARENT", str(__import__("os").getpid()))).stdout == "True\n"
+    env.code_execution("with open('notes.txt', 'w') as f:\n    f.write('x')")
+    assert env.code_execution("print(os.path.exists(os.path.join(os.getcwd(), 'notes.txt')))").stdout == "True\n"
+
+
+def test_sub_llm_calls_and_output_go_through_the_parent(make_env, echo_lm):
+    output = []
+    env = make_env(on_output=lambda stream, text: output.append((stream, text)))
+    result = env.code_execution("answer = llm_query('hi')\nanswers = llm_query_batch(['a', 'b'])\nprint(answer, answers)")
+    assert result.stdout == "echo: hi ['echo: a', 'echo: b']\n"
+    assert sorted(echo_lm.prompts) == ["a", "b", "hi"]
+    assert {stream for stream, _ in output} == {"stdout"}
+    assert "".join(text for _, text in output) == result.stdout
+    assert env.locals["answers"] == ["echo: a", "echo: b"]
+
+
+def test_async_execution_awaits_sub_llm_calls_on_the_loop(make_env, echo_lm):
+    env = make_env()
+
+    async def run():
+        return await env.acode_execution("print(llm_query('async'))")
+
+    assert asyncio.run(run()).stdout == "echo: async\n"
+
+
+def test_unpicklable_values_come_back_as_text(make_env):
+    env = make_env()
+    env.code_execution("def helper():\n    return 1")
+    assert env.locals["helper"].startswith("<function helper")
+
+
+def test_pool_hands_out_live_workers_and_refills(pool):
+    worker = pool.acquire()
+    try:
+        assert worker.process.is_alive()
+        assert len(pool._idle) == pool.size
+    finally:
+        pool.release(worker)
+    assert not worker.process.is_alive()
+
+
+def test_budget_is_enforced_inside_the_worker(make_env):
+    env = make_env(limits=ExecutionLimits(cell_timeout=0.3, max_llm_calls_per_cell=1))
+    result = env.code_execution("before = 1\nwhile True:\n    pass")
+    assert result.budget_exceeded == "cell wall-clock limit of 0.3s exceeded"
+    assert env.locals["before"] == 1
+    result = env.code_execution("llm_query('a')\nllm_query('b')")
+    assert "sub-LLM call limit of 1 per cell exceeded" in result.stderr
+    assert env.code_execution("print('still alive')").stdout == "still alive\n"
+
+
+def test_killed_worker_ends_the_session_without_raising(make_env):
+    env = make_env(limits=ExecutionLimits(cell_timeout=0.2), kill_grace_period=0.3)
+    env.code_execution("answer = 42")
+    logger = RecordingLogger()
+    # Blocked in C code, the in-worker watchdog can't interrupt it, so the worker is killed
+    formatted = execute_code(env, "import time\ntime.sleep(60)", REPLEnvLogger(enabled=False), logger)
+    assert "REPL worker had to be killed" in formatted
+    assert env.ended is not None
+    assert len(env.locals) == 0
+
+    later = env.code_execution("print(answer)")
+    assert later.variables == [] and later.changed == []
+    assert "The REPL session has ended" in later.stderr
+    assert "The REPL session has ended" in execute_code(env, "print(1)", REPLEnvLogger(enabled=False), logger)
+
+    assert check_for_final_answer("FINAL_VAR(answer)", env, logger) is None
+    assert "session has ended" in logger.entries[-1][1]
+    assert check_for_final_answer("FINAL(done)", env, logger) == "done"
+    env.reset_session_budget()
+    assert env.memory_usage()["variables"] == {}